@@ -0,0 +1,302 @@
+import codecs
+import csv
+import io
+import json
+from collections import Counter
+from datetime import date, datetime
+from typing import AsyncIterator
+
+import orjson
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import stat_counts
+from .config import settings
+from .db import AsyncSessionLocal
+from .writes import integrity_kind
+
+# خواندن و نوشتن CSV / NDJSON به صورت جریانی (بدون نگه داشتن کل فایل در حافظه)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def detect_format(content_type: str | None, filename: str | None = None) -> str | None:
+    ctype = (content_type or "").lower()
+    name = (filename or "").lower()
+    if "csv" in ctype or name.endswith(".csv"):
+        return "csv"
+    if "ndjson" in ctype or "jsonl" in ctype or name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+async def request_chunks(request: Request, fmt: str | None) -> tuple[str, AsyncIterator[bytes]]:
+    """
+    بدنه‌ی درخواست را به صورت تکه‌تکه برمی‌گرداند؛ هم multipart (فیلد file) و هم
+    بدنه‌ی خام text/csv یا application/x-ndjson پشتیبانی می‌شود.
+    """
+    ctype = request.headers.get("content-type", "")
+
+    if ctype.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="multipart body must contain a 'file' field")
+        fmt = fmt or detect_format(upload.content_type, upload.filename)
+
+        async def file_chunks():
+            while chunk := await upload.read(READ_CHUNK_SIZE):
+                yield chunk
+
+        chunks = file_chunks()
+    else:
+        fmt = fmt or detect_format(ctype)
+        chunks = request.stream()
+
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=415, detail="Unsupported format; send CSV or NDJSON")
+    return fmt, chunks
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buf = ""
+    async for chunk in chunks:
+        buf += decoder.decode(chunk)
+        *lines, buf = buf.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buf += decoder.decode(b"", final=True)
+    if buf:
+        yield buf.rstrip("\r")
+
+
+async def _iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    header = None
+    record, row_no = "", 0
+    async for line in lines:
+        # رکورد CSV ممکن است داخل "..." چند خط باشد؛ تا وقتی تعداد " فرد است ادامه می‌دهیم
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+
+        row_no += 1
+        if len(values) != len(header):
+            yield row_no, None, f"expected {len(header)} columns, got {len(values)}"
+        else:
+            yield row_no, dict(zip(header, values)), None
+
+    if record:
+        yield row_no + 1, None, "unterminated quoted field"
+
+
+async def _iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    row_no = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_no, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row_no, None, "each line must be a JSON object"
+        else:
+            yield row_no, data, None
+
+
+def iter_records(fmt: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """(شماره‌ی ردیف، dict یا None، خطا یا None) برای هر ردیف داده."""
+    lines = _iter_lines(chunks)
+    return _iter_csv_records(lines) if fmt == "csv" else _iter_ndjson_records(lines)
+
+
+# --------- EXPORT ---------
+EXPORT_FORMAT_PATTERN = "^(csv|ndjson)$"
+_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+async def _export_chunks(stmt, fmt: str, session_factory) -> AsyncIterator[bytes]:
+    # dependency مربوط به session قبل از ارسال بدنه‌ی StreamingResponse بسته می‌شود،
+    # پس generator کانکشن خودش را باز می‌کند. stream() یعنی cursor سمت سرور
+    # و yield_per یعنی در هر لحظه فقط یک دسته ردیف در حافظه است.
+    async with session_factory() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        keys = list(result.keys())
+
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(keys)
+
+        async for rows in result.partitions():
+            if fmt == "csv":
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buf.write(json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=_json_default))
+                    buf.write("\n")
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+
+        if fmt == "csv" and buf.tell():
+            yield buf.getvalue().encode("utf-8")
+
+
+def export_response(stmt, fmt: str, name: str, session_factory=AsyncSessionLocal) -> StreamingResponse:
+    """خروجی جریانی کل نتیجه‌ی stmt (ستون‌های select همان ستون‌های فایل هستند).
+
+    session_factory: معمولاً read_session_factory(request) تا خروجی از replica خوانده شود.
+    """
+    return StreamingResponse(
+        _export_chunks(stmt, fmt, session_factory),
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+# --------- BATCH LOOKUP ---------
+async def _lookup_chunks(stmt, key_col, keys: list, fields: list[str]) -> AsyncIterator[bytes]:
+    # مثل export کانکشن خود generator باز می‌شود؛ هر دسته یک IN روی ایندکس یکتای key_col است
+    # و بدنه به شکل {"items": [...], "missing": [...]} تکه‌تکه ساخته می‌شود
+    found = set()
+    key_index = fields.index(key_col.key)
+    first = True
+    yield b'{"items":['
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(keys), settings.LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + settings.LOOKUP_CHUNK_SIZE]
+            rows = (await db.execute(stmt.where(key_col.in_(chunk)))).all()
+            if not rows:
+                continue
+            parts = []
+            for row in rows:
+                found.add(row[key_index])
+                parts.append(orjson.dumps(dict(zip(fields, row))))
+            yield (b"" if first else b",") + b",".join(parts)
+            first = False
+    yield b'],"missing":' + orjson.dumps([k for k in keys if k not in found]) + b"}"
+
+
+def lookup_response(stmt, key_col, keys: list, fields: list[str]) -> StreamingResponse:
+    """ردیف‌های stmt که key_col آن‌ها در keys است (keys یکتا)، به همراه کلیدهای پیدا نشده."""
+    return StreamingResponse(_lookup_chunks(stmt, key_col, keys, fields), media_type="application/json")
+
+
+# --------- BULK CREATE ---------
+async def _existing(db: AsyncSession, col, values) -> set:
+    # IN های بزرگ به دسته‌های LOOKUP_CHUNK_SIZE تقسیم می‌شوند
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), settings.LOOKUP_CHUNK_SIZE):
+        found.update(await db.scalars(select(col).where(col.in_(values[start:start + settings.LOOKUP_CHUNK_SIZE]))))
+    return found
+
+
+async def bulk_create(
+    db: AsyncSession,
+    model,
+    name_key: str,
+    parent_key: str,
+    parent_model,
+    items: list[dict],
+    metric: str | None = None,
+) -> dict:
+    """
+    ساخت گروهی ردیف‌های «نام یکتا + FK والد» (شهر / روستا) در یک تراکنش.
+    وجود والدها و تکراری بودن نام‌ها هر کدام با یک کوئری IN بررسی می‌شود؛ نتیجه‌ی هر آیتم
+    به ترتیب ورودی برمی‌گردد (created / invalid / duplicate / exists / parent_not_found).
+    metric: شمارش stat_counts که به ازای هر ردیف ساخته‌شده برای والدش بالا می‌رود.
+    """
+    name_col = getattr(model, name_key)
+    results: list[dict | None] = [None] * len(items)
+
+    def fail(index: int, status: str, detail: str) -> None:
+        results[index] = {"index": index, "status": status, "id": None, "detail": detail}
+
+    first_index: dict[str, int] = {}
+    candidates = []
+    for index, item in enumerate(items):
+        name = (item[name_key] or "").strip()
+        if not name:
+            fail(index, "invalid", f"{name_key} is required")
+        elif name in first_index:
+            fail(index, "duplicate", f"Same {name_key} as item {first_index[name]}")
+        else:
+            first_index[name] = index
+            candidates.append((index, name, item[parent_key]))
+
+    parents = await _existing(db, parent_model.id, {parent_id for _, _, parent_id in candidates})
+    existing_names = await _existing(db, name_col, first_index)
+
+    fresh = []
+    for index, name, parent_id in candidates:
+        if parent_id not in parents:
+            fail(index, "parent_not_found", f"{parent_model.__name__} {parent_id} not found")
+        elif name in existing_names:
+            fail(index, "exists", f"{model.__name__} already exists")
+        else:
+            fresh.append((index, {name_key: name, parent_key: parent_id}))
+
+    inserted = []
+    if fresh:
+        try:
+            # executemany -> درایور MySQL آن را به INSERT چند ردیفی تبدیل می‌کند
+            for start in range(0, len(fresh), settings.BULK_CREATE_BATCH_SIZE):
+                await db.execute(insert(model), [values for _, values in fresh[start:start + settings.BULK_CREATE_BATCH_SIZE]])
+            inserted = fresh
+        except IntegrityError:
+            # insert هم‌زمان از جای دیگر یا نام‌هایی که فقط در collation دیتابیس برابرند؛
+            # ردیف‌ها تکی با savepoint در همان تراکنش insert می‌شوند تا آیتم مقصر مشخص شود
+            await db.rollback()
+            for index, values in fresh:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(insert(model).values(**values))
+                    inserted.append((index, values))
+                except IntegrityError as e:
+                    # والدی که بعد از چک بالا هم‌زمان حذف شده FK را می‌شکند، نه یکتایی را
+                    kind = integrity_kind(e)
+                    if kind == "duplicate":
+                        fail(index, "exists", f"{model.__name__} already exists")
+                    elif kind == "missing_parent":
+                        fail(index, "parent_not_found", f"{parent_model.__name__} {values[parent_key]} not found")
+                    else:
+                        raise
+
+    if inserted:
+        # executemany در MySQL id ها را برنمی‌گرداند؛ با نام (یکتا) خوانده می‌شوند
+        names = [values[name_key] for _, values in inserted]
+        ids = {}
+        for start in range(0, len(names), settings.LOOKUP_CHUNK_SIZE):
+            chunk = names[start:start + settings.LOOKUP_CHUNK_SIZE]
+            ids.update((await db.execute(select(name_col, model.id).where(name_col.in_(chunk)))).all())
+        if metric:
+            for parent_id, created in Counter(values[parent_key] for _, values in inserted).items():
+                stat_counts.add(db, metric, parent_id, created)
+        await db.commit()
+        for index, values in inserted:
+            results[index] = {"index": index, "status": "created", "id": ids.get(values[name_key]), "detail": None}
+
+    return {"created": len(inserted), "failed": len(items) - len(inserted), "results": results}
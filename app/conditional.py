@@ -0,0 +1,86 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+# GET شرطی برای endpointهایی که داشبوردها مرتب poll می‌کنند. ETag / Last-Modified از
+# table_version ساخته می‌شود (یک lookup روی کلید اصلی) و اگر If-None-Match / If-Modified-Since
+# هنوز معتبر باشد 304 برمی‌گردد، قبل از count و کوئری صفحه و serialize.
+# private: پاسخ‌ها پشت احراز هویت‌اند؛ no-cache: کلاینت هر بار باید revalidate کند.
+CACHE_CONTROL = "private, no-cache"
+
+
+class Conditional:
+    __slots__ = ("etag", "last_modified", "not_modified")
+
+    def __init__(self, etag: str, last_modified: str | None, not_modified: bool):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+    def apply(self, response: Response) -> Response:
+        response.headers["ETag"] = self.etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        if self.last_modified:
+            response.headers["Last-Modified"] = self.last_modified
+        return response
+
+    def not_modified_response(self) -> Response:
+        return self.apply(Response(status_code=304))
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # مقایسه‌ی weak (RFC 9110): پیشوند W/ نادیده گرفته می‌شود
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_written: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_written.replace(microsecond=0) <= since
+
+
+async def evaluate(request: Request, db: AsyncSession, *tables: str) -> Conditional:
+    """tables: همه‌ی جدول‌هایی که پاسخ از آن‌ها خوانده می‌شود."""
+    rows = (
+        await db.execute(
+            select(models.TableVersion.table_name, models.TableVersion.version, models.TableVersion.updated_at).where(
+                models.TableVersion.table_name.in_(tables)
+            )
+        )
+    ).all()
+    found = {row.table_name: row for row in rows}
+
+    # پاسخ به query string (صفحه، sort، search ...) هم بستگی دارد
+    state = ",".join(f"{t}:{found[t].version if t in found else 0}" for t in tables)
+    digest = hashlib.blake2b(f"{state}|{request.url.path}?{request.url.query}".encode(), digest_size=12).hexdigest()
+    etag = f'W/"{digest}"'
+
+    written = [row.updated_at for row in rows]
+    last_written = max(written).replace(tzinfo=timezone.utc) if written else None
+    last_modified = None
+    # دقت Last-Modified ثانیه است: اگر آخرین نوشتن در همین ثانیه بوده، نوشتن بعدی هم ممکن است
+    # در همین ثانیه باشد و If-Modified-Since آن را نبیند؛ پس تا گذشتن ثانیه فرستاده نمی‌شود
+    if last_written and last_written.replace(microsecond=0) < datetime.now(timezone.utc).replace(microsecond=0):
+        last_modified = format_datetime(last_written, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # وقتی If-None-Match هست، If-Modified-Since نادیده گرفته می‌شود
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_written))
+    return Conditional(etag, last_modified, not_modified)
@@ -1,6 +1,16 @@
 from pydantic_settings import BaseSettings
+from sqlalchemy.engine import make_url
 from urllib.parse import quote_plus
 
+# درایور async متناظر هر دیتابیس برای DATABASE_URL
+_ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
 
 class Settings(BaseSettings):
     DB_HOST: str = "127.0.0.1"
@@ -8,6 +18,35 @@ class Settings(BaseSettings):
     DB_NAME: str = "havirkesht"
     DB_USER: str = "root"
     DB_PASSWORD: str = ""
+    # اگر تنظیم شود به جای DB_* استفاده می‌شود، مثلاً sqlite:///./bench.db برای بنچمارک
+    DATABASE_URL: str | None = None
+
+    # pool کانکشن‌ها (برای هر engine جدا: sync و async)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # ثانیه انتظار برای کانکشن آزاد
+    DB_POOL_RECYCLE: int = 1800  # کمتر از wait_timeout سرور MySQL
+    # بررسی زنده بودن کانکشن: pre_ping (هر checkout)، idle (فقط اگر بیشتر از
+    # DB_POOL_PING_IDLE_SECONDS بیکار مانده) یا none
+    DB_POOL_LIVENESS: str = "idle"
+    DB_POOL_PING_IDLE_SECONDS: int = 30
+
+    # read replicaها (اختیاری) برای GETها: آدرس‌ها مثل DATABASE_URL و با کاما جدا، مثلاً
+    # mysql+pymysql://ro:pw@10.0.0.2/havirkesht,mysql+pymysql://ro:pw@10.0.0.3/havirkesht
+    # یا برای تست محلی sqlite:///./replica1.db,sqlite:///./replica2.db (کپی فایل primary).
+    # replica وقتی در دسترس نباشد یا lag آن از DB_REPLICA_MAX_LAG_SECONDS بیشتر شود کنار گذاشته
+    # می‌شود. کلاینتی که چیزی نوشته تا DB_REPLICA_PIN_SECONDS از primary می‌خواند
+    # (read-your-writes)؛ این مقدار نباید از حداکثر lag مجاز کمتر باشد.
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_CHECK_SECONDS: int = 5
+    DB_REPLICA_MAX_LAG_SECONDS: int = 5
+    DB_REPLICA_PIN_SECONDS: int = 10
+
+    # آمار کوئری هر درخواست: هدرهای X-DB-*، لاگ کوئری کند (0 یعنی خاموش) و
+    # هشدار N+1 وقتی یک شکل کوئری در یک درخواست این تعداد بار تکرار شود (0 یعنی خاموش)
+    DB_QUERY_HEADERS: bool = True
+    DB_SLOW_QUERY_MS: int = 200
+    DB_REPEAT_WARN_THRESHOLD: int = 10
 
     # 1 یعنی فعلاً قفل (Auth) خاموش، 0 یعنی روشن
     DISABLE_AUTH: int = 1
@@ -21,15 +60,70 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
-    @property
-    def database_url(self) -> str:
+    # کش count برای include_total=estimate
+    COUNT_CACHE_TTL_SECONDS: int = 60
+    COUNT_CACHE_MAX_ENTRIES: int = 1024
+
+    # باید با ngram_token_size سرور MySQL یکی باشد (پیش‌فرض MySQL: 2)
+    SEARCH_NGRAM_TOKEN_SIZE: int = 2
+
+    # کش استان/شهر (برای تغییراتی که در worker دیگری انجام شده)
+    GEO_CACHE_TTL_SECONDS: int = 300
+
+    # هر چند ثانیه session های باطل‌شده، blacklist و نسخه‌ی توکن کاربران از دیتابیس همگام (و ردیف‌های منقضی پاک) شوند؛
+    # حداکثر تأخیر ابطال یک توکن در workerهای دیگر
+    BLACKLIST_SYNC_SECONDS: int = 30
+    # هر sync ردیف‌های blacklist / session های باطل‌شده‌ی این چند ثانیه قبل از sync قبلی را هم دوباره
+    # می‌خواند؛ باید از طولانی‌ترین فاصله‌ی نوشتن تا COMMIT یک ردیف blacklist / logout بیشتر باشد
+    BLACKLIST_SYNC_OVERLAP_SECONDS: int = 300
+
+    # executor مخصوص bcrypt: process (همه‌ی هسته‌ها) یا thread
+    HASH_EXECUTOR: str = "process"
+    HASH_WORKERS: int = 0  # 0 یعنی به تعداد هسته‌ها
+    HASH_MAX_PENDING: int = 64  # بیشتر از این در صف -> 503
+
+    # کش نتیجه‌ی احراز هویت access token ها
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+
+    # ورود گروهی فارمرها: تعداد ردیف در هر insert چندتایی و سقف خطاهای گزارش‌شده
+    FARMER_IMPORT_CHUNK_SIZE: int = 1000
+    FARMER_IMPORT_MAX_ERRORS: int = 1000
+
+    # خروجی جریانی: تعداد ردیفی که هر بار از cursor سمت سرور خوانده می‌شود
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # جستجوی گروهی (POST /farmer/lookup): اندازه‌ی هر IN و سقف تعداد کلید در یک درخواست
+    LOOKUP_CHUNK_SIZE: int = 1000
+    LOOKUP_MAX_KEYS: int = 50000
+
+    # ساخت گروهی شهر / روستا: سقف آیتم‌های هر درخواست و تعداد ردیف هر insert چندتایی
+    BULK_CREATE_MAX_ITEMS: int = 10000
+    BULK_CREATE_BATCH_SIZE: int = 1000
+
+    def _mysql_url(self, driver: str) -> str:
         pwd = quote_plus(self.DB_PASSWORD or "")
         user = quote_plus(self.DB_USER or "")
         return (
-            f"mysql+pymysql://{user}:{pwd}"
+            f"mysql+{driver}://{user}:{pwd}"
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
         )
 
+    @property
+    def database_url(self) -> str:
+        return self.DATABASE_URL or self._mysql_url("pymysql")
+
+    # همان دیتابیس با درایور async (برای AsyncSession)
+    @property
+    def async_database_url(self) -> str:
+        if not self.DATABASE_URL:
+            return self._mysql_url("aiomysql")
+        return _async_url(self.DATABASE_URL)
+
+    @property
+    def replica_async_urls(self) -> list[str]:
+        return [_async_url(u.strip()) for u in self.DB_REPLICA_URLS.split(",") if u.strip()]
+
     class Config:
         env_file = ".env"
 
@@ -1,10 +1,63 @@
+from contextlib import asynccontextmanager
+
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
+from . import pool_stats, query_stats, replicas, versions  # noqa: F401  (ثبت eventهای نسخه‌ی جداول روی Session)
+
+
+def _connect_args_for(url: str) -> dict:
+    # SQLite (DATABASE_URL بنچمارک): کانکشن بین threadها جابه‌جا می‌شود و نوشتن هم‌زمان باید منتظر قفل بماند
+    return {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+
+_connect_args = _connect_args_for(settings.database_url)
+
+# مسیر sync: برای اسکریپت‌ها و کارهای پس‌زمینه
+_sync_pool_stats = pool_stats.PoolStats()
+engine = create_engine(
+    settings.database_url, connect_args=_connect_args, **pool_stats.engine_options(QueuePool, _sync_pool_stats)
+)
+pool_stats.instrument("sync", engine, _sync_pool_stats)
+query_stats.instrument(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# مسیر async: routerها از این استفاده می‌کنند تا درخواست‌ها thread اشغال نکنند
+_async_pool_stats = pool_stats.PoolStats()
+async_engine = create_async_engine(
+    settings.async_database_url,
+    connect_args=_connect_args,
+    **pool_stats.engine_options(AsyncAdaptedQueuePool, _async_pool_stats),
+)
+pool_stats.instrument("async", async_engine.sync_engine, _async_pool_stats)
+query_stats.instrument(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+# خواندن از primary وقتی replica در کار نیست (همان کانکشن‌ها، فقط بدون اجازه‌ی نوشتن)
+ReadSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False, info={"read_only": True}
+)
+
+# read replicaها (DB_REPLICA_URLS): هر کدام engine و pool جدای خودشان را دارند
+for _index, _url in enumerate(settings.replica_async_urls, start=1):
+    _name = f"replica-{_index}"
+    _stats = pool_stats.PoolStats()
+    _engine = create_async_engine(
+        _url, connect_args=_connect_args_for(_url), **pool_stats.engine_options(AsyncAdaptedQueuePool, _stats)
+    )
+    pool_stats.instrument(_name, _engine.sync_engine, _stats)
+    query_stats.instrument(_engine.sync_engine)
+    replicas.register(
+        _name,
+        _engine,
+        async_sessionmaker(
+            bind=_engine, autoflush=False, expire_on_commit=False, info={"read_only": True, "replica": _name}
+        ),
+    )
+
 
 class Base(DeclarativeBase):
     pass
@@ -16,3 +69,57 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# replica هر درخواست یک بار انتخاب و روی request.state نگه داشته می‌شود تا session وابستگی
+# get_read_db و session جریانی خروجی (read_session_factory) از یک دیتابیس بخوانند
+_UNCHOSEN = object()
+
+
+def _request_replica(request: Request):
+    replica = getattr(request.state, "db_replica", _UNCHOSEN)
+    if replica is _UNCHOSEN:
+        replica = replicas.choose(request)
+        request.state.db_replica = replica
+    return replica
+
+
+async def _open_read_session(request: Request) -> AsyncSession:
+    # session فقط‌خواندنی روی replica این درخواست؛ اگر کانکشن replica گرفته نشود از primary،
+    # و بقیه‌ی همین درخواست (مثلاً بدنه‌ی خروجی) هم دیگر سراغ آن replica نمی‌رود
+    replica = _request_replica(request)
+    if replica is not None:
+        db = replica.sessionmaker()
+        try:
+            await db.connection()
+            return db
+        except (DBAPIError, PoolTimeoutError, OSError) as e:
+            await db.close()
+            replicas.failed(replica, e)
+            request.state.db_replica = None
+    return ReadSessionLocal()
+
+
+def read_session_factory(request: Request):
+    """
+    session خواندن برای بدنه‌ی جریانی این درخواست (بعد از بسته شدن session وابستگی باز می‌شود):
+    همان replica که get_read_db انتخاب کرده، با همان fallback به primary.
+    """
+
+    @asynccontextmanager
+    async def open_session():
+        async with await _open_read_session(request) as db:
+            yield db
+
+    return open_session
+
+
+async def get_read_db(request: Request):
+    # برای GETها
+    async with await _open_read_session(request) as db:
+        yield db
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, versions
+from .db import AsyncSessionLocal
+from .config import settings
+
+# کش درون‌پردازه‌ای استان/شهر. داده کوچک است و به‌ندرت تغییر می‌کند، پس کل آن
+# را نگه می‌داریم و با عوض شدن نسخه‌ی جدول‌ها (بعد از هر commit) دوباره می‌خوانیم.
+# TTL برای وقتی است که نوشتن در worker دیگری انجام شده باشد.
+_TABLES = ("province", "city")
+
+
+class GeoSnapshot:
+    __slots__ = ("version", "loaded_at", "provinces", "cities", "cities_by_province")
+
+    def __init__(self, version, provinces, cities):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.provinces: dict[int, str] = provinces  # id -> province
+        self.cities: dict[int, tuple[str, int]] = cities  # id -> (city, province_id)
+        self.cities_by_province: dict[int, list[int]] = {}
+        for city_id, (_, province_id) in cities.items():
+            self.cities_by_province.setdefault(province_id, []).append(city_id)
+
+
+_lock = asyncio.Lock()
+_snapshot: GeoSnapshot | None = None
+_stale = False
+
+
+def _current_version() -> tuple:
+    return tuple(versions.get(t) for t in _TABLES)
+
+
+async def _load(db: AsyncSession) -> GeoSnapshot:
+    if db.info.get("replica"):
+        # نسخه‌ها بعد از commit روی primary بالا می‌روند؛ snapshot خوانده‌شده از replica عقب‌مانده
+        # با نسخه‌ی جدید برچسب می‌خورد و تا TTL کهنه می‌ماند، پس کش همیشه از primary پر می‌شود
+        async with AsyncSessionLocal() as primary:
+            return await _load(primary)
+    version = _current_version()
+    provinces = dict((await db.execute(select(models.Province.id, models.Province.province))).all())
+    cities = {
+        r.id: (r.city, r.province_id)
+        for r in await db.execute(select(models.City.id, models.City.city, models.City.province_id))
+    }
+    return GeoSnapshot(version, provinces, cities)
+
+
+def _is_fresh(snap: GeoSnapshot | None) -> bool:
+    return (
+        snap is not None
+        and not _stale
+        and snap.version == _current_version()
+        and time.monotonic() - snap.loaded_at <= settings.GEO_CACHE_TTL_SECONDS
+    )
+
+
+async def snapshot(db: AsyncSession) -> GeoSnapshot:
+    global _snapshot, _stale
+    snap = _snapshot
+    if not _is_fresh(snap):
+        async with _lock:
+            snap = _snapshot
+            if not _is_fresh(snap):
+                _stale = False
+                snap = _snapshot = await _load(db)
+    return snap
+
+
+def invalidate() -> None:
+    global _stale
+    _stale = True
+
+
+async def province_name(db: AsyncSession, province_id: int) -> str | None:
+    name = (await snapshot(db)).provinces.get(province_id)
+    if name is None:
+        # شاید در worker دیگری ساخته شده باشد
+        name = await db.scalar(select(models.Province.province).where(models.Province.id == province_id))
+        if name is not None:
+            invalidate()
+    return name
+
+
+async def city(db: AsyncSession, city_id: int) -> tuple[str, int] | None:
+    row = (await snapshot(db)).cities.get(city_id)
+    if row is None:
+        found = (
+            await db.execute(select(models.City.city, models.City.province_id).where(models.City.id == city_id))
+        ).first()
+        if found is not None:
+            invalidate()
+            row = (found.city, found.province_id)
+    return row
+
+
+async def city_names(db: AsyncSession, city_ids) -> dict[int, str]:
+    # نام چند شهر؛ شهرهایی که در کش نیستند تکی از دیتابیس خوانده می‌شوند
+    cities = (await snapshot(db)).cities
+    names = {}
+    for cid in set(city_ids):
+        row = cities.get(cid) or await city(db, cid)
+        names[cid] = row[0] if row else None
+    return names
+
+
+async def city_ids_of_province(db: AsyncSession, province_id: int) -> list[int]:
+    return (await snapshot(db)).cities_by_province.get(province_id, [])
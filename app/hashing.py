@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .config import settings
+
+# این ماژول عمداً سبک است (فقط passlib و config) چون در processهای worker هم import می‌شود
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def bcrypt_hash(raw: str) -> str:
+    return pwd_context.hash(raw)
+
+
+def bcrypt_verify(raw: str, hashed: str) -> bool:
+    return pwd_context.verify(raw, hashed)
+
+
+# --------- EXECUTOR ---------
+# bcrypt هر بار ۲۰۰ تا ۳۰۰ میلی‌ثانیه CPU می‌سوزاند. در executor جداگانه اجرا می‌شود تا
+# threadpool و event loop برای بقیه‌ی درخواست‌ها آزاد بمانند. تعداد کارهای در صف
+# محدود است و بیشتر از آن با 503 رد می‌شود.
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_pending = 0
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+    "latency_seconds_sum": 0.0,
+    "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+}
+
+
+def _workers() -> int:
+    return settings.HASH_WORKERS or os.cpu_count() or 1
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if settings.HASH_EXECUTOR == "process":
+                    _executor = ProcessPoolExecutor(
+                        max_workers=_workers(), mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="bcrypt")
+    return _executor
+
+
+def _observe(seconds: float, ok: bool) -> None:
+    with _stats_lock:
+        _stats["completed" if ok else "failed"] += 1
+        _stats["latency_seconds_sum"] += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                _stats["latency_buckets"][i] += 1
+                break
+        else:
+            _stats["latency_buckets"][-1] += 1
+
+
+async def run(fn, *args):
+    global _pending
+    with _stats_lock:
+        if _pending >= settings.HASH_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+        _stats["submitted"] += 1
+
+    started = time.perf_counter()
+    ok = False
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+        ok = True
+        return result
+    finally:
+        with _stats_lock:
+            _pending -= 1
+        _observe(time.perf_counter() - started, ok)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        count = _stats["completed"] + _stats["failed"]
+        buckets, cumulative = {}, 0
+        for bound, n in zip(list(LATENCY_BUCKETS) + ["+Inf"], _stats["latency_buckets"]):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        return {
+            "executor": settings.HASH_EXECUTOR,
+            "workers": _workers(),
+            "max_pending": settings.HASH_MAX_PENDING,
+            "queue_depth": _pending,
+            "submitted": _stats["submitted"],
+            "completed": _stats["completed"],
+            "failed": _stats["failed"],
+            "rejected": _stats["rejected"],
+            "latency_seconds_avg": round(_stats["latency_seconds_sum"] / count, 4) if count else 0.0,
+            "latency_seconds_sum": round(_stats["latency_seconds_sum"], 4),
+            "latency_seconds_buckets": buckets,
+        }
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            # کارهای در صف لغو می‌شوند ولی منتظر خروج workerها می‌مانیم تا process یتیم نماند
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,34 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+import jdatetime
+
+# تبدیل میلادی -> شمسی برای فیلدهای *_jalali.
+# بخش گران (محاسبه‌ی تاریخ شمسی) فقط به روز بستگی دارد و ردیف‌های یک لیست معمولاً
+# روزهای تکراری دارند؛ پس تبدیل روز cache می‌شود و ساعت فقط با f-string اضافه می‌شود.
+DATE_FORMAT = "%Y/%m/%d"
+
+
+@lru_cache(maxsize=8192)
+def _jalali_day(day: date) -> str:
+    return jdatetime.date.fromgregorian(date=day).strftime(DATE_FORMAT)
+
+
+def to_jalali_date(value: date | datetime | None) -> str | None:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    return _jalali_day(value)
+
+
+def to_jalali(dt: datetime | None) -> str | None:
+    """خروجی مثل jdatetime با فرمت "%Y/%m/%d %H:%M:%S"."""
+    if not dt:
+        return None
+    return f"{_jalali_day(dt.date())} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+
+
+def jalali_month(day: date) -> str:
+    """ماه شمسی به شکل "1405/07" (برای گروه‌بندی آمار ماهانه)."""
+    return _jalali_day(day)[:7]
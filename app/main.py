@@ -1,6 +1,13 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .config import settings
+from .db import AsyncSessionLocal
+from . import hashing, metrics, query_stats, replicas, security
 
 from .routers.users import router as users_router
 from .routers.auth import router as auth_router
@@ -9,8 +16,45 @@ from .routers.city import router as city_router
 from .routers.village import router as village_router
 from .routers import crop_year
 from app.routers import farmer
+from .routers.admin import router as admin_router
+from .routers.metrics import router as metrics_router
+from .routers.stats import router as stats_router
+
+logger = logging.getLogger(__name__)
+
+
+async def _sync_revocations_once():
+    # session های logout شده، blacklist قدیمی و نسخه‌ی توکن کاربران (ابطال‌هایی که در workerهای دیگر انجام شده)
+    try:
+        async with AsyncSessionLocal() as db:
+            await security.refresh_revoked_sessions(db)
+            await security.refresh_blacklist(db)
+            await security.refresh_token_versions(db)
+    except Exception:
+        logger.exception("token revocation sync failed")
+
+
+async def _revocation_sync_loop():
+    while True:
+        await asyncio.sleep(settings.BLACKLIST_SYNC_SECONDS)
+        await _sync_revocations_once()
 
-app = FastAPI(title="Havirkesht API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # بار اول session های باطل‌شده، blacklist و نسخه‌های توکن را قبل از پذیرفتن درخواست‌ها در حافظه بارگذاری می‌کند
+    await _sync_revocations_once()
+    # replicaها تا اولین health check موفق در چرخش نیستند
+    await replicas.check_all()
+    tasks = [asyncio.create_task(_revocation_sync_loop()), asyncio.create_task(replicas.health_loop())]
+    yield
+    for task in tasks:
+        task.cancel()
+    hashing.shutdown()
+    metrics.mark_process_dead()
+
+
+app = FastAPI(title="Havirkesht API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,8 +63,18 @@ app.add_middleware(
     allow_methods=["*"],
     #["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # مجاز بودن این متدها
     allow_headers=["*"],
+    expose_headers=["X-DB-Query-Count", "X-DB-Time-Ms"],
 )
 
+app.add_middleware(query_stats.QueryStatsMiddleware)
+
+# read-your-writes: کلاینتی که نوشته مدتی از primary می‌خواند
+if replicas.enabled():
+    app.add_middleware(replicas.PrimaryPinMiddleware)
+
+# بیرونی‌ترین لایه تا زمان کل پاسخ (شامل CORS و streaming) اندازه گرفته شود
+app.add_middleware(metrics.MetricsMiddleware, router=app.router)
+
 
 app.include_router(users_router)
 app.include_router(auth_router)
@@ -29,3 +83,6 @@ app.include_router(city_router)
 app.include_router(village_router)
 app.include_router(crop_year.router)
 app.include_router(farmer.router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
+app.include_router(stats_router)
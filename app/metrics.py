@@ -0,0 +1,112 @@
+import os
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from prometheus_client import REGISTRY, generate_latest
+
+# متریک‌های Prometheus برای هر route.
+# با چند worker (uvicorn --workers / gunicorn) باید PROMETHEUS_MULTIPROC_DIR قبل از
+# اجرای برنامه به یک پوشه‌ی خالی و مشترک اشاره کند؛ prometheus_client در آن حالت
+# مقدارها را در فایل‌های mmap هر process می‌نویسد و /metrics همه را جمع می‌زند.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# فقط قالب route برچسب می‌شود (/farmer/{national_id}) تا تعداد سری‌ها محدود بماند
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency (until the response is fully sent)", ["method", "route"]
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_progress", "HTTP requests being processed", ["method", "route"], multiprocess_mode="livesum"
+)
+
+# child هر ترکیب برچسب یک بار ساخته می‌شود؛ labels() در هر درخواست lock و ساخت tuple دارد
+_route_children: dict = {}
+_request_children: dict = {}
+
+
+def _route_metrics(method: str, route: str):
+    children = _route_children.get((method, route))
+    if children is None:
+        children = _route_children[(method, route)] = (
+            IN_FLIGHT.labels(method, route),
+            LATENCY.labels(method, route),
+        )
+    return children
+
+
+def _requests_counter(method: str, route: str, status: int):
+    child = _request_children.get((method, route, status))
+    if child is None:
+        child = _request_children[(method, route, status)] = REQUESTS.labels(method, route, str(status))
+    return child
+
+
+class MetricsMiddleware:
+    """middleware خام ASGI (بدون BaseHTTPMiddleware) تا سربار و مشکل streaming نداشته باشد."""
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+        self._table = None
+
+    def _route_template(self, scope) -> str:
+        # routing هنوز انجام نشده، پس برای gauge در حال اجرا خودمان route را پیدا می‌کنیم.
+        # route.matches() کامل (تبدیل پارامترها، ساخت scope) گران است؛ اینجا فقط مسیر
+        # به ترتیب routeها مقایسه می‌شود: ثابت‌ها با ==، پارامتردارها با regex خودشان.
+        if self._table is None:
+            self._table = [
+                (route.path, None if "{" in route.path else route.path, route.path_regex)
+                for route in self.router.routes
+                if hasattr(route, "path_regex")
+            ]
+        path = scope["path"]
+        for template, static, regex in self._table:
+            if static is not None:
+                if static == path:
+                    return template
+            elif regex.match(path):
+                return template
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        in_flight, latency = _route_metrics(method, route)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency.observe(time.perf_counter() - started)
+            in_flight.dec()
+            _requests_counter(method, route, status_code).inc()
+
+
+def render() -> bytes:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    # gauge های livesum این process از مجموع حذف شوند
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
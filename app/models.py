@@ -1,8 +1,12 @@
-from sqlalchemy import BigInteger, Integer, String, Boolean, TIMESTAMP, ForeignKey, DateTime, Column, func
+from sqlalchemy import BigInteger, Integer, String, Boolean, TIMESTAMP, ForeignKey, DateTime, Column, Index, event, func
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 from datetime import datetime
 
+# در SQLite فقط INTEGER PRIMARY KEY خودکار افزایش می‌یابد (برای بنچمارک/تست روی SQLite)
+BigIntPK = BigInteger().with_variant(Integer, "sqlite")
+
 
 class Role(Base):
     __tablename__ = "roles"
@@ -11,10 +15,20 @@ class Role(Base):
     name: Mapped[str | None] = mapped_column(String(255))
 
 
+# ایندکس‌های (ستون، id) برای sort_map روترها؛ باید با migrations/0004_list_sort_indexes هم‌خوان بماند
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_email", "email", "id"),
+        Index("ix_users_fullname", "fullname", "id"),
+        Index("ix_users_phone_number", "phone_number", "id"),
+        Index("ix_users_role_id", "role_id", "id"),
+        Index("ix_users_disabled", "disabled", "id"),
+        Index("ix_users_created_at", "created_at", "id"),
+        Index("ix_users_updated_at", "updated_at", "id"),
+    )
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True)
 
     username: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
     password: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -41,17 +55,41 @@ class User(Base):
 class TokenBlacklist(Base):
     __tablename__ = "token_blacklist"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
-    token = Column(String(255), nullable=False, unique=True)
-    blacklisted_at = Column(DateTime, server_default=func.now())
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
+    # به‌جای خود JWT فقط jti و زمان انقضا نگه داشته می‌شود
+    jti = Column(String(36), nullable=False, unique=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    blacklisted_at = Column(DateTime, server_default=func.now(), index=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 
+# نسخه‌ی توکن هر کاربر؛ توکن‌هایی که claim «tv» آن‌ها کمتر باشد باطل‌اند (app/security.py)
+class UserTokenVersion(Base):
+    __tablename__ = "user_token_version"
+
+    user_id = Column(BigIntPK, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+
+# هر login یک session (claim «sid» در access / refresh token). logout فقط revoked_at همین ردیف را
+# پر می‌کند و ردیف جدیدی نمی‌سازد؛ ردیف‌ها بعد از expires_at (انقضای آخرین refresh token) پاک می‌شوند.
+class UserSession(Base):
+    __tablename__ = "user_session"
+
+    sid = Column(String(36), primary_key=True)
+    user_id = Column(BigIntPK, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+
 class Province(Base):
     __tablename__ = "province"
+    __table_args__ = (Index("ix_province_created_at", "created_at", "id"),)
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True)
     province: Mapped[str | None] = mapped_column(String(255), unique=True)
 
     created_at: Mapped[object | None] = mapped_column(
@@ -66,8 +104,12 @@ class Province(Base):
 
 class City(Base):
     __tablename__ = "city"
+    __table_args__ = (
+        Index("ix_city_province_id", "province_id", "id"),
+        Index("ix_city_created_at", "created_at", "id"),
+    )
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     city = Column(String(255), unique=True, nullable=False)
 
     province_id = Column(BigInteger, ForeignKey("province.id"), nullable=False)
@@ -79,8 +121,12 @@ class City(Base):
 
 class Village(Base):
     __tablename__ = "village"
+    __table_args__ = (
+        Index("ix_village_city_id", "city_id", "id"),
+        Index("ix_village_created_at", "created_at", "id"),
+    )
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     village = Column(String(255), nullable=False, unique=True)
 
     city_id = Column(BigInteger, ForeignKey("city.id"), nullable=False)
@@ -93,17 +139,33 @@ class Village(Base):
 class CropYear(Base):
     __tablename__ = "crop_year"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     crop_year_name = Column(String(255), unique=True)
     created_at = Column(DateTime, server_default=func.current_timestamp(), nullable=True)
 
 
+def _normalized_full_name(context) -> str:
+    # import داخل تابع: search.py خودش models را import می‌کند
+    from .search import normalize
+
+    return normalize(context.get_current_parameters()["full_name"])
+
+
 class Farmer(Base):
     __tablename__ = "farmer"
+    __table_args__ = (
+        # جستجوی نام روی نسخه‌ی یکسان‌سازی‌شده (app/search.py): MATCH ... AGAINST با ngram برای متن
+        # فارسی و LIKE پیشوندی برای توکن‌های کوتاه‌تر از ngram؛ باید با migrations/0008 هم‌خوان بماند
+        Index("ft_farmer_full_name_normalized", "full_name_normalized", mysql_prefix="FULLTEXT", mysql_with_parser="ngram"),
+        Index("ix_farmer_full_name_normalized", "full_name_normalized", "id"),
+    )
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     national_id = Column(String(20), unique=True, nullable=False)
     full_name = Column(String(255), nullable=False)
+    # normalize(full_name)؛ در INSERT (تکی، executemany، import) از default و در تغییر ORM از
+    # event پایین پر می‌شود. UPDATE مستقیم full_name باید این ستون را هم بنویسد.
+    full_name_normalized = Column(String(255), nullable=False, default=_normalized_full_name)
     father_name = Column(String(255), nullable=False)
     phone_number = Column(String(20), nullable=False)
     sheba_number_1 = Column(String(26), nullable=False)
@@ -112,4 +174,32 @@ class Farmer(Base):
     address = Column(String(255), nullable=False)
 
     created_at = Column(DateTime, server_default=func.current_timestamp(), nullable=True)
-    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp(), nullable=True,)
\ No newline at end of file
+    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp(), nullable=True,)
+
+
+@event.listens_for(Farmer.full_name, "set")
+def _sync_normalized_full_name(target, value, oldvalue, initiator):
+    from .search import normalize
+
+    target.full_name_normalized = normalize(value)
+
+
+# نسخه‌ی نوشتن هر جدول؛ در همان تراکنش نوشتن بالا می‌رود (app/versions.py) و ETag / Last-Modified
+# لیست‌ها از آن ساخته می‌شود (app/conditional.py)
+class TableVersion(Base):
+    __tablename__ = "table_version"
+
+    table_name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=False)
+
+
+# شمارش‌های تجمیعی (شهرهای هر استان، روستاهای هر شهر، ...)؛ در همان تراکنش ایجاد / حذف به‌روز
+# می‌شوند (app/stat_counts.py) و GET /stats/ از آن‌ها خوانده می‌شود
+class StatCount(Base):
+    __tablename__ = "stat_count"
+
+    metric = Column(String(32), primary_key=True)
+    bucket = Column(String(32), primary_key=True)  # id والد یا روز (YYYY-MM-DD)
+    total = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
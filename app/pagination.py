@@ -0,0 +1,159 @@
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from math import ceil
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select, text, tuple_
+
+from . import versions
+from .config import settings
+
+
+# cursor = فیلد مرتب‌سازی + مقدار آن + id آخرین ردیف صفحه (base64 برای opaque بودن)
+def encode_cursor(sort_key: str, value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    raw = json.dumps({"s": sort_key, "v": value, "i": row_id}, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        # JSON معتبر ولی با شکل دیگر (لیست، عدد، کلید ناقص) هم cursor نامعتبر است، نه 500
+        if not isinstance(data, dict):
+            raise TypeError("cursor is not an object")
+        cursor_sort, value, row_id = data["s"], data["v"], int(data["i"])
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+        elif not (value is None or isinstance(value, (str, int, float))):
+            raise TypeError("cursor value is not a scalar")
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # cursor فقط با همان sort_by / sort_order که ساخته شده معتبر است
+    if cursor_sort != sort_key:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by/sort_order")
+    return value, row_id
+
+
+def _is_nullable(col) -> bool:
+    return bool(getattr(getattr(col, "expression", col), "nullable", True))
+
+
+def _after_clause(col, id_col, value, row_id, descending: bool):
+    # MySQL در ASC مقدارهای NULL را اول و در DESC آخر می‌آورد
+    if col is id_col:
+        return id_col < row_id if descending else id_col > row_id
+
+    nullable = _is_nullable(col)
+    if descending:
+        if value is None:
+            return and_(col.is_(None), id_col < row_id)
+        clause = tuple_(col, id_col) < tuple_(value, row_id)
+        return or_(clause, col.is_(None)) if nullable else clause
+
+    if value is None:
+        return or_(col.is_not(None), and_(col.is_(None), id_col > row_id))
+    return tuple_(col, id_col) > tuple_(value, row_id)
+
+
+def keyset_select(stmt, *, col, id_col, descending: bool, sort_key: str, after: str | None, size: int):
+    """
+    صفحه‌بندی keyset: به‌جای offset از (مقدار مرتب‌سازی، id) آخرین ردیف استفاده می‌کند
+    تا هزینه‌ی صفحه‌ی N با صفحه‌ی اول برابر باشد. یک ردیف اضافه می‌خواند تا
+    keyset_trim بفهمد صفحه‌ی بعدی وجود دارد یا نه.
+    """
+    if after:
+        value, row_id = decode_cursor(after, sort_key)
+        stmt = stmt.where(_after_clause(col, id_col, value, row_id, descending))
+
+    order = [col.desc() if descending else col.asc()]
+    if col is not id_col:
+        order.append(id_col.desc() if descending else id_col.asc())
+    return stmt.order_by(*order).limit(size + 1)
+
+
+def keyset_trim(rows: list, *, size: int, sort_key: str, key):
+    """key(row) باید (مقدار ستون مرتب‌سازی، id) را برگرداند."""
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        value, row_id = key(rows[-1])
+        next_cursor = encode_cursor(sort_key, value, row_id)
+    return rows, next_cursor
+
+
+# --------- TOTAL / PAGES ---------
+# include_total:
+#   exact    -> همان count(*) همیشگی
+#   estimate -> آمار جدول (MySQL، بدون فیلتر) یا count کش‌شده به ازای هر فیلتر
+#   false    -> اصلاً count زده نمی‌شود (total و pages برابر null)
+INCLUDE_TOTAL_PATTERN = "^(false|exact|estimate)$"
+
+_count_cache: OrderedDict = OrderedDict()
+_count_lock = threading.Lock()
+
+
+def page_count(total: int | None, size: int) -> int | None:
+    if total is None:
+        return None
+    return ceil(total / size) if total else 0
+
+
+def count_of(stmt):
+    return select(func.count()).select_from(stmt.order_by(None).subquery())
+
+
+async def _table_rows_estimate(db, table: str) -> int | None:
+    if db.get_bind().dialect.name != "mysql":
+        return None
+    # MySQL 8 آمار information_schema.tables را تا information_schema_stats_expiry (پیش‌فرض 24 ساعت)
+    # کش می‌کند؛ با 0 مقدار فعلی آمار InnoDB خوانده می‌شود. فقط روی همین کانکشن است و برای
+    # کوئری‌های دیگر اثری جز تازه بودن آمار information_schema ندارد
+    await db.execute(text("SET SESSION information_schema_stats_expiry = 0"))
+    return await db.scalar(
+        text(
+            "SELECT table_rows FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = :t"
+        ),
+        {"t": table},
+    )
+
+
+async def resolve_total(db, mode: str, *, table: str, filters: tuple, count_stmt) -> int | None:
+    """
+    count_stmt کوئری count دقیق است (معمولاً count_of(stmt)).
+    filters کلید کش است (مقدار فیلترهای همین درخواست).
+    """
+    if mode == "false":
+        return None
+    if mode == "exact":
+        return await db.scalar(count_stmt) or 0
+
+    if not any(f is not None for f in filters):
+        estimate = await _table_rows_estimate(db, table)
+        if estimate is not None:
+            return int(estimate)
+
+    key = (table, filters)
+    version = versions.get(table)
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if hit and hit[0] == version and hit[1] > now:
+            _count_cache.move_to_end(key)
+            return hit[2]
+
+    total = await db.scalar(count_stmt) or 0
+    with _count_lock:
+        _count_cache[key] = (version, now + settings.COUNT_CACHE_TTL_SECONDS, total)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > settings.COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.popitem(last=False)
+    return total
@@ -0,0 +1,162 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+# آمار pool کانکشن‌ها از eventهای SQLAlchemy و زمان انتظار checkout از subclass خود pool
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+_COUNTERS = (
+    "checkouts", "checkins", "timeouts",
+    "connects", "closes", "invalidations", "liveness_pings", "liveness_failures",
+)
+
+
+class PoolStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def incr(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def observe_wait(self, seconds: float) -> None:
+        with self.lock:
+            self.wait_sum += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            count = sum(self.wait_buckets)
+            buckets, cumulative = {}, 0
+            for bound, n in zip(list(WAIT_BUCKETS) + ["+Inf"], self.wait_buckets):
+                cumulative += n
+                buckets[str(bound)] = cumulative
+            return {
+                **self.counters,
+                "checkout_wait_seconds_avg": round(self.wait_sum / count, 6) if count else 0.0,
+                "checkout_wait_seconds_max": round(self.wait_max, 6),
+                "checkout_wait_seconds_buckets": buckets,
+            }
+
+
+_engines: dict[str, tuple[Engine, PoolStats]] = {}
+
+
+def pool_class(base, stats: PoolStats):
+    """
+    subclass pool که زمان گرفتن کانکشن (انتظار در صف + ساخت کانکشن جدید) را ثبت می‌کند.
+    recreate() (مثلاً بعد از dispose) از همین کلاس استفاده می‌کند، پس آمار گم نمی‌شود.
+    """
+
+    class InstrumentedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                stats.incr("timeouts")
+                raise
+            finally:
+                stats.observe_wait(time.perf_counter() - started)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def engine_options(base_pool, stats: PoolStats) -> dict:
+    return {
+        "poolclass": pool_class(base_pool, stats),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_LIVENESS == "pre_ping",
+    }
+
+
+def instrument(name: str, engine: Engine, stats: PoolStats) -> None:
+    """eventهای pool را روی engine (برای async: async_engine.sync_engine) ثبت می‌کند."""
+    _engines[name] = (engine, stats)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, record, proxy):
+        stats.incr("checkouts")
+        if settings.DB_POOL_LIVENESS != "idle":
+            return
+        last_used = record.info.get("last_used")
+        if last_used is None or time.monotonic() - last_used <= settings.DB_POOL_PING_IDLE_SECONDS:
+            return
+        # فقط کانکشنی که مدتی بیکار بوده ping می‌شود؛ DisconnectionError یعنی pool
+        # همین کانکشن را دور بیندازد و با کانکشن تازه دوباره امتحان کند
+        stats.incr("liveness_pings")
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            stats.incr("liveness_failures")
+            raise exc.DisconnectionError() from e
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, record):
+        stats.incr("checkins")
+        record.info["last_used"] = time.monotonic()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, record):
+        stats.incr("connects")
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_connection, record):
+        stats.incr("closes")
+
+    @event.listens_for(engine, "close_detached")
+    def _on_close_detached(dbapi_connection):
+        stats.incr("closes")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, record, exception):
+        stats.incr("invalidations")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_connection, record, exception):
+        stats.incr("invalidations")
+
+
+def stats() -> dict:
+    result = {}
+    for name, (engine, pool_stats) in _engines.items():
+        pool = engine.pool
+        live = {}
+        # فقط QueuePool این شمارنده‌ها را دارد
+        if hasattr(pool, "checkedout"):
+            live = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # QueuePool.overflow() یعنی «کانکشن‌های باز - pool_size» و تا پر شدن pool منفی است؛
+                # اینجا فقط کانکشن‌های اضافه بر pool_size (0 تا max_overflow) گزارش می‌شود
+                "overflow": max(pool.overflow(), 0),
+            }
+        result[name] = {
+            "pool": type(pool).__name__,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "timeout": settings.DB_POOL_TIMEOUT,
+            "recycle": settings.DB_POOL_RECYCLE,
+            "liveness": settings.DB_POOL_LIVENESS,
+            **live,
+            **pool_stats.snapshot(),
+        }
+    return result
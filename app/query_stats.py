@@ -0,0 +1,117 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+# شمارش کوئری‌ها و زمان دیتابیس هر درخواست با eventهای cursor روی engine.
+# contextvar در greenlet مربوط به AsyncSession و در threadpool (کپی context) هم دیده می‌شود.
+logger = logging.getLogger("app.sql")
+
+_PLACEHOLDER = r"(?:%s|%\(\w+\)s|\?|:\w+)"
+# لیست‌های IN با طول‌های مختلف یک شکل حساب شوند
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestQueries:
+    __slots__ = ("path", "count", "seconds", "shapes")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+
+_current: ContextVar[RequestQueries | None] = ContextVar("request_queries", default=None)
+
+
+def _shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _record(statement: str, seconds: float, executemany: bool, failed: bool = False) -> None:
+    current = _current.get()
+    if settings.DB_SLOW_QUERY_MS and seconds * 1000 >= settings.DB_SLOW_QUERY_MS:
+        # پارامترها عمداً لاگ نمی‌شوند (کد ملی، شبا، رمز عبور ...)
+        logger.warning(
+            "slow query %.1f ms%s%s [%s]: %s",
+            seconds * 1000,
+            " (executemany)" if executemany else "",
+            " (failed)" if failed else "",
+            current.path if current else "-",
+            _WHITESPACE.sub(" ", statement)[:1000],
+        )
+
+    if current is None:
+        return
+    current.count += 1
+    current.seconds += seconds
+
+    threshold = settings.DB_REPEAT_WARN_THRESHOLD
+    if threshold:
+        shape = _shape(statement)
+        current.shapes[shape] += 1
+        if current.shapes[shape] == threshold:
+            logger.warning(
+                "possible N+1: statement repeated %d times in %s: %s", threshold, current.path, shape[:1000]
+            )
+
+
+def instrument(engine: Engine) -> None:
+    """روی engine (برای async: async_engine.sync_engine) ثبت می‌شود."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        _record(statement, time.perf_counter() - started, executemany)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        # کوئری خطا داد و after_cursor_execute صدا زده نمی‌شود؛ زمانش هم شمرده می‌شود چون
+        # deadlock / lock wait timeout / خطای قید (مسیر insert-first) معمولاً گران‌ترین کوئری‌ها هستند
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            started = stack.pop()
+            if context.statement is not None:
+                executemany = bool(context.execution_context and context.execution_context.executemany)
+                _record(context.statement, time.perf_counter() - started, executemany, failed=True)
+
+
+class QueryStatsMiddleware:
+    """X-DB-Query-Count و X-DB-Time-Ms را به پاسخ اضافه می‌کند (برای StreamingResponse فقط تا شروع پاسخ)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueries(f'{scope["method"]} {scope["path"]}')
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.DB_QUERY_HEADERS:
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-db-query-count", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.seconds * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+# مسیریابی خواندن‌های GET به read replicaها. engine هر replica در db.py ساخته و اینجا ثبت
+# می‌شود؛ این ماژول انتخاب round-robin بین replicaهای سالم، health check دوره‌ای (در دسترس
+# بودن و lag در MySQL) و pin کردن کلاینتی که تازه نوشته به primary را انجام می‌دهد.
+# هر جا replica سالمی نباشد خواندن از primary انجام می‌شود.
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "db_pin"
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class Replica:
+    def __init__(self, name: str, engine, sessionmaker):
+        self.name = name
+        self.engine = engine  # AsyncEngine
+        self.sessionmaker = sessionmaker
+        self.url = make_url(engine.url).render_as_string(hide_password=True)
+        # تا اولین health check موفق از این replica خوانده نمی‌شود
+        self.healthy = False
+        self.lag_seconds: float | None = None
+        self.last_error: str | None = None
+        self.checked_at: float | None = None
+        self.served = 0
+        self.failures = 0
+
+    def mark_down(self, reason: str) -> None:
+        if self.healthy:
+            logger.warning("replica %s taken out of rotation: %s", self.name, reason)
+        self.healthy = False
+        self.last_error = reason
+        self.failures += 1
+
+
+_replicas: list[Replica] = []
+_lock = threading.Lock()
+_next = 0
+_primary_reads = {"pinned": 0, "unavailable": 0, "failed": 0}
+
+
+def register(name: str, engine, sessionmaker) -> None:
+    _replicas.append(Replica(name, engine, sessionmaker))
+
+
+def enabled() -> bool:
+    return bool(_replicas)
+
+
+# --------- READ-YOUR-WRITES ---------
+def pinned(request) -> bool:
+    value = request.cookies.get(PIN_COOKIE)
+    if value is None:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+class PrimaryPinMiddleware:
+    """بعد از هر درخواست نوشتنی موفق، cookie ای می‌گذارد که تا DB_REPLICA_PIN_SECONDS خواندن‌ها را به primary ببرد."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                pin = settings.DB_REPLICA_PIN_SECONDS
+                cookie = f"{PIN_COOKIE}={time.time() + pin:.3f}; Max-Age={pin}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# --------- SELECTION ---------
+def choose(request) -> Replica | None:
+    """replica بعدی برای این درخواست، یا None یعنی primary."""
+    global _next
+    if not _replicas:
+        return None
+    if pinned(request):
+        _count_primary("pinned")
+        return None
+    healthy = [r for r in _replicas if r.healthy]
+    if not healthy:
+        _count_primary("unavailable")
+        return None
+    with _lock:
+        _next += 1
+        replica = healthy[_next % len(healthy)]
+        replica.served += 1
+    return replica
+
+
+def _count_primary(reason: str) -> None:
+    with _lock:
+        _primary_reads[reason] += 1
+
+
+def failed(replica: Replica, error: Exception) -> None:
+    # کانکشن گرفتن از replica شکست خورد: همین درخواست از primary خوانده می‌شود
+    # و replica تا health check موفق بعدی کنار می‌رود
+    replica.mark_down(f"{type(error).__name__}: {error}")
+    _count_primary("failed")
+
+
+# --------- HEALTH CHECK ---------
+def _mysql_lag(conn) -> float | None:
+    try:
+        row = conn.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+        key = "Seconds_Behind_Source"
+    except DBAPIError:
+        # MySQL قدیمی‌تر از 8.0.22
+        row = conn.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+        key = "Seconds_Behind_Master"
+    if row is None:
+        # instance مستقل (مثلاً دیتابیس دوم برای تست محلی)، نه replica
+        return 0.0
+    # None یعنی replication متوقف شده است
+    return row[key]
+
+
+async def _check(replica: Replica) -> None:
+    try:
+        async with replica.engine.connect() as conn:
+            if conn.dialect.name == "mysql":
+                lag = await conn.run_sync(_mysql_lag)
+            else:
+                await conn.exec_driver_sql("SELECT 1")
+                lag = 0.0
+    except Exception as e:
+        replica.mark_down(f"{type(e).__name__}: {e}")
+        return
+    finally:
+        replica.checked_at = time.time()
+
+    replica.lag_seconds = lag
+    if lag is None:
+        replica.mark_down("replication is not running")
+    elif lag > settings.DB_REPLICA_MAX_LAG_SECONDS:
+        replica.mark_down(f"lag {lag}s > {settings.DB_REPLICA_MAX_LAG_SECONDS}s")
+    else:
+        if not replica.healthy:
+            logger.info("replica %s back in rotation (lag %ss)", replica.name, lag)
+        replica.healthy = True
+        replica.last_error = None
+
+
+async def check_all() -> None:
+    await asyncio.gather(*(_check(r) for r in _replicas))
+
+
+async def health_loop() -> None:
+    while _replicas:
+        await asyncio.sleep(settings.DB_REPLICA_CHECK_SECONDS)
+        await check_all()
+
+
+def stats() -> dict:
+    with _lock:
+        primary_reads = dict(_primary_reads)
+    return {
+        "pin_seconds": settings.DB_REPLICA_PIN_SECONDS,
+        "max_lag_seconds": settings.DB_REPLICA_MAX_LAG_SECONDS,
+        "primary_reads": primary_reads,
+        "replicas": [
+            {
+                "name": r.name,
+                "url": r.url,
+                "healthy": r.healthy,
+                "lag_seconds": r.lag_seconds,
+                "last_error": r.last_error,
+                "checked_at": r.checked_at,
+                "served": r.served,
+                "failures": r.failures,
+            }
+            for r in _replicas
+        ],
+    }
+
+
+# --------- READ-ONLY SESSIONS ---------
+# sessionهای get_read_db (replica یا primary) فقط برای خواندن‌اند؛ نوشتن از آن‌ها روی replica
+# یا خطا می‌دهد یا replication را خراب می‌کند، پس همین‌جا رد می‌شود
+@event.listens_for(Session, "do_orm_execute")
+def _reject_statement_writes(orm_execute_state):
+    if orm_execute_state.session.info.get("read_only") and (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        raise RuntimeError("write through a read-only session (get_read_db)")
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_flush_writes(session, flush_context, instances):
+    if session.info.get("read_only") and (session.new or session.dirty or session.deleted):
+        raise RuntimeError("write through a read-only session (get_read_db)")
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from .. import hashing, pool_stats, replicas
+from ..security import require_admin
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/hashing")
+async def hashing_stats():
+    # عمق صف، تعداد کارها و هیستوگرام latency مربوط به bcrypt
+    return hashing.stats()
+
+
+@router.get("/pool")
+async def pool_statistics():
+    # کانکشن‌های در حال استفاده/بیکار، هیستوگرام انتظار checkout و churn کانکشن‌ها
+    return pool_stats.stats()
+
+
+@router.get("/replicas")
+async def replica_statistics():
+    # سلامت و lag هر replica، تعداد خواندن‌های هر کدام و خواندن‌هایی که به primary رفتند (با دلیل)
+    return replicas.stats()
@@ -1,52 +1,61 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db import get_db
+from ..db import get_async_db
 from .. import models, schemas
 from ..security import (
-    verify_password,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
     decode_refresh_token,
-    blacklist_token,
+    current_token_version,
     is_blacklisted,
-    hash_password,
+    hash_password_async,
+    open_session,
+    extend_session,
+    logout_tokens,
+    revoke_tokens_of,
+    revoke_user_tokens,
     require_auth,
+    Principal,
 )
 
 router = APIRouter(tags=["Auth"])
 
 
 @router.post("/token", response_model=schemas.TokenResponse)
-def login_for_access_token(
+async def login_for_access_token(
     form: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(models.User).filter(models.User.username == form.username).first()
+    user = await db.scalar(select(models.User).where(models.User.username == form.username))
 
-    if not user or not verify_password(form.password, user.password):
+    if not user or not await verify_password_async(form.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
 
     if getattr(user, "disabled", False):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is disabled")
 
-    access_token = create_access_token(user.id)
-    refresh_token = create_refresh_token(user.id)
+    version = await current_token_version(db, user.id)
+    sid = await open_session(db, user.id)
+    access_token = create_access_token(user.id, version, sid)
+    refresh_token = create_refresh_token(user.id, version, sid)
 
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.post("/refresh-token", response_model=schemas.TokenResponse)
-def refresh_access_token(
+async def refresh_access_token(
     refresh_token: str = Query(..., description="refresh_token"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # مطابق Swagger: refresh_token در Query
-    if is_blacklisted(db, refresh_token):
+    data = decode_refresh_token(refresh_token)
+    if is_blacklisted(data):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token is blacklisted")
 
-    data = decode_refresh_token(refresh_token)
     if data.get("type") != "refresh":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
@@ -54,27 +63,31 @@ def refresh_access_token(
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    user = await db.get(models.User, int(user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     if getattr(user, "disabled", False):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is disabled")
 
-    # (اختیاری) می‌تونی رفرش قبلی رو بلاک کنی:
-    # blacklist_token(db, refresh_token)
+    # refresh token قبل از logout / تغییر رمز / غیرفعال شدن صادر شده
+    version = await current_token_version(db, user.id)
+    if data.get("tv", 0) < version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token has been revoked")
+
+    # session همین دستگاه ادامه پیدا می‌کند؛ refresh token قدیمی بدون sid یک session تازه می‌گیرد
+    sid = data.get("sid")
+    if sid is None:
+        sid = await open_session(db, user.id)
+    elif not await extend_session(db, sid, user.id):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token is blacklisted")
 
-    new_access = create_access_token(user.id)
-    new_refresh = create_refresh_token(user.id)
+    new_access = create_access_token(user.id, version, sid)
+    new_refresh = create_refresh_token(user.id, version, sid)
 
     return {"access_token": new_access, "refresh_token": new_refresh, "token_type": "bearer"}
 
 
-@router.post("/logout")
-def logout(
-    access_token: str | None = Query(default=None, description="access_token"),
-    refresh_token: str | None = Query(default=None, description="refresh_token"),
-    db: Session = Depends(get_db),
-):
+def _require_some_token(access_token: str | None, refresh_token: str | None) -> None:
     # طبق Swagger هر کدوم می‌تونه باشه، ولی حداقل یکی لازمه
     if not access_token and not refresh_token:
         raise HTTPException(
@@ -82,28 +95,55 @@ def logout(
             detail="access_token or refresh_token is required",
         )
 
-    if access_token:
-        blacklist_token(db, access_token)
-    if refresh_token:
-        blacklist_token(db, refresh_token)
+
+@router.post("/logout")
+async def logout(
+    access_token: str | None = Query(default=None, description="access_token"),
+    refresh_token: str | None = Query(default=None, description="refresh_token"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    _require_some_token(access_token, refresh_token)
+
+    # فقط session همین توکن‌ها (همین دستگاه) باطل می‌شود؛ sessionهای دیگر کاربر می‌مانند
+    await logout_tokens(db, access_token, refresh_token)
 
     return {"message": "Logged out successfully"}
 
 
+@router.post("/logout-all")
+async def logout_all(
+    access_token: str | None = Query(default=None, description="access_token"),
+    refresh_token: str | None = Query(default=None, description="refresh_token"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    _require_some_token(access_token, refresh_token)
+
+    # نسخه‌ی توکن صاحب توکن‌ها بالا می‌رود: همه‌ی توکن‌های او در همه‌ی دستگاه‌ها باطل می‌شوند
+    await revoke_tokens_of(db, access_token, refresh_token)
+
+    return {"message": "Logged out of all sessions successfully"}
+
+
 @router.post("/changepassword/")
-def change_password(
+async def change_password(
     payload: schemas.ChangePasswordRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User | None = Depends(require_auth),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal | None = Depends(require_auth),
 ):
     # اگر DISABLE_AUTH=1 باشد، current_user ممکن است None باشد
     if current_user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    if not verify_password(payload.old_password, current_user.password):
+    user = await db.get(models.User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    if not await verify_password_async(payload.old_password, user.password):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Old password is incorrect")
 
-    current_user.password = hash_password(payload.new_password)
-    db.commit()
+    user.password = await hash_password_async(payload.new_password)
+    # توکن‌های صادرشده با رمز قبلی (در همه‌ی دستگاه‌ها) باطل می‌شوند؛ کاربر دوباره login می‌کند
+    await revoke_user_tokens(db, user.id)
+    await db.commit()
 
     return {"message": "Password changed successfully"}
@@ -1,13 +1,18 @@
-from math import ceil
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import asc, desc, select
 from sqlalchemy.exc import IntegrityError
 
-from ..db import get_db
-from .. import models, schemas
+from ..db import get_async_db, get_read_db
+from .. import models, schemas, stat_counts
+from ..bulk_io import bulk_create
+from ..config import settings
 from ..security import require_auth  # اگر خواستی فقط ادمین باشه: require_admin
+from ..conditional import evaluate
+from ..serialization import list_response, project, rows_to_items
+from ..pagination import INCLUDE_TOTAL_PATTERN, count_of, keyset_select, keyset_trim, page_count, resolve_total
+from ..writes import insert_row, timestamps
 
 router = APIRouter(tags=["City"])
 
@@ -18,31 +23,47 @@ router = APIRouter(tags=["City"])
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_auth)],
 )
-def create_city(payload: schemas.CityCreateIn, db: Session = Depends(get_db)):
+async def create_city(payload: schemas.CityCreateIn, db: AsyncSession = Depends(get_async_db)):
     name = (payload.city or "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="city is required")
 
-    # province باید وجود داشته باشد
-    prov = db.query(models.Province).filter(models.Province.id == payload.province_id).first()
-    if not prov:
-        raise HTTPException(status_code=404, detail="Province not found")
+    # نام تکراری -> 409 (unique)، استان ناموجود -> 404 (FK)
+    values = {"city": name, "province_id": payload.province_id, **timestamps("created_at", "updated_at")}
+    stat_counts.add(db, stat_counts.CITIES_PER_PROVINCE, payload.province_id)
+    city_id = await insert_row(
+        db, models.City, values, conflict="City already exists", missing_parent="Province not found"
+    )
+    return {"city": name, "province_id": payload.province_id, "id": city_id, "created_at": values["created_at"]}
 
-    # unique city
-    exists = db.query(models.City).filter(models.City.city == name).first()
-    if exists:
-        raise HTTPException(status_code=409, detail="City already exists")
 
-    row = models.City(city=name, province_id=payload.province_id)
-    db.add(row)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=409, detail="City already exists")
-
-    db.refresh(row)
-    return {"city": row.city, "province_id": row.province_id, "id": row.id, "created_at": row.created_at}
+# ساخت گروهی شهرها: وجود استان‌ها و تکراری بودن نام‌ها هر کدام با یک کوئری، insert در یک تراکنش
+@router.post(
+    "/city/bulk",
+    response_model=schemas.BulkCreateOut,
+    dependencies=[Depends(require_auth)],
+)
+async def bulk_create_cities(payload: schemas.CityBulkIn, db: AsyncSession = Depends(get_async_db)):
+    if len(payload.items) > settings.BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Too many items (max {settings.BULK_CREATE_MAX_ITEMS} per request)")
+    return await bulk_create(
+        db,
+        models.City,
+        "city",
+        "province_id",
+        models.Province,
+        [item.model_dump() for item in payload.items],
+        metric=stat_counts.CITIES_PER_PROVINCE,
+    )
+
+
+# sort fields مجاز
+SORT_MAP = {
+    "id": models.City.id,
+    "city": models.City.city,
+    "province_id": models.City.province_id,
+    "created_at": models.City.created_at,
+}
 
 
 @router.get(
@@ -50,55 +71,63 @@ def create_city(payload: schemas.CityCreateIn, db: Session = Depends(get_db)):
     response_model=schemas.CityListOut,
     dependencies=[Depends(require_auth)],
 )
-def get_all_cities(
+async def get_all_cities(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(50, ge=1, le=100, description="Page size"),
     sort_by: str | None = Query(None, description="Sort field"),
     sort_order: str | None = Query(None, pattern="^(asc|desc)$", description="Sort order"),
     search: str | None = Query(None, description="Search term"),
     province_id: int | None = Query(None, description="Filter by province ID"),
-    db: Session = Depends(get_db),
+    include_total: str = Query("exact", pattern=INCLUDE_TOTAL_PATTERN, description="false | exact | estimate"),
+    cursor: bool = Query(False, description="Keyset (cursor) pagination instead of page"),
+    after: str | None = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    q = db.query(models.City)
+    conditional = await evaluate(request, db, "city")
+    if conditional.not_modified:
+        return conditional.not_modified_response()
+
+    q, fields = project(models.City, schemas.CityOut)
 
     if province_id is not None:
-        q = q.filter(models.City.province_id == province_id)
+        q = q.where(models.City.province_id == province_id)
 
     if search:
         s = search.strip()
         if s:
-            q = q.filter(models.City.city.ilike(f"%{s}%"))
-
-    total = q.count()
+            q = q.where(models.City.city.ilike(f"%{s}%"))
 
-    sort_map = {
-        "id": models.City.id,
-        "city": models.City.city,
-        "province_id": models.City.province_id,
-        "created_at": models.City.created_at,
-    }
+    total = await resolve_total(db, include_total, table="city", filters=(province_id, search), count_stmt=count_of(q))
+    pages = page_count(total, size)
 
     if sort_by:
-        col = sort_map.get(sort_by)
+        col = SORT_MAP.get(sort_by)
         if not col:
             raise HTTPException(status_code=400, detail="Invalid sort_by")
-        if sort_order == "desc":
+        descending = sort_order == "desc"
+    else:
+        sort_by, col, descending = "id", models.City.id, True
+
+    next_cursor = None
+    if cursor or after:
+        sort_key = f"{sort_by}:{'desc' if descending else 'asc'}"
+        stmt = keyset_select(q, col=col, id_col=models.City.id, descending=descending, sort_key=sort_key, after=after, size=size)
+        rows, next_cursor = keyset_trim(
+            (await db.execute(stmt)).all(), size=size, sort_key=sort_key, key=lambda r: (getattr(r, sort_by), r.id)
+        )
+    else:
+        if descending:
             q = q.order_by(desc(col))
         else:
             q = q.order_by(asc(col))
-    else:
-        q = q.order_by(desc(models.City.id))
-
-    offset = (page - 1) * size
-    rows = q.offset(offset).limit(size).all()
 
-    pages = ceil(total / size) if total else 0
+        offset = (page - 1) * size
+        rows = (await db.execute(q.offset(offset).limit(size))).all()
 
-    items = [
-        {"city": r.city, "province_id": r.province_id, "id": r.id, "created_at": r.created_at}
-        for r in rows
-    ]
-    return {"total": total, "size": size, "pages": pages, "items": items}
+    return conditional.apply(list_response(
+        total=total, size=size, pages=pages, items=rows_to_items(rows, fields), next_cursor=next_cursor
+    ))
 
 
 @router.delete(
@@ -106,20 +135,21 @@ def get_all_cities(
     response_model=schemas.MessageOut,
     dependencies=[Depends(require_auth)],
 )
-def delete_city(city: str, db: Session = Depends(get_db)):
+async def delete_city(city: str, db: AsyncSession = Depends(get_async_db)):
     name = (city or "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="city is required")
 
-    row = db.query(models.City).filter(models.City.city == name).first()
+    row = await db.scalar(select(models.City).where(models.City.city == name))
     if not row:
         raise HTTPException(status_code=404, detail="City not found")
 
-    db.delete(row)
+    stat_counts.add(db, stat_counts.CITIES_PER_PROVINCE, row.province_id, -1)
+    await db.delete(row)
     try:
-        db.commit()
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         # مثلا اگر Village بهش FK داشته باشه
         raise HTTPException(status_code=409, detail="City cannot be deleted (it is referenced)")
 
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
-from math import ceil
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 
-from ..db import get_db
+from ..db import get_async_db, get_read_db
 from .. import models, schemas
 from ..security import require_auth  # در صورت نیاز به ادمین
+from ..conditional import evaluate
+from ..serialization import list_response, project, rows_to_items
+from ..pagination import INCLUDE_TOTAL_PATTERN, count_of, keyset_select, keyset_trim, page_count, resolve_total
+from ..writes import insert_row, timestamps
 
 router = APIRouter(tags=["Crop Year"])
 
@@ -15,21 +18,15 @@ router = APIRouter(tags=["Crop Year"])
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_auth)],
 )
-def create_crop_year(payload: schemas.CropYearCreateIn, db: Session = Depends(get_db)):
+async def create_crop_year(payload: schemas.CropYearCreateIn, db: AsyncSession = Depends(get_async_db)):
     crop_year_name = payload.crop_year_name.strip()
     if not crop_year_name:
         raise HTTPException(status_code=400, detail="Crop year name is required")
 
-    exists = db.query(models.CropYear).filter(models.CropYear.crop_year_name == crop_year_name).first()
-    if exists:
-        raise HTTPException(status_code=409, detail="Crop year already exists")
+    values = {"crop_year_name": crop_year_name, **timestamps("created_at")}
+    crop_year_id = await insert_row(db, models.CropYear, values, conflict="Crop year already exists")
 
-    row = models.CropYear(crop_year_name=crop_year_name)
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-
-    return {"crop_year_name": row.crop_year_name, "id": row.id, "created_at": row.created_at}
+    return {"crop_year_name": crop_year_name, "id": crop_year_id, "created_at": values["created_at"]}
 
 
 @router.get(
@@ -37,35 +34,43 @@ def create_crop_year(payload: schemas.CropYearCreateIn, db: Session = Depends(ge
     response_model=schemas.CropYearListOut,
     dependencies=[Depends(require_auth)],
 )
-def get_all_crop_years(
+async def get_all_crop_years(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(50, ge=1, le=100, description="Page size"),
     search: str | None = Query(None, description="Search term"),
-    db: Session = Depends(get_db),
+    include_total: str = Query("exact", pattern=INCLUDE_TOTAL_PATTERN, description="false | exact | estimate"),
+    cursor: bool = Query(False, description="Keyset (cursor) pagination instead of page"),
+    after: str | None = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    q = db.query(models.CropYear)
+    conditional = await evaluate(request, db, "crop_year")
+    if conditional.not_modified:
+        return conditional.not_modified_response()
+
+    q, fields = project(models.CropYear, schemas.CropYearOut)
 
     if search:
         s = search.strip()
         if s:
-            q = q.filter(models.CropYear.crop_year_name.ilike(f"%{s}%"))
-
-    total = q.count()
-
-    rows = q.offset((page - 1) * size).limit(size).all()
+            q = q.where(models.CropYear.crop_year_name.ilike(f"%{s}%"))
 
-    pages = ceil(total / size) if total else 0
+    total = await resolve_total(db, include_total, table="crop_year", filters=(search,), count_stmt=count_of(q))
+    pages = page_count(total, size)
 
-    items = [
-        {
-            "id": r.id,
-            "crop_year_name": r.crop_year_name,
-            "created_at": r.created_at,
-        }
-        for r in rows
-    ]
+    next_cursor = None
+    if cursor or after:
+        sort_key = "id:asc"
+        stmt = keyset_select(q, col=models.CropYear.id, id_col=models.CropYear.id, descending=False, sort_key=sort_key, after=after, size=size)
+        rows, next_cursor = keyset_trim(
+            (await db.execute(stmt)).all(), size=size, sort_key=sort_key, key=lambda r: (r.id, r.id)
+        )
+    else:
+        rows = (await db.execute(q.offset((page - 1) * size).limit(size))).all()
 
-    return {"total": total, "size": size, "pages": pages, "items": items}
+    return conditional.apply(list_response(
+        total=total, size=size, pages=pages, items=rows_to_items(rows, fields), next_cursor=next_cursor
+    ))
 
 
 @router.delete(
@@ -74,13 +79,13 @@ def get_all_crop_years(
     status_code=status.HTTP_200_OK,
     dependencies=[Depends(require_auth)],
 )
-def delete_crop_year(crop_year_name: str, db: Session = Depends(get_db)):
-    row = db.query(models.CropYear).filter(models.CropYear.crop_year_name == crop_year_name).first()
+async def delete_crop_year(crop_year_name: str, db: AsyncSession = Depends(get_async_db)):
+    row = await db.scalar(select(models.CropYear).where(models.CropYear.crop_year_name == crop_year_name))
 
     if not row:
         raise HTTPException(status_code=404, detail="Crop year not found")
 
-    db.delete(row)
-    db.commit()
+    await db.delete(row)
+    await db.commit()
 
     return {"message": f"Crop year {crop_year_name} deleted successfully"}
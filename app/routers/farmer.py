@@ -1,87 +1,285 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import String, insert, select
 from typing import Optional
-from app.db import get_db
-from app import models, schemas
+from app.db import get_async_db, get_read_db, read_session_factory
+from app import models, schemas, stat_counts
+from app.bulk_io import EXPORT_FORMAT_PATTERN, export_response, iter_records, lookup_response, request_chunks
+from app.config import settings
 from app.security import require_auth
+from app.pagination import INCLUDE_TOTAL_PATTERN, count_of, keyset_select, keyset_trim, page_count, resolve_total
+from app.writes import insert_row, timestamps
+from app.search import farmer_search_clause
+from app.conditional import evaluate
+from app.serialization import list_response, project, rows_to_items
 
 router = APIRouter(tags=["Farmer"])
 
 # ایجاد فارمر
 @router.post("/farmer/", response_model=schemas.FarmerOut, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_auth)],)
-def create_farmer(payload: schemas.FarmerCreateIn, db: Session = Depends(get_db)):
-    # بررسی وجود فارمر با همان شناسه ملی
-    exists = db.query(models.Farmer).filter(models.Farmer.national_id == payload.national_id).first()
-    if exists:
-        raise HTTPException(status_code=400, detail="Farmer with this national_id already exists")
-    
-    # اضافه کردن فارمر جدید
-    farmer = models.Farmer(**payload.dict())
-    db.add(farmer)
-    db.commit()
-    db.refresh(farmer)
-    
-    return farmer
+async def create_farmer(payload: schemas.FarmerCreateIn, db: AsyncSession = Depends(get_async_db)):
+    # national_id تکراری را قید unique دیتابیس تشخیص می‌دهد (409، هم‌زمان با درخواست دیگر هم)
+    values = {**payload.dict(), **timestamps("created_at", "updated_at")}
+    stat_counts.add(db, stat_counts.FARMERS_PER_DAY, stat_counts.day_bucket(values["created_at"]))
+    await insert_row(db, models.Farmer, values, conflict="Farmer with this national_id already exists")
+
+    return values
+
+# --------- ورود گروهی فارمرها ---------
+# طول ستون‌ها را قبل از insert چک می‌کنیم تا یک ردیف بلند کل batch را در MySQL (strict mode) رد نکند
+_FARMER_MAX_LENGTHS = {
+    c.name: c.type.length
+    for c in models.Farmer.__table__.columns
+    if isinstance(c.type, String) and c.type.length
+}
+
+_IMPORT_BODY_DOC = {
+    "requestBody": {
+        "content": {
+            "text/csv": {"schema": {"type": "string"}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+            "multipart/form-data": {
+                "schema": {"type": "object", "properties": {"file": {"type": "string", "format": "binary"}}}
+            },
+        }
+    }
+}
+
+
+def _import_fail(report: dict, row_no: int, national_id, error: str) -> None:
+    report["failed"] += 1
+    if len(report["errors"]) < settings.FARMER_IMPORT_MAX_ERRORS:
+        nid = None if national_id is None else str(national_id)
+        report["errors"].append({"row": row_no, "national_id": nid, "error": error})
+    else:
+        report["errors_truncated"] = True
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+def _length_error(values: dict) -> str | None:
+    for name, max_len in _FARMER_MAX_LENGTHS.items():
+        if name in values and len(values[name]) > max_len:
+            return f"{name}: at most {max_len} characters"
+    return None
+
+
+async def _insert_farmer_batch(db: AsyncSession, batch: list[tuple[int, dict]], report: dict) -> None:
+    # تکراری‌های داخل همین batch
+    rows, first_row = [], {}
+    for row_no, values in batch:
+        nid = values["national_id"]
+        if nid in first_row:
+            _import_fail(report, row_no, nid, f"Duplicate national_id in file (row {first_row[nid]})")
+            continue
+        first_row[nid] = row_no
+        rows.append((row_no, values))
+
+    # تکراری‌های موجود در دیتابیس (شامل batchهای قبلی همین فایل) با یک کوئری IN
+    existing = set(
+        await db.scalars(select(models.Farmer.national_id).where(models.Farmer.national_id.in_(first_row)))
+    )
+    fresh = []
+    for row_no, values in rows:
+        if values["national_id"] in existing:
+            _import_fail(report, row_no, values["national_id"], "Farmer with this national_id already exists")
+        else:
+            fresh.append((row_no, values))
+    if not fresh:
+        return
+
+    # زمان صریح (نه server_default) تا روز ثبت برای شمارش farmers_per_day معلوم باشد
+    now = timestamps("created_at", "updated_at")
+    day = stat_counts.day_bucket(now["created_at"])
+    fresh = [(row_no, {**values, **now}) for row_no, values in fresh]
+
+    try:
+        # executemany -> درایور MySQL آن را به یک INSERT چند ردیفی تبدیل می‌کند
+        await db.execute(insert(models.Farmer), [values for _, values in fresh])
+        stat_counts.add(db, stat_counts.FARMERS_PER_DAY, day, len(fresh))
+        await db.commit()
+        report["inserted"] += len(fresh)
+        return
+    except DBAPIError:
+        await db.rollback()
+
+    # معمولاً insert هم‌زمان از جای دیگر؛ ردیف‌ها را تکی insert می‌کنیم تا ردیف مقصر مشخص شود
+    for row_no, values in fresh:
+        try:
+            await db.execute(insert(models.Farmer).values(**values))
+            stat_counts.add(db, stat_counts.FARMERS_PER_DAY, day)
+            await db.commit()
+            report["inserted"] += 1
+        except IntegrityError:
+            await db.rollback()
+            _import_fail(report, row_no, values["national_id"], "Farmer with this national_id already exists")
+        except DBAPIError as e:
+            await db.rollback()
+            _import_fail(report, row_no, values["national_id"], str(e.orig))
+
+
+# ورود گروهی فارمرها از فایل CSV (با سطر عنوان) یا NDJSON؛ فایل به صورت جریانی خوانده می‌شود
+@router.post(
+    "/farmer/import",
+    response_model=schemas.FarmerImportOut,
+    dependencies=[Depends(require_auth)],
+    openapi_extra=_IMPORT_BODY_DOC,
+)
+async def import_farmers(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="csv | ndjson (default: from Content-Type / file name)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    fmt, chunks = await request_chunks(request, format)
+    report = {"total_rows": 0, "inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    batch = []
+
+    async for row_no, data, error in iter_records(fmt, chunks):
+        report["total_rows"] += 1
+        if error:
+            _import_fail(report, row_no, None, error)
+            continue
+        try:
+            values = schemas.FarmerCreateIn.model_validate(data).model_dump()
+        except ValidationError as e:
+            _import_fail(report, row_no, data.get("national_id"), _validation_message(e))
+            continue
+        length_error = _length_error(values)
+        if length_error:
+            _import_fail(report, row_no, values["national_id"], length_error)
+            continue
+
+        batch.append((row_no, values))
+        if len(batch) >= settings.FARMER_IMPORT_CHUNK_SIZE:
+            await _insert_farmer_batch(db, batch, report)
+            batch = []
+
+    if batch:
+        await _insert_farmer_batch(db, batch, report)
+    return report
+
+# فیلترهای مشترک لیست و خروجی
+def _filter_farmers(query, search: Optional[str], dialect: str):
+    if search:
+        clause = farmer_search_clause(search, dialect)
+        if clause is not None:
+            query = query.where(clause)
+    return query
 
 # دریافت همه فارمرها
 @router.get("/farmer/", response_model=schemas.FarmerListOut, dependencies=[Depends(require_auth)],)
-def get_all_farmers(
+async def get_all_farmers(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(50, ge=1, le=100, description="Page size"),
     search: Optional[str] = Query(None, description="Search by name or national id"),
-    db: Session = Depends(get_db),
+    include_total: str = Query("exact", pattern=INCLUDE_TOTAL_PATTERN, description="false | exact | estimate"),
+    cursor: bool = Query(False, description="Keyset (cursor) pagination instead of page"),
+    after: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = db.query(models.Farmer)
+    conditional = await evaluate(request, db, "farmer")
+    if conditional.not_modified:
+        return conditional.not_modified_response()
+
+    stmt, fields = project(models.Farmer, schemas.FarmerOut, models.Farmer.id)
+    query = _filter_farmers(stmt, search, db.get_bind().dialect.name)
+
+    total = await resolve_total(db, include_total, table="farmer", filters=(search,), count_stmt=count_of(query))
+    pages = page_count(total, size)  # محاسبه تعداد صفحات
+
+    if cursor or after:
+        stmt = keyset_select(
+            query, col=models.Farmer.id, id_col=models.Farmer.id, descending=False, sort_key="id:asc", after=after, size=size
+        )
+        rows, next_cursor = keyset_trim(
+            (await db.execute(stmt)).all(), size=size, sort_key="id:asc", key=lambda r: (r.id, r.id)
+        )
+        return conditional.apply(list_response(total=total, size=size, pages=pages, items=rows_to_items(rows, fields), next_cursor=next_cursor))
 
-    if search:
-        query = query.filter(models.Farmer.full_name.ilike(f"%{search}%") | models.Farmer.national_id.ilike(f"%{search}%"))
-    
-    total = query.count()
     offset = (page - 1) * size
-    rows = query.offset(offset).limit(size).all()
+    rows = (await db.execute(query.offset(offset).limit(size))).all()
 
-    pages = (total + size - 1) // size  # محاسبه تعداد صفحات
+    return conditional.apply(list_response(total=total, size=size, pages=pages, items=rows_to_items(rows, fields)))
 
-    return {"total": total, "size": size, "pages": pages, "items": rows}
+# خروجی کامل فارمرها (CSV / NDJSON) با همان جستجوی لیست
+@router.get("/farmer/export", dependencies=[Depends(require_auth)],)
+async def export_farmers(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv | ndjson"),
+    search: Optional[str] = Query(None, description="Search by name or national id"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    f = models.Farmer
+    stmt = select(
+        f.id, f.national_id, f.full_name, f.father_name, f.phone_number,
+        f.sheba_number_1, f.sheba_number_2, f.card_number, f.address, f.created_at, f.updated_at,
+    )
+    stmt = _filter_farmers(stmt, search, db.get_bind().dialect.name).order_by(f.id)
+    return export_response(stmt, format, "farmers", read_session_factory(request))
+
+# دریافت گروهی فارمرها با لیست کدهای ملی (به جای هزاران GET /farmer/{national_id})
+@router.post("/farmer/lookup", response_model=schemas.FarmerLookupOut, dependencies=[Depends(require_auth)],)
+async def lookup_farmers(payload: schemas.FarmerLookupIn):
+    # تکراری‌ها حذف می‌شوند ولی ترتیب missing همان ترتیب ورودی است
+    national_ids = list(dict.fromkeys(n.strip() for n in payload.national_ids if n.strip()))
+    if len(national_ids) > settings.LOOKUP_MAX_KEYS:
+        raise HTTPException(
+            status_code=413, detail=f"Too many national_ids (max {settings.LOOKUP_MAX_KEYS} per request)"
+        )
+    stmt, fields = project(models.Farmer, schemas.FarmerOut)
+    return lookup_response(stmt, models.Farmer.national_id, national_ids, fields)
 
 # دریافت فارمر بر اساس شناسه ملی
 @router.get("/farmer/{national_id}", response_model=schemas.FarmerOut, dependencies=[Depends(require_auth)],)
-def get_farmer_by_national_id(national_id: str, db: Session = Depends(get_db)):
-    farmer = db.query(models.Farmer).filter(models.Farmer.national_id == national_id).first()
+async def get_farmer_by_national_id(
+    national_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)
+):
+    conditional = await evaluate(request, db, "farmer")
+    if conditional.not_modified:
+        return conditional.not_modified_response()
+
+    farmer = await db.scalar(select(models.Farmer).where(models.Farmer.national_id == national_id))
     if not farmer:
         raise HTTPException(status_code=404, detail="Farmer not found")
+    conditional.apply(response)
     return farmer
 
 # به‌روزرسانی فارمر
 @router.put("/farmer/{national_id}", response_model=schemas.FarmerOut, dependencies=[Depends(require_auth)],)
-def update_farmer(national_id: str, payload: schemas.FarmerCreateIn, db: Session = Depends(get_db)):
-    farmer = db.query(models.Farmer).filter(models.Farmer.national_id == national_id).first()
+async def update_farmer(national_id: str, payload: schemas.FarmerCreateIn, db: AsyncSession = Depends(get_async_db)):
+    farmer = await db.scalar(select(models.Farmer).where(models.Farmer.national_id == national_id))
     if not farmer:
         raise HTTPException(status_code=404, detail="Farmer not found")
     
     for key, value in payload.dict().items():
         setattr(farmer, key, value)
     
-    db.commit()
-    db.refresh(farmer)
+    await db.commit()
+    await db.refresh(farmer)
     return farmer
 
 # حذف فارمر
 @router.delete("/farmer/{national_id}", dependencies=[Depends(require_auth)],)
-def delete_farmer(national_id: str, db: Session = Depends(get_db)):
-    farmer = db.query(models.Farmer).filter(models.Farmer.national_id == national_id).first()
+async def delete_farmer(national_id: str, db: AsyncSession = Depends(get_async_db)):
+    farmer = await db.scalar(select(models.Farmer).where(models.Farmer.national_id == national_id))
     if not farmer:
         raise HTTPException(status_code=404, detail="Farmer not found")
     
-    db.delete(farmer)
-    db.commit()
+    if farmer.created_at:
+        stat_counts.add(db, stat_counts.FARMERS_PER_DAY, stat_counts.day_bucket(farmer.created_at), -1)
+    await db.delete(farmer)
+    await db.commit()
     return {"message": "Farmer deleted successfully"}
 
 # دریافت شناسه کاربری بر اساس شناسه ملی
 @router.get("/farmer/farmer-id-to-user-id/{farmer_id}", )
-def get_user_id_from_farmer_id(farmer_id: int, db: Session = Depends(get_db)):
-    farmer = db.query(models.Farmer).filter(models.Farmer.id == farmer_id).first()
+async def get_user_id_from_farmer_id(farmer_id: int, db: AsyncSession = Depends(get_read_db)):
+    farmer = await db.get(models.Farmer, farmer_id)
     if not farmer:
         raise HTTPException(status_code=404, detail="Farmer not found")
     
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from .. import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+# بدون احراز هویت برای scraper؛ دسترسی بیرونی را در reverse proxy محدود کنید
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=CONTENT_TYPE_LATEST)
@@ -1,12 +1,15 @@
-from math import ceil
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import asc, desc, select
 
-from ..db import get_db
+from ..db import get_async_db, get_read_db
 from .. import models, schemas
 from ..security import require_auth  # اگر خواستی فقط ادمین باشه: require_admin
+from ..conditional import evaluate
+from ..serialization import list_response, project, rows_to_items
+from ..pagination import INCLUDE_TOTAL_PATTERN, count_of, keyset_select, keyset_trim, page_count, resolve_total
+from ..writes import insert_row
 
 router = APIRouter(tags=["Province"])
 
@@ -17,22 +20,24 @@ router = APIRouter(tags=["Province"])
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_auth)],
 )
-def create_province(payload: schemas.ProvinceCreateIn, db: Session = Depends(get_db)):
+async def create_province(payload: schemas.ProvinceCreateIn, db: AsyncSession = Depends(get_async_db)):
     name = (payload.province or "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="province is required")
 
-    exists = db.query(models.Province).filter(models.Province.province == name).first()
-    if exists:
-        raise HTTPException(status_code=409, detail="Province already exists")
-
-    row = models.Province(province=name)
-    db.add(row)
-    db.commit()
-    db.refresh(row)
+    # تکراری بودن را قید unique دیتابیس تشخیص می‌دهد (بدون SELECT جدا)
+    await insert_row(db, models.Province, {"province": name}, conflict="Province already exists")
 
     # طبق Swagger فقط province برمی‌گردونیم
-    return {"province": row.province}
+    return {"province": name}
+
+
+# sort mapping (فقط فیلدهای مجاز)
+SORT_MAP = {
+    "id": models.Province.id,
+    "province": models.Province.province,
+    "created_at": models.Province.created_at,
+}
 
 
 @router.get(
@@ -40,57 +45,61 @@ def create_province(payload: schemas.ProvinceCreateIn, db: Session = Depends(get
     response_model=schemas.ProvinceListOut,
     dependencies=[Depends(require_auth)],
 )
-def get_all_provinces(
+async def get_all_provinces(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(50, ge=1, le=100, description="Page size"),
     sort_by: str | None = Query(None, description="Sort field"),
     sort_order: str | None = Query(None, pattern="^(asc|desc)$", description="Sort order"),
     search: str | None = Query(None, description="Search term"),
-    db: Session = Depends(get_db),
+    include_total: str = Query("exact", pattern=INCLUDE_TOTAL_PATTERN, description="false | exact | estimate"),
+    cursor: bool = Query(False, description="Keyset (cursor) pagination instead of page"),
+    after: str | None = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    q = db.query(models.Province)
+    # 304 قبل از count و کوئری صفحه
+    conditional = await evaluate(request, db, "province")
+    if conditional.not_modified:
+        return conditional.not_modified_response()
+
+    q, fields = project(models.Province, schemas.ProvinceOut)
 
     if search:
         s = search.strip()
         if s:
-            q = q.filter(models.Province.province.ilike(f"%{s}%"))
-
-    total = q.count()
+            q = q.where(models.Province.province.ilike(f"%{s}%"))
 
-    # sort mapping (فقط فیلدهای مجاز)
-    sort_map = {
-        "id": models.Province.id,
-        "province": models.Province.province,
-        "created_at": models.Province.created_at,
-    }
+    total = await resolve_total(db, include_total, table="province", filters=(search,), count_stmt=count_of(q))
+    pages = page_count(total, size)
 
     if sort_by:
-        col = sort_map.get(sort_by)
+        col = SORT_MAP.get(sort_by)
         if not col:
             raise HTTPException(status_code=400, detail="Invalid sort_by")
-        if sort_order == "desc":
+        descending = sort_order == "desc"
+    else:
+        # پیش‌فرض: جدیدترین‌ها اول
+        sort_by, col, descending = "id", models.Province.id, True
+
+    next_cursor = None
+    if cursor or after:
+        sort_key = f"{sort_by}:{'desc' if descending else 'asc'}"
+        stmt = keyset_select(q, col=col, id_col=models.Province.id, descending=descending, sort_key=sort_key, after=after, size=size)
+        rows, next_cursor = keyset_trim(
+            (await db.execute(stmt)).all(), size=size, sort_key=sort_key, key=lambda r: (getattr(r, sort_by), r.id)
+        )
+    else:
+        if descending:
             q = q.order_by(desc(col))
         else:
             q = q.order_by(asc(col))
-    else:
-        # پیش‌فرض: جدیدترین‌ها اول
-        q = q.order_by(desc(models.Province.id))
-
-    offset = (page - 1) * size
-    rows = q.offset(offset).limit(size).all()
-
-    pages = ceil(total / size) if total else 0
 
-    items = [
-        {
-            "id": r.id,
-            "province": r.province,
-            "created_at": r.created_at,
-        }
-        for r in rows
-    ]
+        offset = (page - 1) * size
+        rows = (await db.execute(q.offset(offset).limit(size))).all()
 
-    return {"total": total, "size": size, "pages": pages, "items": items}
+    return conditional.apply(list_response(
+        total=total, size=size, pages=pages, items=rows_to_items(rows, fields), next_cursor=next_cursor
+    ))
 
 
 @router.delete(
@@ -98,19 +107,19 @@ def get_all_provinces(
     response_model=schemas.MessageOut,
     dependencies=[Depends(require_auth)],
 )
-def delete_province(
+async def delete_province(
     province: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     name = (province or "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="province is required")
 
-    row = db.query(models.Province).filter(models.Province.province == name).first()
+    row = await db.scalar(select(models.Province).where(models.Province.province == name))
     if not row:
         raise HTTPException(status_code=404, detail="Province not found")
 
-    db.delete(row)
-    db.commit()
+    await db.delete(row)
+    await db.commit()
 
     return {"message": "Province deleted successfully"}
@@ -0,0 +1,66 @@
+from collections import defaultdict
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_read_db
+from .. import geo_cache, models, schemas, stat_counts
+from ..jalali import jalali_month
+from ..security import require_auth
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+# آمار تجمیعی از جدول stat_count (یک کوئری کوچک، بدون COUNT روی جدول‌های اصلی)؛
+# نام استان / شهر از geo_cache و ماه‌ها از جمع شمارش روزانه‌ی فارمرها
+@router.get("/", response_model=schemas.StatsOut, dependencies=[Depends(require_auth)])
+async def get_stats(
+    calendar: str = Query("jalali", pattern="^(jalali|gregorian)$", description="Calendar of farmers_per_month"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    s = models.StatCount
+    counts: dict[str, dict[str, int]] = defaultdict(dict)
+    for metric, bucket, total in await db.execute(select(s.metric, s.bucket, s.total).where(s.total != 0)):
+        counts[metric][bucket] = total
+
+    geo = await geo_cache.snapshot(db)
+    roles = dict((await db.execute(select(models.Role.id, models.Role.name))).all())
+
+    months: dict[str, int] = defaultdict(int)
+    for day, total in counts[stat_counts.FARMERS_PER_DAY].items():
+        d = date.fromisoformat(day)
+        months[jalali_month(d) if calendar == "jalali" else day[:7]] += total
+
+    cities_per_province = [
+        {"province_id": int(pid), "province": geo.provinces.get(int(pid)), "count": total}
+        for pid, total in counts[stat_counts.CITIES_PER_PROVINCE].items()
+    ]
+    villages_per_city = []
+    for cid, total in counts[stat_counts.VILLAGES_PER_CITY].items():
+        city = geo.cities.get(int(cid))
+        villages_per_city.append({
+            "city_id": int(cid),
+            "city": city[0] if city else None,
+            "province_id": city[1] if city else None,
+            "count": total,
+        })
+    users_per_role = [
+        {"role_id": int(rid), "role": roles.get(int(rid)), "count": total}
+        for rid, total in counts[stat_counts.USERS_PER_ROLE].items()
+    ]
+
+    return {
+        "calendar": calendar,
+        "totals": {
+            "cities": sum(counts[stat_counts.CITIES_PER_PROVINCE].values()),
+            "villages": sum(counts[stat_counts.VILLAGES_PER_CITY].values()),
+            "farmers": sum(months.values()),
+            "users": sum(counts[stat_counts.USERS_PER_ROLE].values()),
+        },
+        "cities_per_province": sorted(cities_per_province, key=lambda r: r["province_id"]),
+        "villages_per_city": sorted(villages_per_city, key=lambda r: r["city_id"]),
+        "farmers_per_month": [{"month": m, "count": months[m]} for m in sorted(months)],
+        "users_per_role": sorted(users_per_role, key=lambda r: r["role_id"]),
+    }
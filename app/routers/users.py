@@ -1,58 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func, or_
-import math
-import jdatetime
+from sqlalchemy import or_, select
 
-from ..db import get_db
+from ..db import get_async_db, get_read_db, read_session_factory
+from .. import stat_counts
 from ..models import User, Role
 from ..schemas import UserCreateAdminIn, UserSwaggerOut, UserUpdateSwaggerIn, UsersListOut
-from ..security import require_auth, require_admin, hash_password
+from ..security import require_auth, require_admin, hash_password_async, invalidate_principal, revoke_user_tokens
+from ..jalali import to_jalali
+from ..bulk_io import EXPORT_FORMAT_PATTERN, export_response
+from ..conditional import evaluate
+from ..serialization import list_response, project, rows_to_items
+from ..pagination import INCLUDE_TOTAL_PATTERN, count_of, keyset_select, keyset_trim, page_count, resolve_total
+from ..writes import insert_row
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-def to_jalali(dt):
-    if not dt:
-        return None
-    return jdatetime.datetime.fromgregorian(datetime=dt).strftime("%Y/%m/%d %H:%M:%S")
-
-
 @router.post("/admin/", status_code=status.HTTP_201_CREATED, response_model=str, dependencies=[Depends(require_admin)])
-def admin_create_user(payload: UserCreateAdminIn, db: Session = Depends(get_db)):
-    # role_id معتبر؟
-    role = db.query(Role).filter(Role.id == payload.role_id).first()
-    if not role:
-        raise HTTPException(status_code=400, detail="role_id is invalid")
-
-    # username تکراری نباشه
-    exists = db.query(User).filter(User.username == payload.username).first()
-    if exists:
-        raise HTTPException(status_code=409, detail="username already exists")
-
-    user = User(
-        username=payload.username,
-        password=hash_password(payload.password),
-        fullname=payload.fullName,   # تبدیل fullName -> fullname
-        email=payload.email,
-        phone_number=payload.phone_number,
-        disabled=bool(payload.disabled),
-        role_id=payload.role_id,
+async def admin_create_user(payload: UserCreateAdminIn, db: AsyncSession = Depends(get_async_db)):
+    # username تکراری -> 409 (unique)، role_id نامعتبر -> 400 (FK)
+    values = {
+        "username": payload.username,
+        "password": await hash_password_async(payload.password),
+        "fullname": payload.fullName,   # تبدیل fullName -> fullname
+        "email": payload.email,
+        "phone_number": payload.phone_number,
+        "disabled": bool(payload.disabled),
+        "role_id": payload.role_id,
+    }
+    stat_counts.add(db, stat_counts.USERS_PER_ROLE, payload.role_id)
+    await insert_row(
+        db,
+        User,
+        values,
+        conflict="username already exists",
+        missing_parent="role_id is invalid",
+        missing_parent_status=400,
     )
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
     # Swagger گفته خروجی "string"؛ پس پیام ساده می‌دیم
     return "User created successfully"
 
 
+# فیلتر search مشترک لیست و خروجی
+def _filter_users(q, search: str | None):
+    if search:
+        like = f"%{search}%"
+        q = q.where(
+            or_(
+                User.username.ilike(like),
+                User.fullname.ilike(like),
+                User.email.ilike(like),
+                User.phone_number.ilike(like),
+            )
+        )
+    return q
+
+
+# باید قبل از /{user_id} تعریف شود
+@router.get("/export", dependencies=[Depends(require_auth)])
+async def export_users(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    search: str | None = Query(None),
+):
+    # رمز عبور عمداً در خروجی نیست
+    stmt = select(
+        User.id, User.username, User.fullname, User.email, User.phone_number,
+        User.role_id, User.disabled, User.created_at, User.updated_at,
+    )
+    return export_response(
+        _filter_users(stmt, search).order_by(User.id), format, "users", read_session_factory(request)
+    )
+
+
 @router.get("/{user_id}", response_model=UserSwaggerOut, dependencies=[Depends(require_auth)])
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -72,17 +99,25 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{user_id}", response_model=UserSwaggerOut, dependencies=[Depends(require_admin)])
-def update_user(user_id: int, payload: UserUpdateSwaggerIn, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def update_user(user_id: int, payload: UserUpdateSwaggerIn, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    role = db.query(Role).filter(Role.id == payload.role_id).first()
+    role = await db.get(Role, payload.role_id)
     if not role:
         raise HTTPException(status_code=400, detail="role_id is invalid")
 
+    # غیرفعال کردن کاربر توکن‌های فعلی‌اش را هم باطل می‌کند (فعال شدن دوباره آن‌ها را برنمی‌گرداند)
+    if payload.disabled and not user.disabled:
+        await revoke_user_tokens(db, user.id)
+
+    if payload.role_id != user.role_id:
+        stat_counts.add(db, stat_counts.USERS_PER_ROLE, user.role_id, -1)
+        stat_counts.add(db, stat_counts.USERS_PER_ROLE, payload.role_id)
+
     user.username = payload.username
-    user.password = hash_password(payload.password)
+    user.password = await hash_password_async(payload.password)
     user.fullname = payload.fullname
     user.email = payload.email
     user.phone_number = payload.phone_number
@@ -90,12 +125,14 @@ def update_user(user_id: int, payload: UserUpdateSwaggerIn, db: Session = Depend
     user.disabled = bool(payload.disabled)
 
     try:
-        db.commit()
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=409, detail="username already exists")
 
-    db.refresh(user)
+    # نقش یا disabled ممکن است عوض شده باشد
+    invalidate_principal(user.id)
+    await db.refresh(user)
 
     return UserSwaggerOut(
         created_at=user.created_at,
@@ -112,87 +149,82 @@ def update_user(user_id: int, payload: UserUpdateSwaggerIn, db: Session = Depend
     )
 
 
+# ستون‌های مجاز sort (هر کدام در migrations ایندکس دارد)
+ALLOWED_SORT = {
+    "id": User.id,
+    "username": User.username,
+    "email": User.email,
+    "fullname": User.fullname,
+    "phone_number": User.phone_number,
+    "role_id": User.role_id,
+    "disabled": User.disabled,
+    "created_at": User.created_at,
+    "updated_at": User.updated_at,
+}
+
+
 @router.get("/", response_model=UsersListOut, dependencies=[Depends(require_auth)])
-def get_all_users(
+async def get_all_users(
+    request: Request,
     page: int = Query(1, ge=1),
     size: int = Query(50, ge=1, le=100),
     sort_by: str | None = Query(None),
     sort_order: str | None = Query(None, pattern="^(asc|desc)$"),
     search: str | None = Query(None),
-    db: Session = Depends(get_db),
+    include_total: str = Query("exact", pattern=INCLUDE_TOTAL_PATTERN),
+    cursor: bool = Query(False),
+    after: str | None = Query(None),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    def to_jalali(dt):
-        if not dt:
-            return None
-        return jdatetime.datetime.fromgregorian(datetime=dt).strftime("%Y/%m/%d %H:%M:%S")
+    conditional = await evaluate(request, db, "users")
+    if conditional.not_modified:
+        return conditional.not_modified_response()
 
     # --- فیلتر search ---
-    filters = []
-    if search:
-        like = f"%{search}%"
-        filters.append(
-            or_(
-                User.username.ilike(like),
-                User.fullname.ilike(like),
-                User.email.ilike(like),
-                User.phone_number.ilike(like),
-            )
-        )
-
-    base_query = db.query(User)
-    if filters:
-        base_query = base_query.filter(*filters)
+    stmt, fields = project(User, UserSwaggerOut)
+    base_query = _filter_users(stmt, search)
 
     # --- sort ---
-    allowed_sort = {
-        "id": User.id,
-        "username": User.username,
-        "email": User.email,
-        "fullname": User.fullname,
-        "phone_number": User.phone_number,
-        "role_id": User.role_id,
-        "disabled": User.disabled,
-        "created_at": User.created_at,
-        "updated_at": User.updated_at,
-    }
-
     if sort_by:
-        if sort_by not in allowed_sort:
+        if sort_by not in ALLOWED_SORT:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid sort_by. Allowed: {', '.join(allowed_sort.keys())}",
+                detail=f"Invalid sort_by. Allowed: {', '.join(ALLOWED_SORT.keys())}",
             )
-        col = allowed_sort[sort_by]
+        col = ALLOWED_SORT[sort_by]
     else:
-        col = User.id  # پیش‌فرض
-
-    if (sort_order or "asc") == "desc":
-        base_query = base_query.order_by(col.desc())
-    else:
-        base_query = base_query.order_by(col.asc())
+        sort_by, col = "id", User.id  # پیش‌فرض
+    descending = (sort_order or "asc") == "desc"
 
     # --- pagination ---
-    total = base_query.with_entities(func.count(User.id)).scalar() or 0
-    pages = math.ceil(total / size) if total else 0
-    offset = (page - 1) * size
-
-    users = base_query.offset(offset).limit(size).all()
-
-    items = [
-        UserSwaggerOut(
-            created_at=u.created_at,
-            created_at_jalali=to_jalali(u.created_at),
-            updated_at=u.updated_at,
-            updated_at_jalali=to_jalali(u.updated_at),
-            id=u.id,
-            username=u.username,
-            email=u.email,
-            fullname=u.fullname,
-            phone_number=u.phone_number,
-            role_id=u.role_id,
-            disabled=bool(u.disabled),
+    total = await resolve_total(db, include_total, table="users", filters=(search,), count_stmt=count_of(base_query))
+    pages = page_count(total, size)
+
+    next_cursor = None
+    if cursor or after:
+        sort_key = f"{sort_by}:{'desc' if descending else 'asc'}"
+        stmt = keyset_select(
+            base_query, col=col, id_col=User.id, descending=descending, sort_key=sort_key, after=after, size=size
+        )
+        users, next_cursor = keyset_trim(
+            (await db.execute(stmt)).all(),
+            size=size,
+            sort_key=sort_key,
+            key=lambda u: (getattr(u, sort_by), u.id),
         )
-        for u in users
-    ]
+    else:
+        if descending:
+            base_query = base_query.order_by(col.desc())
+        else:
+            base_query = base_query.order_by(col.asc())
+
+        offset = (page - 1) * size
+        users = (await db.execute(base_query.offset(offset).limit(size))).all()
+
+    items = rows_to_items(users, fields)
+    for item in items:
+        item["created_at_jalali"] = to_jalali(item["created_at"])
+        item["updated_at_jalali"] = to_jalali(item["updated_at"])
+        item["disabled"] = bool(item["disabled"])
 
-    return UsersListOut(total=total, size=size, pages=pages, items=items)
+    return conditional.apply(list_response(total=total, size=size, pages=pages, items=items, next_cursor=next_cursor))
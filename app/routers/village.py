@@ -1,12 +1,17 @@
-from math import ceil
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import asc, desc, select
 
-from ..db import get_db
-from .. import models, schemas
+from ..db import get_async_db, get_read_db, read_session_factory
+from .. import geo_cache, models, schemas, stat_counts
+from ..bulk_io import EXPORT_FORMAT_PATTERN, bulk_create, export_response
+from ..config import settings
 from ..security import require_auth
+from ..conditional import evaluate
+from ..serialization import list_response, project, rows_to_items
+from ..pagination import INCLUDE_TOTAL_PATTERN, count_of, keyset_select, keyset_trim, page_count, resolve_total
+from ..writes import insert_row, timestamps
 
 router = APIRouter(tags=["Village"])
 
@@ -17,93 +22,160 @@ router = APIRouter(tags=["Village"])
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_auth)],
 )
-def create_village(payload: schemas.VillageCreateIn, db: Session = Depends(get_db)):
+async def create_village(payload: schemas.VillageCreateIn, db: AsyncSession = Depends(get_async_db)):
     name = (payload.village or "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="village is required")
 
-    city = db.query(models.City).filter(models.City.id == payload.city_id).first()
-    if not city:
+    # نام شهر برای پاسخ لازم است و معمولاً از کش می‌آید؛ شهری که بین این چک و insert حذف شود را FK می‌گیرد
+    city = await geo_cache.city(db, payload.city_id)
+    if city is None:
         raise HTTPException(status_code=404, detail="City not found")
 
-    exists = db.query(models.Village).filter(models.Village.village == name).first()
-    if exists:
-        raise HTTPException(status_code=409, detail="Village already exists")
-
-    row = models.Village(village=name, city_id=payload.city_id)
-    db.add(row)
-    db.commit()
-    db.refresh(row)
+    values = {"village": name, "city_id": payload.city_id, **timestamps("created_at", "updated_at")}
+    stat_counts.add(db, stat_counts.VILLAGES_PER_CITY, payload.city_id)
+    village_id = await insert_row(
+        db, models.Village, values, conflict="Village already exists", missing_parent="City not found"
+    )
 
     return {
-        "village": row.village,
-        "city_id": row.city_id,
-        "id": row.id,
-        "created_at": row.created_at,
-        "city": city.city,
+        "village": name,
+        "city_id": payload.city_id,
+        "id": village_id,
+        "created_at": values["created_at"],
+        "city": city[0],
     }
 
 
+# ساخت گروهی روستاها: وجود شهرها و تکراری بودن نام‌ها هر کدام با یک کوئری، insert در یک تراکنش
+@router.post(
+    "/village/bulk",
+    response_model=schemas.BulkCreateOut,
+    dependencies=[Depends(require_auth)],
+)
+async def bulk_create_villages(payload: schemas.VillageBulkIn, db: AsyncSession = Depends(get_async_db)):
+    if len(payload.items) > settings.BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Too many items (max {settings.BULK_CREATE_MAX_ITEMS} per request)")
+    return await bulk_create(
+        db,
+        models.Village,
+        "village",
+        "city_id",
+        models.City,
+        [item.model_dump() for item in payload.items],
+        metric=stat_counts.VILLAGES_PER_CITY,
+    )
+
+
+# فیلترهای مشترک لیست و خروجی
+async def _filter_villages(db: AsyncSession, q, city_id: int | None, province_id: int | None, search: str | None):
+    if city_id is not None:
+        q = q.where(models.Village.city_id == city_id)
+
+    if province_id is not None:
+        q = q.where(models.Village.city_id.in_(await geo_cache.city_ids_of_province(db, province_id)))
+
+    if search:
+        s = search.strip()
+        if s:
+            q = q.where(models.Village.village.ilike(f"%{s}%"))
+    return q
+
+
+# sort fields مجاز
+SORT_MAP = {
+    "id": models.Village.id,
+    "village": models.Village.village,
+    "city_id": models.Village.city_id,
+    "created_at": models.Village.created_at,
+    "city": models.City.city,  # این یکی هم از روی join
+}
+
+
 @router.get(
     "/village/",
     response_model=schemas.VillageListOut,
     dependencies=[Depends(require_auth)],
 )
-def get_all_villages(
+async def get_all_villages(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(50, ge=1, le=100, description="Page size"),
     sort_by: str | None = Query(None, description="Sort field"),
     sort_order: str | None = Query(None, pattern="^(asc|desc)$", description="Sort order"),
     search: str | None = Query(None, description="Search term"),
     city_id: int | None = Query(None, description="Filter by city ID"),
-    db: Session = Depends(get_db),
+    province_id: int | None = Query(None, description="Filter by province ID"),
+    include_total: str = Query("exact", pattern=INCLUDE_TOTAL_PATTERN, description="false | exact | estimate"),
+    cursor: bool = Query(False, description="Keyset (cursor) pagination instead of page"),
+    after: str | None = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    # join برای اینکه city name برگرده
-    q = db.query(models.Village, models.City).join(models.City, models.Village.city_id == models.City.id)
-
-    if city_id is not None:
-        q = q.filter(models.Village.city_id == city_id)
-
-    if search:
-        s = search.strip()
-        if s:
-            q = q.filter(models.Village.village.ilike(f"%{s}%"))
+    conditional = await evaluate(request, db, "village", "city")
+    if conditional.not_modified:
+        return conditional.not_modified_response()
 
-    total = q.count()
+    # نام شهر از کش geo_cache می‌آید؛ join فقط برای sort_by=city لازم است
+    q, fields = project(models.Village, schemas.VillageOut)
+    q = await _filter_villages(db, q, city_id, province_id, search)
 
-    # sort fields مجاز
-    sort_map = {
-        "id": models.Village.id,
-        "village": models.Village.village,
-        "city_id": models.Village.city_id,
-        "created_at": models.Village.created_at,
-        "city": models.City.city,  # این یکی هم از روی join
-    }
+    total = await resolve_total(
+        db, include_total, table="village", filters=(city_id, province_id, search), count_stmt=count_of(q)
+    )
+    pages = page_count(total, size)
 
     if sort_by:
-        col = sort_map.get(sort_by)
+        col = SORT_MAP.get(sort_by)
         if not col:
             raise HTTPException(status_code=400, detail="Invalid sort_by")
-        q = q.order_by(desc(col) if sort_order == "desc" else asc(col))
+        descending = sort_order == "desc"
+        if sort_by == "city":
+            q = q.join(models.City, models.Village.city_id == models.City.id)
     else:
-        q = q.order_by(desc(models.Village.id))
-
-    rows = q.offset((page - 1) * size).limit(size).all()
-    pages = ceil(total / size) if total else 0
-
-    items = []
-    for v, c in rows:
-        items.append(
-            {
-                "village": v.village,
-                "city_id": v.city_id,
-                "id": v.id,
-                "created_at": v.created_at,
-                "city": c.city,
-            }
+        sort_by, col, descending = "id", models.Village.id, True
+
+    next_cursor = None
+    if cursor or after:
+        sort_key = f"{sort_by}:{'desc' if descending else 'asc'}"
+        stmt = keyset_select(
+            q, col=col, id_col=models.Village.id, descending=descending, sort_key=sort_key, after=after, size=size
+        )
+        rows = (await db.execute(stmt)).all()
+        city_names = await geo_cache.city_names(db, [v.city_id for v in rows])
+        rows, next_cursor = keyset_trim(
+            rows,
+            size=size,
+            sort_key=sort_key,
+            key=lambda r: (city_names[r.city_id] if sort_by == "city" else getattr(r, sort_by), r.id),
         )
+    else:
+        q = q.order_by(desc(col) if descending else asc(col))
+        rows = (await db.execute(q.offset((page - 1) * size).limit(size))).all()
+        city_names = await geo_cache.city_names(db, [v.city_id for v in rows])
+
+    items = rows_to_items(rows, fields)
+    for item in items:
+        item["city"] = city_names[item["city_id"]]
+
+    return conditional.apply(list_response(total=total, size=size, pages=pages, items=items, next_cursor=next_cursor))
+
 
-    return {"total": total, "size": size, "pages": pages, "items": items}
+@router.get("/village/export", dependencies=[Depends(require_auth)])
+async def export_villages(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv | ndjson"),
+    search: str | None = Query(None, description="Search term"),
+    city_id: int | None = Query(None, description="Filter by city ID"),
+    province_id: int | None = Query(None, description="Filter by province ID"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # اینجا join روی کلید اصلی ارزان است و نام شهر همراه ردیف‌ها stream می‌شود
+    v = models.Village
+    stmt = select(v.id, v.village, v.city_id, models.City.city, v.created_at).outerjoin(
+        models.City, v.city_id == models.City.id
+    )
+    stmt = (await _filter_villages(db, stmt, city_id, province_id, search)).order_by(v.id)
+    return export_response(stmt, format, "villages", read_session_factory(request))
 
 
 @router.delete(
@@ -111,18 +183,19 @@ def get_all_villages(
     response_model=schemas.MessageOut,
     dependencies=[Depends(require_auth)],
 )
-def delete_village(
+async def delete_village(
     village: str = Path(..., description="village"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     name = (village or "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="village is required")
 
-    row = db.query(models.Village).filter(models.Village.village == name).first()
+    row = await db.scalar(select(models.Village).where(models.Village.village == name))
     if not row:
         raise HTTPException(status_code=404, detail="Village not found")
 
-    db.delete(row)
-    db.commit()
+    stat_counts.add(db, stat_counts.VILLAGES_PER_CITY, row.city_id, -1)
+    await db.delete(row)
+    await db.commit()
     return {"message": "Village deleted successfully"}
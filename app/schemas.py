@@ -40,10 +40,11 @@ class UserUpdateSwaggerIn(BaseModel):
 
 
 class UsersListOut(BaseModel):
-    total: int
+    total: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
     items: List[UserSwaggerOut]
+    next_cursor: Optional[str] = None
 
 
 # ---------- Auth ----------
@@ -86,10 +87,11 @@ class ProvinceOut(BaseModel):
 
 
 class ProvinceListOut(BaseModel):
-    total: int
+    total: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
     items: List[ProvinceOut]
+    next_cursor: Optional[str] = None
 
 
 # خروجی DELETE طبق Swagger
@@ -97,6 +99,21 @@ class MessageOut(BaseModel):
     message: str
 
 
+# ---------- Bulk create (City / Village) ----------
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str  # created | invalid | duplicate | exists | parent_not_found
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BulkCreateOut(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkItemResult]
+
+
 # ---------- City ----------
 
 class CityCreateIn(BaseModel):
@@ -104,6 +121,10 @@ class CityCreateIn(BaseModel):
     province_id: int
 
 
+class CityBulkIn(BaseModel):
+    items: list[CityCreateIn]
+
+
 class CityCreatedOut(BaseModel):
     city: str
     province_id: int
@@ -119,10 +140,11 @@ class CityOut(BaseModel):
 
 
 class CityListOut(BaseModel):
-    total: int
+    total: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
     items: List[CityOut]
+    next_cursor: Optional[str] = None
 
 
 class MessageOut(BaseModel):
@@ -135,6 +157,9 @@ class VillageCreateIn(BaseModel):
     village: str
     city_id: int
 
+class VillageBulkIn(BaseModel):
+    items: list[VillageCreateIn]
+
 class VillageCreatedOut(BaseModel):
     village: str
     city_id: int
@@ -150,10 +175,11 @@ class VillageOut(BaseModel):
     city: str
 
 class VillageListOut(BaseModel):
-    total: int
+    total: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
     items: List[VillageOut]
+    next_cursor: Optional[str] = None
 
 
 # ---------- CropYear ----------
@@ -172,10 +198,11 @@ class CropYearOut(BaseModel):
     created_at: Optional[datetime] = None
 
 class CropYearListOut(BaseModel):
-    total: int
+    total: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
     items: List[CropYearOut]
+    next_cursor: Optional[str] = None
 
 
 
@@ -204,7 +231,69 @@ class FarmerOut(BaseModel):
     updated_at: Optional[datetime]
 
 class FarmerListOut(BaseModel):
-    total: int
+    total: Optional[int] = None
     size: int
-    pages: int
-    items: list[FarmerOut]
\ No newline at end of file
+    pages: Optional[int] = None
+    items: list[FarmerOut]
+    next_cursor: Optional[str] = None
+
+class FarmerLookupIn(BaseModel):
+    national_ids: list[str]
+
+class FarmerLookupOut(BaseModel):
+    items: list[FarmerOut]
+    missing: list[str]
+
+class FarmerImportError(BaseModel):
+    row: int
+    national_id: Optional[str] = None
+    error: str
+
+class FarmerImportOut(BaseModel):
+    total_rows: int
+    inserted: int
+    failed: int
+    errors: list[FarmerImportError]
+    errors_truncated: bool = False
+
+
+# ---------- Stats ----------
+
+class ProvinceCityCount(BaseModel):
+    province_id: int
+    province: Optional[str] = None
+    count: int
+
+
+class CityVillageCount(BaseModel):
+    city_id: int
+    city: Optional[str] = None
+    province_id: Optional[int] = None
+    count: int
+
+
+class MonthFarmerCount(BaseModel):
+    month: str  # jalali: 1405/07، gregorian: 2026-10
+    count: int
+
+
+class RoleUserCount(BaseModel):
+    role_id: int
+    role: Optional[str] = None
+    count: int
+
+
+class StatsTotals(BaseModel):
+    cities: int
+    villages: int
+    farmers: int
+    users: int
+
+
+class StatsOut(BaseModel):
+    calendar: str
+    totals: StatsTotals
+    cities_per_province: list[ProvinceCityCount]
+    villages_per_city: list[CityVillageCount]
+    farmers_per_month: list[MonthFarmerCount]
+    users_per_role: list[RoleUserCount]
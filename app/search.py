@@ -0,0 +1,65 @@
+import re
+
+from .config import settings
+from . import models
+
+# یکسان‌سازی نویسه‌های عربی/فارسی و ارقام تا «علي» و «علی» یکی حساب شوند. هم عبارت جستجو و
+# هم نام ذخیره‌شده (ستون farmer.full_name_normalized) با همین تابع یکسان می‌شوند؛ تغییر آن
+# یعنی ستون ذخیره‌شده هم باید دوباره ساخته شود (مثل UPDATE در migrations/0008).
+_CHAR_MAP = str.maketrans(
+    {
+        "ي": "ی",
+        "ى": "ی",
+        "ك": "ک",
+        "ة": "ه",
+        "ۀ": "ه",
+        "أ": "ا",
+        "إ": "ا",
+        "ٱ": "ا",
+        "\u200c": " ",  # نیم‌فاصله
+        "\u0640": None,  # کشیده (ـ)
+        **{chr(0x06F0 + i): str(i) for i in range(10)},  # ارقام فارسی
+        **{chr(0x0660 + i): str(i) for i in range(10)},  # ارقام عربی
+    }
+)
+_DIACRITICS = re.compile("[\u064b-\u065f\u0670]")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    text = _DIACRITICS.sub("", (text or "").translate(_CHAR_MAP))
+    return " ".join(text.split())
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(normalize(text))
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def farmer_search_clause(term: str, dialect: str):
+    """
+    انتخاب مسیر جستجو (متن روی full_name_normalized، نه full_name خام):
+      - فقط رقم  -> prefix روی national_id (ایندکس unique)
+      - متن در MySQL -> MATCH ... AGAINST روی ایندکس FULLTEXT با ngram parser
+      - متن کوتاه‌تر از ngram در MySQL -> LIKE پیشوندی روی ایندکس ix_farmer_full_name_normalized
+      - سایر دیتابیس‌ها -> ilike
+    """
+    term = normalize(term)
+    if not term:
+        return None
+
+    if term.isdigit():
+        return models.Farmer.national_id.like(f"{_escape_like(term)}%", escape="\\")
+
+    name = models.Farmer.full_name_normalized
+    if dialect == "mysql":
+        # توکن‌های کوتاه‌تر از ngram_token_size در ایندکس FULLTEXT نیستند
+        tokens = [t for t in tokenize(term) if len(t) >= settings.SEARCH_NGRAM_TOKEN_SIZE]
+        if tokens:
+            return name.match(" ".join(f"+{t}" for t in tokens))
+        return name.like(f"{_escape_like(term)}%", escape="\\")
+
+    return name.ilike(f"%{term}%") | models.Farmer.national_id.ilike(f"%{term}%")
@@ -1,19 +1,25 @@
 # app/security.py
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 from typing import Optional
 
-from jose import jwt, JWTError
+from jose import jwt, JWTError, ExpiredSignatureError
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .config import settings
-from .db import get_db
-from . import models
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .db import get_async_db
+from . import hashing, models
 
 # auto_error=False یعنی اگر توکن نبود خودش 401 نده، ما خودمون تصمیم می‌گیریم
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token", auto_error=False)
@@ -29,17 +35,20 @@ def _ensure_bcrypt_limit(raw_password: str) -> None:
         )
 
 
-def hash_password(raw: str) -> str:
+# bcrypt سنگین است؛ در handlerهای async در executor جداگانه‌ی hashing اجرا می‌شود
+async def hash_password_async(raw: str) -> str:
     _ensure_bcrypt_limit(raw)
-    return pwd_context.hash(raw)
+    return await hashing.run(hashing.bcrypt_hash, raw)
 
 
-def verify_password(raw: str, hashed: str) -> bool:
-    return pwd_context.verify(raw, hashed)
+async def verify_password_async(raw: str, hashed: str) -> bool:
+    return await hashing.run(hashing.bcrypt_verify, raw, hashed)
 
 
 # --------- JWT TOKEN CREATION ---------
-def _create_token(*, subject: str, token_type: str, expires_delta: timedelta, secret: str) -> str:
+def _create_token(
+    *, subject: str, token_type: str, expires_delta: timedelta, secret: str, token_version: int, sid: Optional[str]
+) -> str:
     now = datetime.now(timezone.utc)
     payload = {
         "sub": subject,          # user_id
@@ -47,25 +56,32 @@ def _create_token(*, subject: str, token_type: str, expires_delta: timedelta, se
         "iat": int(now.timestamp()),
         "exp": int((now + expires_delta).timestamp()),
         "jti": str(uuid4()),
+        "tv": token_version,     # نسخه‌ی توکن کاربر هنگام صدور (TOKEN VERSION پایین‌تر)
     }
+    if sid:
+        payload["sid"] = sid     # session (login) صادرکننده (SESSIONS پایین‌تر)
     return jwt.encode(payload, secret, algorithm=settings.JWT_ALG)
 
 
-def create_access_token(user_id: int) -> str:
+def create_access_token(user_id: int, token_version: int = 0, sid: Optional[str] = None) -> str:
     return _create_token(
         subject=str(user_id),
         token_type="access",
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
         secret=settings.JWT_SECRET,
+        token_version=token_version,
+        sid=sid,
     )
 
 
-def create_refresh_token(user_id: int) -> str:
+def create_refresh_token(user_id: int, token_version: int = 0, sid: Optional[str] = None) -> str:
     return _create_token(
         subject=str(user_id),
         token_type="refresh",
         expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
         secret=settings.JWT_REFRESH_SECRET,
+        token_version=token_version,
+        sid=sid,
     )
 
 
@@ -85,29 +101,370 @@ def decode_refresh_token(token: str) -> dict:
 
 
 # --------- BLACKLIST ---------
-def is_blacklisted(db: Session, token: str) -> bool:
-    return (
-        db.query(models.TokenBlacklist)
-        .filter(models.TokenBlacklist.token == token)
-        .first()
-        is not None
-    )
+# توکن‌های قدیمی بدون claim «sid» (صادرشده پیش از SESSIONS پایین‌تر) با logout تا زمان انقضا در
+# token_blacklist ثبت می‌شوند. jti های باطل‌شده (jti -> exp) در حافظه نگه داشته می‌شوند تا حالت
+# معمول «توکن باطل نشده» بدون هیچ کوئری دیتابیس جواب داده شود. جدول token_blacklist
+# منبع اصلی است؛ refresh_blacklist ردیف‌های جدید (از workerهای دیگر) را می‌خواند
+# و ردیف‌های منقضی را پاک می‌کند. ابطال همه‌ی توکن‌های کاربر با نسخه‌ی توکن است (پایین‌تر).
+#
+# ردیف‌های جدید با blacklisted_at پیدا می‌شوند، نه با id: id (و blacklisted_at) هنگام INSERT
+# تعیین می‌شود ولی ردیف با COMMIT دیده می‌شود، پس ردیفی با id کوچک‌تر می‌تواند بعد از id بزرگ‌تر
+# دیده شود. هر sync پنجره‌ی BLACKLIST_SYNC_OVERLAP_SECONDS قبل از sync قبلی را دوباره می‌خواند
+# (تکراری‌ها با کلید jti یکی می‌شوند).
+_revoked: dict[str, int] = {}
+_revoked_lock = threading.Lock()
+_revoked_synced_at: Optional[datetime] = None  # ساعت دیتابیس در شروع آخرین sync
+
+
+def _utc_naive(ts: int) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+
+def _remember_revoked(jti: str, exp: int) -> None:
+    with _revoked_lock:
+        _revoked[jti] = exp
 
 
-def blacklist_token(db: Session, token: str) -> None:
+def is_blacklisted(payload: dict) -> bool:
+    # توکنی که خودش (jti) یا session آن (sid) با logout باطل شده
+    jti, sid = payload.get("jti"), payload.get("sid")
+    return (jti is not None and jti in _revoked) or (sid is not None and sid in _revoked_sessions)
+
+
+def _verified_claims(token: str) -> Optional[dict]:
+    for secret in (settings.JWT_SECRET, settings.JWT_REFRESH_SECRET):
+        try:
+            return jwt.decode(token, secret, algorithms=[settings.JWT_ALG])
+        except ExpiredSignatureError:
+            # توکن منقضی خودش دیگر معتبر نیست؛ نیازی به ثبت ندارد
+            return None
+        except JWTError:
+            continue
+    return None
+
+
+async def blacklist_token(db: AsyncSession, token: str) -> None:
     if not token:
         return
-    if not is_blacklisted(db, token):
-        db.add(models.TokenBlacklist(token=token))
-        db.commit()
+    payload = _verified_claims(token)
+    if not payload or not payload.get("jti") or not payload.get("exp"):
+        return
+    # توکن باطل‌شده (قبلاً logout شده یا با نسخه‌ی توکن) ردیف لازم ندارد
+    if is_blacklisted(payload) or token_revoked(payload):
+        return
+
+    _forget_principal(token)
+    db.add(models.TokenBlacklist(jti=payload["jti"], expires_at=_utc_naive(payload["exp"])))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # هم‌زمان در درخواست/worker دیگری ثبت شده
+        await db.rollback()
+    _remember_revoked(payload["jti"], payload["exp"])
+
+
+async def refresh_blacklist(db: AsyncSession) -> None:
+    global _revoked_synced_at
+    now = datetime.now(timezone.utc)
+
+    result = await db.execute(
+        delete(models.TokenBlacklist).where(models.TokenBlacklist.expires_at < now.replace(tzinfo=None))
+    )
+    # بیشتر tickها چیزی منقضی نشده؛ commit بی‌مورد table_version را در هر worker بالا می‌برد
+    if result.rowcount:
+        await db.commit()
+    else:
+        await db.rollback()
+
+    # ساعت خود دیتابیس (همان که blacklisted_at را پر می‌کند)، نه ساعت این سرور
+    synced_at = await db.scalar(select(func.now()))
+    query = select(models.TokenBlacklist.jti, models.TokenBlacklist.expires_at)
+    if _revoked_synced_at is not None:
+        since = _revoked_synced_at - timedelta(seconds=settings.BLACKLIST_SYNC_OVERLAP_SECONDS)
+        query = query.where(models.TokenBlacklist.blacklisted_at >= since)
+    rows = (await db.execute(query)).all()
+
+    now_ts = int(now.timestamp())
+    with _revoked_lock:
+        for jti, expires_at in rows:
+            _revoked[jti] = int(expires_at.replace(tzinfo=timezone.utc).timestamp())
+        for jti in [j for j, exp in _revoked.items() if exp < now_ts]:
+            del _revoked[jti]
+        _revoked_synced_at = synced_at
+
+
+# --------- SESSIONS ---------
+# هر login یک ردیف user_session می‌سازد و sid آن در access / refresh token های همان دستگاه
+# می‌آید؛ refresh همان sid را نگه می‌دارد. logout فقط revoked_at همان ردیف را پر می‌کند (ردیف
+# جدیدی ساخته نمی‌شود) و sid های باطل‌شده (sid -> انقضای session) مثل jti های blacklist در
+# حافظه‌ی هر worker هستند و refresh_revoked_sessions با همان پنجره‌ی هم‌پوشان همگامشان می‌کند.
+_revoked_sessions: dict[str, int] = {}
+_revoked_sessions_synced_at: Optional[datetime] = None
+
+
+def _session_expiry() -> datetime:
+    return (datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)).replace(tzinfo=None)
+
+
+async def open_session(db: AsyncSession, user_id: int) -> str:
+    sid = str(uuid4())
+    db.add(models.UserSession(sid=sid, user_id=user_id, expires_at=_session_expiry()))
+    await db.commit()
+    return sid
+
+
+async def extend_session(db: AsyncSession, sid: str, user_id: int) -> bool:
+    """
+    برای refresh: session باید هنوز باطل نشده باشد (از دیتابیس، نه حافظه‌ای که ممکن است عقب باشد)؛
+    انقضای آن تا انقضای refresh token جدید جلو می‌رود.
+    """
+    result = await db.execute(
+        update(models.UserSession)
+        .where(
+            models.UserSession.sid == sid,
+            models.UserSession.user_id == user_id,
+            models.UserSession.revoked_at.is_(None),
+        )
+        .values(expires_at=_session_expiry())
+    )
+    await db.commit()
+    return bool(result.rowcount)
+
+
+def _remember_revoked_sessions(rows) -> None:
+    with _revoked_lock:
+        for sid, expires_at in rows:
+            _revoked_sessions[sid] = int(expires_at.replace(tzinfo=timezone.utc).timestamp())
+
+
+async def logout_tokens(db: AsyncSession, *tokens: str) -> None:
+    # logout: فقط session همین توکن‌ها (همین دستگاه) باطل می‌شود؛ sessionهای دیگر کاربر می‌مانند
+    sids = set()
+    for token in tokens:
+        payload = _verified_claims(token) if token else None
+        if not payload:
+            continue
+        if not payload.get("sid"):
+            await blacklist_token(db, token)
+            continue
+        _forget_principal(token)
+        if not is_blacklisted(payload) and not token_revoked(payload):
+            sids.add(payload["sid"])
+    if not sids:
+        return
+
+    session = models.UserSession
+    await db.execute(
+        update(session).where(session.sid.in_(sids), session.revoked_at.is_(None)).values(revoked_at=func.now())
+    )
+    rows = (await db.execute(select(session.sid, session.expires_at).where(session.sid.in_(sids)))).all()
+    await db.commit()
+    _remember_revoked_sessions(rows)
+
+
+async def refresh_revoked_sessions(db: AsyncSession) -> None:
+    global _revoked_sessions_synced_at
+    now = datetime.now(timezone.utc)
+
+    session = models.UserSession
+    result = await db.execute(delete(session).where(session.expires_at < now.replace(tzinfo=None)))
+    if result.rowcount:
+        await db.commit()
+    else:
+        await db.rollback()
+
+    # مثل refresh_blacklist: revoked_at هنگام UPDATE تعیین می‌شود ولی با COMMIT دیده می‌شود
+    synced_at = await db.scalar(select(func.now()))
+    query = select(session.sid, session.expires_at).where(session.revoked_at.is_not(None))
+    if _revoked_sessions_synced_at is not None:
+        since = _revoked_sessions_synced_at - timedelta(seconds=settings.BLACKLIST_SYNC_OVERLAP_SECONDS)
+        query = query.where(session.revoked_at >= since)
+    rows = (await db.execute(query)).all()
+
+    _remember_revoked_sessions(rows)
+    now_ts = int(now.timestamp())
+    with _revoked_lock:
+        for sid in [s for s, exp in _revoked_sessions.items() if exp < now_ts]:
+            del _revoked_sessions[sid]
+        _revoked_sessions_synced_at = synced_at
+
+
+# --------- TOKEN VERSION ---------
+# هر کاربر یک نسخه‌ی توکن دارد (user_token_version) و هر توکن نسخه‌ی زمان صدورش را در
+# claim «tv» دارد؛ توکنی که tv آن از نسخه‌ی فعلی کمتر باشد باطل است. logout-all، تغییر رمز و
+# غیرفعال کردن کاربر نسخه را یکی بالا می‌برند، پس ابطال همه‌ی توکن‌های کاربر یک ردیف است
+# و بررسی آن در هر درخواست یک lookup در همین dict. نسخه‌ها در حافظه‌ی هر worker هستند و
+# refresh_token_versions (همراه blacklist) تغییرات workerهای دیگر را می‌خواند. توکن‌های
+# قدیمی بدون tv نسخه‌ی 0 حساب می‌شوند.
+_token_versions: dict[int, int] = {}  # user_id -> version (فقط کاربرانی که ردیف دارند)
+_token_versions_lock = threading.Lock()
+
+
+def _remember_token_version(user_id: int, version: int) -> None:
+    # نسخه‌ها فقط بالا می‌روند؛ مقدار کهنه‌تر (مثلاً sync هم‌زمان با commit) نادیده گرفته می‌شود
+    with _token_versions_lock:
+        if version > _token_versions.get(user_id, 0):
+            _token_versions[user_id] = version
+
+
+def token_revoked(payload: dict) -> bool:
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return False
+    return payload.get("tv", 0) < _token_versions.get(user_id, 0)
+
+
+async def current_token_version(db: AsyncSession, user_id: int) -> int:
+    # برای صدور توکن (login / refresh) از دیتابیس خوانده می‌شود، نه از حافظه‌ای که ممکن است عقب باشد
+    version = await db.scalar(
+        select(models.UserTokenVersion.version).where(models.UserTokenVersion.user_id == user_id)
+    )
+    if version is None:
+        return 0
+    _remember_token_version(user_id, version)
+    return version
+
+
+def _bump_stmt(dialect: str, user_id: int):
+    tv = models.UserTokenVersion
+    row = {"user_id": user_id, "version": 1, "updated_at": datetime.now(timezone.utc).replace(tzinfo=None)}
+    if dialect == "mysql":
+        stmt = mysql_insert(tv).values(row)
+        return stmt.on_duplicate_key_update(version=tv.version + 1, updated_at=stmt.inserted.updated_at)
+    stmt = sqlite_insert(tv).values(row)
+    return stmt.on_conflict_do_update(
+        index_elements=[tv.user_id], set_={"version": tv.version + 1, "updated_at": stmt.excluded.updated_at}
+    )
+
+
+async def revoke_user_tokens(db: AsyncSession, user_id: int) -> None:
+    """همه‌ی توکن‌های صادرشده‌ی کاربر را باطل می‌کند؛ با commit همین session اعمال می‌شود."""
+    await db.execute(_bump_stmt(db.get_bind().dialect.name, user_id))
+    version = await db.scalar(
+        select(models.UserTokenVersion.version).where(models.UserTokenVersion.user_id == user_id)
+    )
+    db.info.setdefault("revoked_token_versions", {})[user_id] = version
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_revoked_token_versions(session):
+    for user_id, version in session.info.pop("revoked_token_versions", {}).items():
+        _remember_token_version(user_id, version)
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_revoked_token_versions(session, previous_transaction):
+    session.info.pop("revoked_token_versions", None)
+
+
+async def revoke_tokens_of(db: AsyncSession, *tokens: str) -> None:
+    # logout-all: کاربر صاحب توکن‌ها (access و/یا refresh) از همه‌ی دستگاه‌ها خارج می‌شود
+    user_ids = set()
+    for token in tokens:
+        payload = _verified_claims(token) if token else None
+        # توکن نامعتبر، منقضی یا از قبل باطل‌شده کاری لازم ندارد
+        if not payload or is_blacklisted(payload) or token_revoked(payload):
+            continue
+        try:
+            user_ids.add(int(payload.get("sub")))
+        except (TypeError, ValueError):
+            continue
+    for user_id in sorted(user_ids):
+        await revoke_user_tokens(db, user_id)
+    if user_ids:
+        await db.commit()
+
+
+async def refresh_token_versions(db: AsyncSession) -> None:
+    # جدول کوچک است (فقط کاربرانی که توکن‌هایشان باطل شده)، پس هر بار کامل خوانده می‌شود
+    rows = (await db.execute(select(models.UserTokenVersion.user_id, models.UserTokenVersion.version))).all()
+    with _token_versions_lock:
+        for user_id, version in rows:
+            if version > _token_versions.get(user_id, 0):
+                _token_versions[user_id] = version
+
+
+# --------- PRINCIPAL CACHE ---------
+# نتیجه‌ی احراز هویت هر access token (id / role_id / disabled) برای مدت کوتاهی
+# در حافظه می‌ماند تا درخواست‌های بعدی همان توکن نه JWT decode لازم داشته باشند
+# نه کوئری User. با تغییر کاربر (update_user / change_password) و logout پاک می‌شود؛
+# برای تغییراتی که در worker دیگری انجام شده TTL تعیین‌کننده است.
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    role_id: int
+    disabled: bool
+
+
+_principals: OrderedDict = OrderedDict()  # token -> (deadline, jti, sid, tv, Principal)
+_principal_tokens: dict[int, set] = {}  # user_id -> tokens
+_principals_lock = threading.Lock()
+
+
+def _remember_principal(token: str, jti: str, sid: Optional[str], exp: int, tv: int, principal: Principal) -> None:
+    ttl = min(settings.PRINCIPAL_CACHE_TTL_SECONDS, exp - time.time())
+    if ttl <= 0:
+        return
+    with _principals_lock:
+        _principals[token] = (time.monotonic() + ttl, jti, sid, tv, principal)
+        _principals.move_to_end(token)
+        _principal_tokens.setdefault(principal.id, set()).add(token)
+        while len(_principals) > settings.PRINCIPAL_CACHE_MAX_ENTRIES:
+            old_token, (*_, old) = _principals.popitem(last=False)
+            _principal_tokens.get(old.id, set()).discard(old_token)
+
+
+def _forget_principal(token: str) -> None:
+    with _principals_lock:
+        hit = _principals.pop(token, None)
+        if hit:
+            _principal_tokens.get(hit[4].id, set()).discard(token)
+
+
+def invalidate_principal(user_id: int) -> None:
+    with _principals_lock:
+        for token in _principal_tokens.pop(user_id, ()):
+            _principals.pop(token, None)
+
+
+def _cached_principal(token: str) -> Optional[tuple]:
+    with _principals_lock:
+        hit = _principals.get(token)
+        if hit is None:
+            return None
+        if hit[0] < time.monotonic():
+            _principals.pop(token, None)
+            _principal_tokens.get(hit[4].id, set()).discard(token)
+            return None
+        _principals.move_to_end(token)
+        return hit
+
+
+def _check_principal(principal: Principal) -> Principal:
+    if principal.disabled:
+        raise HTTPException(status_code=403, detail="User is disabled")
+    return principal
 
 
 # --------- INTERNAL: get user from access token ---------
-def _get_user_from_access_token(db: Session, token: str) -> models.User:
-    if is_blacklisted(db, token):
-        raise HTTPException(status_code=401, detail="Token is blacklisted")
+async def _get_principal_from_access_token(db: AsyncSession, token: str) -> Principal:
+    hit = _cached_principal(token)
+    if hit is not None:
+        _, jti, sid, tv, principal = hit
+        if jti in _revoked or (sid is not None and sid in _revoked_sessions):
+            raise HTTPException(status_code=401, detail="Token is blacklisted")
+        if tv < _token_versions.get(principal.id, 0):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return _check_principal(principal)
 
     payload = decode_access_token(token)
+    if is_blacklisted(payload):
+        raise HTTPException(status_code=401, detail="Token is blacklisted")
+    if token_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
     if payload.get("type") != "access":
         raise HTTPException(status_code=401, detail="Invalid access token")
 
@@ -115,20 +472,23 @@ def _get_user_from_access_token(db: Session, token: str) -> models.User:
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    user = await db.get(models.User, int(user_id))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    if getattr(user, "disabled", False):
-        raise HTTPException(status_code=403, detail="User is disabled")
 
-    return user
+    principal = Principal(id=user.id, role_id=user.role_id, disabled=bool(user.disabled))
+    if payload.get("jti") and payload.get("exp"):
+        _remember_principal(
+            token, payload["jti"], payload.get("sid"), payload["exp"], payload.get("tv", 0), principal
+        )
+    return _check_principal(principal)
 
 
 # --------- REQUIRE AUTH / ADMIN ---------
-def require_auth(
-    db: Session = Depends(get_db),
+async def require_auth(
+    db: AsyncSession = Depends(get_async_db),
     token: Optional[str] = Depends(oauth2_scheme),
-) -> Optional[models.User]:
+) -> Optional[Principal]:
     # اگر Auth خاموش باشد، اصلاً توکن لازم نداریم
     if settings.DISABLE_AUTH == 1:
         return None
@@ -136,12 +496,12 @@ def require_auth(
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    return _get_user_from_access_token(db, token)
+    return await _get_principal_from_access_token(db, token)
 
 
-def require_admin(
-    current_user: Optional[models.User] = Depends(require_auth),
-) -> Optional[models.User]:
+async def require_admin(
+    current_user: Optional[Principal] = Depends(require_auth),
+) -> Optional[Principal]:
     if settings.DISABLE_AUTH == 1:
         return None
 
@@ -149,7 +509,7 @@ def require_admin(
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     # فعلاً فرض: role_id=1 یعنی admin
-    if getattr(current_user, "role_id", None) != 1:
+    if current_user.role_id != 1:
         raise HTTPException(status_code=403, detail="Admin only")
 
     return current_user
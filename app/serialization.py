@@ -0,0 +1,27 @@
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+
+# مسیر سبک خواندن لیست‌ها: فقط ستون‌های لازم schema به صورت Row (بدون ORM و
+# identity map) خوانده می‌شوند و خروجی مستقیم با orjson ساخته می‌شود. چون
+# endpoint خودش Response برمی‌گرداند، FastAPI دوباره با response_model اعتبارسنجی
+# نمی‌کند؛ response_model فقط برای مستندات OpenAPI می‌ماند.
+
+
+def project(model, schema, *extra):
+    """
+    select ستون‌هایی از model که در schema هستند (به ترتیب schema) و لیست نام آن‌ها.
+    ستون‌های extra (مثلاً id برای cursor) آخر select می‌آیند و در خروجی نیستند.
+    """
+    table_columns = model.__table__.columns
+    fields = [name for name in schema.model_fields if name in table_columns]
+    extras = [c for c in extra if c.key not in fields]
+    return select(*(getattr(model, name) for name in fields), *extras), fields
+
+
+def rows_to_items(rows, fields: list[str]) -> list[dict]:
+    # zip ستون‌های extra انتهای Row را کنار می‌گذارد
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def list_response(*, total, size: int, pages, items: list[dict], next_cursor=None) -> ORJSONResponse:
+    return ORJSONResponse({"total": total, "size": size, "pages": pages, "items": items, "next_cursor": next_cursor})
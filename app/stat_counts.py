@@ -0,0 +1,131 @@
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, event, func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+# شمارش‌های تجمیعی (شهرهای هر استان، روستاهای هر شهر، فارمرهای ثبت‌شده در هر روز، کاربران هر نقش)
+# در جدول stat_count نگه داشته می‌شوند تا GET /stats/ بدون COUNT / GROUP BY روی جدول‌های بزرگ جواب بدهد.
+# handlerهای ایجاد / حذف تغییر را با add() ثبت می‌کنند؛ همه‌ی تغییرهای یک تراکنش درست قبل از COMMIT
+# با یک upsert در همان تراکنش اعمال می‌شوند (مثل table_version در versions.py) و rollback آن‌ها را دور می‌ریزد.
+# نوشتن‌هایی که از این handlerها رد نمی‌شوند (generate_data، SQL دستی) را scripts/rebuild_stats.py اصلاح می‌کند.
+CITIES_PER_PROVINCE = "cities_per_province"
+VILLAGES_PER_CITY = "villages_per_city"
+# روز (نه ماه) تا ماه شمسی و میلادی هر دو هنگام خواندن از جمع روزها ساخته شوند
+FARMERS_PER_DAY = "farmers_per_day"
+USERS_PER_ROLE = "users_per_role"
+
+METRICS = (CITIES_PER_PROVINCE, VILLAGES_PER_CITY, FARMERS_PER_DAY, USERS_PER_ROLE)
+
+
+def day_bucket(value: date | datetime) -> str:
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+def add(session, metric: str, bucket, delta: int = 1) -> None:
+    """تغییر یک شمارش؛ با COMMIT همین session اعمال می‌شود (session می‌تواند AsyncSession باشد)."""
+    session.info.setdefault("stat_deltas", Counter())[(metric, str(bucket))] += delta
+
+
+def _apply_stmt(dialect: str, deltas: Counter):
+    from .models import StatCount
+
+    now = datetime.now().replace(microsecond=0)
+    # ترتیب ثابت ردیف‌ها تا دو تراکنش روی قفل ردیف‌های مشترک deadlock نکنند
+    rows = [
+        {"metric": metric, "bucket": bucket, "total": delta, "updated_at": now}
+        for (metric, bucket), delta in sorted(deltas.items())
+    ]
+    if dialect == "mysql":
+        stmt = mysql_insert(StatCount).values(rows)
+        return stmt.on_duplicate_key_update(
+            total=StatCount.total + stmt.inserted.total, updated_at=stmt.inserted.updated_at
+        )
+    stmt = sqlite_insert(StatCount).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[StatCount.metric, StatCount.bucket],
+        set_={"total": StatCount.total + stmt.excluded.total, "updated_at": stmt.excluded.updated_at},
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _persist_deltas(session):
+    deltas = session.info.pop("stat_deltas", None)
+    deltas = Counter({key: delta for key, delta in (deltas or {}).items() if delta})
+    if deltas:
+        # قفل ردیف‌های شمارش (ردیف داغ مثل روز جاری) فقط از اینجا تا COMMIT نگه داشته می‌شود
+        session.execute(_apply_stmt(session.get_bind().dialect.name, deltas))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop("stat_deltas", None)
+
+
+# --------- REBUILD ---------
+def _sources() -> dict:
+    from .models import City, Farmer, User, Village
+
+    day = func.date(Farmer.created_at)
+    return {
+        CITIES_PER_PROVINCE: select(City.province_id, func.count()).group_by(City.province_id),
+        VILLAGES_PER_CITY: select(Village.city_id, func.count()).group_by(Village.city_id),
+        FARMERS_PER_DAY: select(day, func.count()).where(Farmer.created_at.is_not(None)).group_by(day),
+        USERS_PER_ROLE: select(User.role_id, func.count()).group_by(User.role_id),
+    }
+
+
+def rebuild(conn, apply: bool = True) -> list[dict]:
+    """
+    شمارش‌ها را روی connection همگام (sync) از جدول‌های اصلی دوباره حساب می‌کند و اختلاف‌ها
+    (metric، bucket، stored، actual) را برمی‌گرداند؛ با apply فقط ردیف‌های اختلاف‌دار اصلاح می‌شوند.
+    COMMIT با صدا زننده است.
+    """
+    from .models import StatCount
+
+    table = StatCount.__table__
+    stored_q = select(table.c.metric, table.c.bucket, table.c.total)
+    if apply and conn.dialect.name == "mysql":
+        # همه‌ی ردیف‌ها (و فاصله‌ها) تا COMMIT قفل می‌شوند: upsert تراکنش‌های هم‌زمان منتظر می‌ماند و
+        # ردیف اصلی‌ای که هنوز commit نشده نه در شمارش اینجا دیده می‌شود و نه تغییرش گم می‌شود
+        stored_q = stored_q.with_for_update()
+    stored = {(metric, bucket): total for metric, bucket, total in conn.execute(stored_q)}
+
+    actual = {}
+    for metric, query in _sources().items():
+        for bucket, total in conn.execute(query):
+            # DATE() در MySQL شیء date و در SQLite رشته برمی‌گرداند؛ str هر دو را YYYY-MM-DD می‌کند
+            actual[(metric, str(bucket))] = total
+
+    drift = [
+        {"metric": metric, "bucket": bucket, "stored": stored.get((metric, bucket), 0), "actual": actual.get((metric, bucket), 0)}
+        for metric, bucket in sorted(stored.keys() | actual.keys())
+        if stored.get((metric, bucket), 0) != actual.get((metric, bucket), 0)
+    ]
+    if not apply or not drift:
+        return drift
+
+    now = datetime.now().replace(microsecond=0)
+    key = (table.c.metric == bindparam("m")) & (table.c.bucket == bindparam("b"))
+    gone = [{"m": d["metric"], "b": d["bucket"]} for d in drift if d["actual"] == 0]
+    changed = [
+        {"m": d["metric"], "b": d["bucket"], "t": d["actual"]}
+        for d in drift
+        if d["actual"] and (d["metric"], d["bucket"]) in stored
+    ]
+    missing = [
+        {"metric": d["metric"], "bucket": d["bucket"], "total": d["actual"], "updated_at": now}
+        for d in drift
+        if (d["metric"], d["bucket"]) not in stored
+    ]
+    if gone:
+        conn.execute(table.delete().where(key), gone)
+    if changed:
+        conn.execute(table.update().where(key).values(total=bindparam("t"), updated_at=now), changed)
+    if missing:
+        conn.execute(table.insert(), missing)
+    return drift
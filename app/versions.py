@@ -0,0 +1,96 @@
+import threading
+from datetime import datetime, timezone
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+# شمارنده‌ی نسخه برای هر جدول؛ بعد از هر commit که روی جدول نوشته باشد یکی زیاد می‌شود.
+# کش‌ها (count / ...) با مقایسه‌ی نسخه می‌فهمند داده‌شان کهنه شده یا نه.
+# توجه: این شمارنده‌ها per-process هستند.
+#
+# همان جدول‌ها در table_version دیتابیس هم درست قبل از COMMIT (در همان تراکنش) بالا می‌روند؛
+# آن نسخه بین workerها مشترک است و ETag / Last-Modified از آن ساخته می‌شود (app/conditional.py).
+VERSION_TABLE = "table_version"
+_lock = threading.Lock()
+_versions: dict[str, int] = {}
+
+
+def get(table: str) -> int:
+    return _versions.get(table, 0)
+
+
+def bump(*tables: str) -> None:
+    with _lock:
+        for t in tables:
+            _versions[t] = _versions.get(t, 0) + 1
+
+
+def _pending(session: Session) -> set:
+    return session.info.setdefault("written_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session, flush_context):
+    pending = _pending(session)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            pending.add(table.name)
+
+
+def _persist_stmt(dialect: str, tables):
+    from .models import TableVersion
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    # ترتیب ثابت ردیف‌ها تا دو تراکنش چند جدولی روی قفل‌ها deadlock نکنند
+    rows = [{"table_name": t, "version": 1, "updated_at": now} for t in sorted(tables)]
+    if dialect == "mysql":
+        stmt = mysql_insert(TableVersion).values(rows)
+        return stmt.on_duplicate_key_update(version=TableVersion.version + 1, updated_at=stmt.inserted.updated_at)
+    stmt = sqlite_insert(TableVersion).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[TableVersion.table_name],
+        set_={"version": TableVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _persist_versions(session):
+    # before_commit قبل از flush نهایی صدا زده می‌شود؛ flush تا جدول‌های همه‌ی تغییرها جمع شوند
+    session.flush()
+    tables = _pending(session) - {VERSION_TABLE}
+    if tables:
+        # قفل ردیف نسخه فقط از اینجا تا COMMIT نگه داشته می‌شود
+        session.execute(_persist_stmt(session.get_bind().dialect.name, tables))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state):
+    # insert/update/delete مستقیم (مثلا bulk insert) از after_flush رد نمی‌شوند
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is None:
+        return None
+    # اجرا همین‌جا (همراه listenerهای بعدی) تا rowcount معلوم باشد: UPDATE / DELETE ای که ردیفی را
+    # عوض نکرده (مثلاً پاک کردن blacklist منقضی وقتی چیزی منقضی نشده) نباید ETag و کش count را
+    # باطل کند یا table_version بنویسد. bulk insert ORM نتیجه‌ی بدون rowcount می‌دهد (-1: نوشته شده)
+    result = orm_execute_state.invoke_statement()
+    if getattr(result, "rowcount", -1) != 0:
+        _pending(orm_execute_state.session).add(table.name)
+    return result
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session):
+    pending = session.info.pop("written_tables", None)
+    if pending:
+        bump(*(pending - {VERSION_TABLE}))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop("written_tables", None)
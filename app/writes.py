@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# مسیر نوشتن یک رفت‌وبرگشتی: به جای «SELECT تکراری بودن -> INSERT -> COMMIT -> refresh»
+# مستقیم INSERT می‌شود و قید یکتایی / FK دیتابیس تصمیم می‌گیرد. این هم رفت‌وبرگشت کمتری دارد
+# و هم race دو درخواست هم‌زمان با یک نام (که قبلاً به 500 می‌رسید) را به 409 تبدیل می‌کند.
+# id از lastrowid همان INSERT و زمان‌ها از مقدار صریح همین‌جا می‌آیند، پس refresh لازم نیست.
+
+# کدهای خطای MySQL
+_DUPLICATE_KEY = 1062
+_MISSING_PARENT = (1452, 1216)  # FK: ردیف والد وجود ندارد
+
+
+def integrity_kind(e: IntegrityError) -> str | None:
+    """duplicate | missing_parent | None"""
+    args = getattr(e.orig, "args", ())
+    code = args[0] if args and isinstance(args[0], int) else None
+    message = str(e.orig)
+    # SQLite (بنچمارک‌ها) کد عددی ندارد
+    if code == _DUPLICATE_KEY or "UNIQUE constraint failed" in message:
+        return "duplicate"
+    if code in _MISSING_PARENT or "FOREIGN KEY constraint failed" in message:
+        return "missing_parent"
+    return None
+
+
+def timestamps(*names: str) -> dict:
+    # مقدار صریح به جای server_default تا بدون SELECT دوباره برگردانده شود؛
+    # میکروثانیه حذف می‌شود چون TIMESTAMP / DATETIME ستون‌ها دقت ثانیه دارند (MySQL آن را گرد می‌کند)
+    now = datetime.now().replace(microsecond=0)
+    return {name: now for name in names}
+
+
+async def insert_row(
+    db: AsyncSession,
+    model,
+    values: dict,
+    *,
+    conflict: str,
+    missing_parent: str | None = None,
+    missing_parent_status: int = 404,
+) -> int:
+    """INSERT + COMMIT؛ id ردیف جدید را برمی‌گرداند. تکراری -> 409، والد ناموجود -> missing_parent_status."""
+    try:
+        result = await db.execute(insert(model).values(**values))
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        kind = integrity_kind(e)
+        if kind == "duplicate":
+            raise HTTPException(status_code=409, detail=conflict)
+        if kind == "missing_parent" and missing_parent:
+            raise HTTPException(status_code=missing_parent_status, detail=missing_parent)
+        raise
+    return result.inserted_primary_key[0]
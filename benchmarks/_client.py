@@ -0,0 +1,56 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ms = [x * 1000 for x in latencies]
+    return {
+        "requests": len(ms) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+    }
+
+
+async def hammer(base_url: str, path: str, *, concurrency: int, requests: int, headers=None) -> dict:
+    """requests درخواست GET را با concurrency کلاینت هم‌زمان می‌فرستد."""
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(path, headers=headers)
+                if r.status_code >= 400:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    return summarize(latencies, errors, elapsed)
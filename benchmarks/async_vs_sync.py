@@ -0,0 +1,84 @@
+"""
+مقایسه‌ی throughput مسیر sync (def + Session روی threadpool) با مسیر async
+(async def + AsyncSession) زیر بار هم‌زمان، روی دیتابیس تنظیم‌شده در .env.
+
+هر دو endpoint همان کوئری صفحه‌ی اول لیست فارمرها را اجرا می‌کنند.
+
+    python -m benchmarks.async_vs_sync --concurrency 64 --requests 4000
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db import get_async_db, get_db
+
+from ._client import hammer
+
+bench_app = FastAPI()
+
+
+@bench_app.get("/sync/farmer")
+def sync_farmers(size: int = 50, db: Session = Depends(get_db)):
+    rows = db.query(models.Farmer).order_by(models.Farmer.id).limit(size).all()
+    return {"count": len(rows)}
+
+
+@bench_app.get("/async/farmer")
+async def async_farmers(size: int = 50, db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.scalars(select(models.Farmer).order_by(models.Farmer.id).limit(size))).all()
+    return {"count": len(rows)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(bench_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _run(base_url: str, args) -> dict:
+    results = {}
+    for name in ("sync", "async"):
+        path = f"/{name}/farmer?size={args.size}"
+        # warmup تا pool کانکشن‌ها پر شود
+        await hammer(base_url, path, concurrency=args.concurrency, requests=args.concurrency * 2)
+        results[name] = await hammer(base_url, path, concurrency=args.concurrency, requests=args.requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--size", type=int, default=50, help="page size of the farmer query")
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = _start_server(port)
+    try:
+        results = asyncio.run(_run(f"http://127.0.0.1:{port}", args))
+    finally:
+        server.should_exit = True
+
+    print(json.dumps({"concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+میکروبنچمارک تبدیل تاریخ شمسی: مسیر قبلی (jdatetime برای هر ردیف) در برابر
+app.jalali (تبدیل روز cache شده + قالب‌بندی ساعت).
+
+دو سناریو: ردیف‌های یک صفحه‌ی لیست (چند روز تکراری) و تاریخ‌های کاملاً پراکنده.
+
+    python -m benchmarks.jalali --rows 100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import jdatetime
+
+from app import jalali
+
+
+def per_row(dt):
+    # همان پیاده‌سازی قبلی routers/users.py
+    if not dt:
+        return None
+    return jdatetime.datetime.fromgregorian(datetime=dt).strftime("%Y/%m/%d %H:%M:%S")
+
+
+def _timestamps(rows: int, days: int, seed: int) -> list[datetime]:
+    rnd = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    return [start + timedelta(days=rnd.randrange(days), seconds=rnd.randrange(86400)) for _ in range(rows)]
+
+
+def _bench(fn, values) -> float:
+    started = time.perf_counter()
+    for v in values:
+        fn(v)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {}
+    for name, days in (("clustered_30_days", 30), ("spread_5_years", 5 * 365)):
+        values = _timestamps(args.rows, days, args.seed)
+        assert all(per_row(v) == jalali.to_jalali(v) for v in values[:1000])
+
+        jalali._jalali_day.cache_clear()
+        old = _bench(per_row, values)
+        new = _bench(jalali.to_jalali, values)
+        results[name] = {
+            "per_row_us": round(old / args.rows * 1e6, 3),
+            "cached_us": round(new / args.rows * 1e6, 3),
+            "speedup": round(old / new, 1),
+        }
+
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+بنچمارک بار کل API: دیتابیس را به اندازه‌ی دلخواه پر می‌کند، برنامه را با uvicorn در
+یک process جدا بالا می‌آورد و با چند کلاینت هم‌زمان ترکیبی واقعی از درخواست‌ها
+(login، جستجوی فارمر، لیست صفحه‌بندی‌شده‌ی روستاها، ایجاد/ویرایش/حذف فارمر) می‌فرستد.
+خروجی JSON است (throughput و p50/p95/p99 برای هر عملیات) تا بشود نتایج را در طول زمان مقایسه کرد.
+
+بدون --database-url یک دیتابیس SQLite تازه در پوشه‌ی موقت ساخته می‌شود. برای MySQL
+(نصب محلی) آدرس را بدهید؛ جدول‌ها اگر نباشند ساخته می‌شوند و هر جدول فقط وقتی
+خالی باشد پر می‌شود (داده‌ی موجود پاک نمی‌شود):
+
+    python -m benchmarks.load --farmers 20000 --villages 2000 --concurrency 32 --duration 30
+    python -m benchmarks.load --database-url mysql+pymysql://root:pw@127.0.0.1/havirkesht_bench --mix read --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from ._client import summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BENCH_USER = "bench_admin"
+BENCH_PASSWORD = "bench-password"
+
+# وزن هر عملیات در هر ترکیب
+MIXES = {
+    "read": {"farmer_search": 45, "village_list": 35, "farmer_get": 15, "login": 5},
+    "mixed": {
+        "farmer_search": 30,
+        "village_list": 25,
+        "farmer_get": 10,
+        "farmer_create": 15,
+        "farmer_update": 10,
+        "farmer_delete": 5,
+        "login": 5,
+    },
+    "write": {"farmer_create": 40, "farmer_update": 30, "farmer_delete": 20, "farmer_search": 10},
+}
+
+FIRST_NAMES = ["علی", "محمد", "حسین", "رضا", "مهدی", "زهرا", "فاطمه", "مریم", "سارا", "امیر", "حسن", "نرگس"]
+LAST_NAMES = ["احمدی", "محمدی", "حسینی", "رضایی", "کریمی", "موسوی", "جعفری", "قاسمی", "رحیمی", "طاهری", "صادقی"]
+
+
+def _national_id(i: int) -> str:
+    return f"{1000000000 + i}"
+
+
+# --------- SEED ---------
+def _insert_chunks(conn, table, rows, chunk=5000):
+    for start in range(0, len(rows), chunk):
+        conn.execute(table.insert(), rows[start:start + chunk])
+
+
+def seed(url: str, args) -> dict:
+    from sqlalchemy import create_engine, func, select
+
+    from app import models, stat_counts
+    from app.hashing import bcrypt_hash
+
+    rnd = random.Random(args.seed)
+    engine = create_engine(url)
+    models.Base.metadata.create_all(engine)
+
+    def empty(conn, model) -> bool:
+        return not conn.scalar(select(func.count()).select_from(model))
+
+    with engine.begin() as conn:
+        if empty(conn, models.Role):
+            conn.execute(models.Role.__table__.insert(), [{"id": 1, "name": "admin"}, {"id": 2, "name": "user"}])
+
+        if not conn.scalar(select(models.User.id).where(models.User.username == BENCH_USER)):
+            conn.execute(
+                models.User.__table__.insert(),
+                {"username": BENCH_USER, "password": bcrypt_hash(BENCH_PASSWORD), "role_id": 1, "disabled": False},
+            )
+
+        if empty(conn, models.Province):
+            _insert_chunks(conn, models.Province.__table__, [{"province": f"استان {i}"} for i in range(1, 32)])
+
+        if empty(conn, models.City):
+            province_ids = conn.scalars(select(models.Province.id)).all()
+            _insert_chunks(
+                conn,
+                models.City.__table__,
+                [{"city": f"شهر {i}", "province_id": rnd.choice(province_ids)} for i in range(1, args.cities + 1)],
+            )
+
+        if empty(conn, models.Village):
+            city_ids = conn.scalars(select(models.City.id)).all()
+            _insert_chunks(
+                conn,
+                models.Village.__table__,
+                [{"village": f"روستای {i}", "city_id": rnd.choice(city_ids)} for i in range(1, args.villages + 1)],
+            )
+
+        if empty(conn, models.Farmer):
+            _insert_chunks(
+                conn,
+                models.Farmer.__table__,
+                [
+                    {
+                        "national_id": _national_id(i),
+                        "full_name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+                        "father_name": rnd.choice(FIRST_NAMES),
+                        "phone_number": f"0912{rnd.randrange(10**7):07d}",
+                        "sheba_number_1": f"IR{rnd.randrange(10**24):024d}",
+                        "sheba_number_2": f"IR{rnd.randrange(10**24):024d}",
+                        "card_number": f"6037{rnd.randrange(10**12):012d}",
+                        "address": f"{rnd.choice(LAST_NAMES)}، کوچه {rnd.randrange(1, 50)}",
+                    }
+                    for i in range(args.farmers)
+                ],
+            )
+
+        stat_counts.rebuild(conn)
+
+        scale = {
+            name: conn.scalar(select(func.count()).select_from(model))
+            for name, model in (("farmers", models.Farmer), ("villages", models.Village), ("cities", models.City))
+        }
+    engine.dispose()
+    return scale
+
+
+# --------- SERVER ---------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(url: str, port: int, args) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": url, "DISABLE_AUTH": "0" if args.auth else "1"}
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/openapi.json", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not become ready in 60s")
+
+
+# --------- LOAD ---------
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.recording = False
+
+    def add(self, op: str, seconds: float, ok: bool) -> None:
+        if not self.recording:
+            return
+        if ok:
+            self.latencies.setdefault(op, []).append(seconds)
+        else:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+
+class VirtualUser:
+    def __init__(self, vu: int, client: httpx.AsyncClient, recorder: Recorder, scale: dict, run_tag: int, seed: int):
+        self.vu = vu
+        self.client = client
+        self.recorder = recorder
+        self.scale = scale
+        self.rnd = random.Random(seed * 1000 + vu)
+        self.run_tag = run_tag
+        self.created: list[str] = []
+        self.counter = 0
+        self.headers: dict = {}
+
+    async def _call(self, op: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.add(op, time.perf_counter() - started, False)
+            return None
+        self.recorder.add(op, time.perf_counter() - started, resp.status_code < 400)
+        return resp
+
+    def _farmer_payload(self, national_id: str) -> dict:
+        return {
+            "national_id": national_id,
+            "full_name": f"{self.rnd.choice(FIRST_NAMES)} {self.rnd.choice(LAST_NAMES)}",
+            "father_name": self.rnd.choice(FIRST_NAMES),
+            "phone_number": "09120000000",
+            "sheba_number_1": "IR820540102680020817909002",
+            "sheba_number_2": "IR820540102680020817909003",
+            "card_number": "6037991234567890",
+            "address": "آدرس بنچمارک",
+        }
+
+    async def login(self):
+        resp = await self._call("login", "POST", "/token", data={"username": BENCH_USER, "password": BENCH_PASSWORD})
+        if resp is not None and resp.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    async def farmer_search(self):
+        if self.rnd.random() < 0.5:
+            term = _national_id(self.rnd.randrange(max(self.scale["farmers"], 1)))[:7]
+        else:
+            term = self.rnd.choice(LAST_NAMES)
+        await self._call("farmer_search", "GET", "/farmer/", params={"search": term, "size": 50})
+
+    async def village_list(self):
+        pages = max(1, min(20, self.scale["villages"] // 50))
+        await self._call("village_list", "GET", "/village/", params={"page": self.rnd.randint(1, pages), "size": 50})
+
+    async def farmer_get(self):
+        nid = _national_id(self.rnd.randrange(max(self.scale["farmers"], 1)))
+        await self._call("farmer_get", "GET", f"/farmer/{nid}")
+
+    async def farmer_create(self):
+        self.counter += 1
+        nid = f"9{self.run_tag:08d}{self.vu:03d}{self.counter:05d}"
+        resp = await self._call("farmer_create", "POST", "/farmer/", json=self._farmer_payload(nid))
+        if resp is not None and resp.status_code == 201:
+            self.created.append(nid)
+
+    async def farmer_update(self):
+        if not self.created:
+            return await self.farmer_create()
+        nid = self.rnd.choice(self.created)
+        await self._call("farmer_update", "PUT", f"/farmer/{nid}", json=self._farmer_payload(nid))
+
+    async def farmer_delete(self):
+        if not self.created:
+            return await self.farmer_create()
+        nid = self.created.pop(self.rnd.randrange(len(self.created)))
+        await self._call("farmer_delete", "DELETE", f"/farmer/{nid}")
+
+    async def run(self, mix: dict, deadline: float):
+        ops = [getattr(self, name) for name in mix]
+        weights = list(mix.values())
+        await self.login()
+        while time.monotonic() < deadline:
+            await self.rnd.choices(ops, weights)[0]()
+
+
+async def run_load(base_url: str, scale: dict, args) -> dict:
+    recorder = Recorder()
+    mix = MIXES[args.mix]
+    run_tag = int(time.time()) % 10**8
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.monotonic()
+        deadline = started + args.warmup + args.duration
+        users = [VirtualUser(vu, client, recorder, scale, run_tag, args.seed) for vu in range(args.concurrency)]
+        tasks = [asyncio.create_task(u.run(mix, deadline)) for u in users]
+
+        # warmup ثبت نمی‌شود (پر شدن pool کانکشن‌ها، کش‌ها و ...)
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        measured_from = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - measured_from
+
+    results = {
+        op: summarize(recorder.latencies.get(op, []), recorder.errors.get(op, 0), elapsed)
+        for op in sorted(set(recorder.latencies) | set(recorder.errors))
+    }
+    all_latencies = [x for values in recorder.latencies.values() for x in values]
+    results["_total"] = summarize(all_latencies, sum(recorder.errors.values()), elapsed)
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync SQLAlchemy URL; default: fresh SQLite file")
+    parser.add_argument("--farmers", type=int, default=20000)
+    parser.add_argument("--cities", type=int, default=400)
+    parser.add_argument("--villages", type=int, default=2000)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before recording")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--no-auth", dest="auth", action="store_false", help="run the server with DISABLE_AUTH=1")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp(prefix='havirkesht-bench-')) / 'bench.db'}"
+    scale = seed(url, args)
+
+    port = _free_port()
+    server = start_server(url, port, args)
+    try:
+        results = asyncio.run(run_load(f"http://127.0.0.1:{port}", scale, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    from sqlalchemy.engine import make_url
+
+    report = {
+        "revision": _git_revision(),
+        "database": make_url(url).render_as_string(hide_password=True),
+        "scale": scale,
+        "mix": args.mix,
+        "weights": MIXES[args.mix],
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "duration_seconds": args.duration,
+        "auth": args.auth,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
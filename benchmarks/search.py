@@ -0,0 +1,136 @@
+"""
+latency جستجوی فارمر در مقیاس بزرگ: همان کوئری‌های GET /farmer/?search=... (صفحه‌ی اول 50 تایی
+و count دقیق) مستقیم روی دیتابیس اجرا و برای هر نوع عبارت p50/p95 گزارش می‌شود:
+
+    national_id   پیشوند کد ملی (فقط رقم)        -> LIKE پیشوندی روی ایندکس unique
+    full_name     نام کامل با ي / ك عربی           -> MATCH ... AGAINST روی full_name_normalized
+    last_name     یک توکن                           -> MATCH ... AGAINST
+    short         یک حرف (کوتاه‌تر از ngram)       -> LIKE پیشوندی روی ix_farmer_full_name_normalized
+
+در MySQL خلاصه‌ی EXPLAIN هر کوئری (نوع دسترسی و ایندکس) هم چاپ می‌شود. دیتابیس باید از قبل داده داشته باشد:
+
+    python scripts/generate_data.py --database-url mysql+pymysql://root:pw@127.0.0.1/havirkesht_bench --farmers 1000000
+    python -m benchmarks.search --database-url mysql+pymysql://root:pw@127.0.0.1/havirkesht_bench
+
+بدون --database-url یک SQLite موقت با --farmers ردیف (از scripts/generate_data.py) ساخته می‌شود؛
+آنجا همه‌ی متن‌ها از مسیر ilike می‌روند و FULLTEXT / LIKE پیشوندی MySQL اندازه گرفته نمی‌شود.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import make_url
+
+from app import models, schemas
+from app.pagination import count_of
+from app.routers.farmer import _filter_farmers
+from app.serialization import project
+
+from ._client import percentile
+from .load import _git_revision
+
+_ARABIC = str.maketrans({"ی": "ي", "ک": "ك"})
+
+
+def _terms(conn, samples: int, rnd: random.Random) -> dict[str, list[str]]:
+    # عبارت‌ها از ردیف‌های واقعی انتخاب می‌شوند تا هر جستجو نتیجه داشته باشد
+    max_id = conn.scalar(select(func.max(models.Farmer.id)))
+    rows = []
+    while len(rows) < samples:
+        row = conn.execute(
+            select(models.Farmer.national_id, models.Farmer.full_name)
+            .where(models.Farmer.id >= rnd.randint(1, max_id))
+            .order_by(models.Farmer.id)
+            .limit(1)
+        ).first()
+        if row:
+            rows.append(row)
+    return {
+        "national_id": [nid[:6] for nid, _ in rows],
+        "full_name": [name.translate(_ARABIC) for _, name in rows],
+        "last_name": [name.split()[-1] for _, name in rows],
+        "short": [name[0] for _, name in rows],
+    }
+
+
+def _explain(conn, stmt) -> list[str]:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return [
+        f"{row['table']}: type={row['type']} key={row['key']} rows~{row['rows']} {row.get('Extra') or ''}".strip()
+        for row in conn.exec_driver_sql("EXPLAIN " + sql).mappings()
+    ]
+
+
+def run_search(url: str, args) -> dict:
+    engine = create_engine(url)
+    dialect = engine.dialect.name
+    rnd = random.Random(args.seed)
+    base, _ = project(models.Farmer, schemas.FarmerOut, models.Farmer.id)
+    results = {}
+    with engine.connect() as conn:
+        farmers = conn.scalar(select(func.count()).select_from(models.Farmer))
+        for kind, terms in _terms(conn, args.samples, rnd).items():
+            page_ms, count_ms, matched = [], [], []
+            for term in terms:
+                query = _filter_farmers(base, term, dialect)
+                page = query.order_by(models.Farmer.id).limit(50)
+
+                t0 = time.perf_counter()
+                conn.execute(page).all()
+                page_ms.append((time.perf_counter() - t0) * 1000)
+
+                t0 = time.perf_counter()
+                matched.append(conn.scalar(count_of(query)))
+                count_ms.append((time.perf_counter() - t0) * 1000)
+
+            results[kind] = {
+                "example": terms[0],
+                "page_p50_ms": round(percentile(page_ms, 50), 2),
+                "page_p95_ms": round(percentile(page_ms, 95), 2),
+                "count_p50_ms": round(percentile(count_ms, 50), 2),
+                "count_p95_ms": round(percentile(count_ms, 95), 2),
+                "matched_p50": percentile(matched, 50),
+            }
+            if dialect == "mysql":
+                results[kind]["explain"] = _explain(conn, _filter_farmers(base, terms[0], dialect).order_by(models.Farmer.id).limit(50))
+    engine.dispose()
+    return {"farmers": farmers, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync SQLAlchemy URL of a seeded database; default: fresh SQLite file")
+    parser.add_argument("--farmers", type=int, default=1_000_000, help="rows to generate for the default SQLite file")
+    parser.add_argument("--samples", type=int, default=50, help="search terms per kind")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        url = f"sqlite:///{Path(tempfile.mkdtemp(prefix='havirkesht-search-')) / 'bench.db'}"
+        script = Path(__file__).resolve().parent.parent / "scripts" / "generate_data.py"
+        subprocess.run(
+            [sys.executable, str(script), "--database-url", url, "--farmers", str(args.farmers), "--users", "2"],
+            check=True,
+        )
+
+    report = {
+        "revision": _git_revision(),
+        "database": make_url(url).render_as_string(hide_password=True),
+        **run_search(url, args),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
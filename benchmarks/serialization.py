@@ -0,0 +1,170 @@
+"""
+هزینه‌ی CPU ساختن یک صفحه‌ی ۱۰۰ تایی لیست: مسیر قبلی (entity کامل ORM ->
+اعتبارسنجی response_model در FastAPI -> JSONResponse) در برابر مسیر سبک
+app.serialization (ستون‌های لازم به صورت Row -> ORJSONResponse).
+
+به طور پیش‌فرض روی SQLite داخل حافظه با داده‌ی ساختگی اجرا می‌شود تا هزینه‌ی
+شبکه در عدد نباشد؛ با --database-url می‌شود روی دیتابیس واقعی (جدول‌های پر) هم اجرا کرد.
+
+    python -m benchmarks.serialization --pages 500
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import models, schemas
+from app.jalali import to_jalali
+from app.serialization import list_response, project, rows_to_items
+
+PAGE_SIZE = 100
+
+
+async def _seed(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        now = datetime(2024, 3, 1, 8, 30)
+        await conn.execute(insert(models.Role), [{"id": 1, "name": "admin"}])
+        await conn.execute(
+            insert(models.Farmer),
+            [
+                {
+                    "id": i + 1,
+                    "national_id": f"{1000000000 + i}",
+                    "full_name": f"کشاورز شماره {i}",
+                    "father_name": "محمد",
+                    "phone_number": "09120000000",
+                    "sheba_number_1": "IR820540102680020817909002",
+                    "sheba_number_2": "IR820540102680020817909003",
+                    "card_number": "6037991234567890",
+                    "address": "استان نمونه، شهر نمونه، روستای نمونه",
+                    "created_at": now + timedelta(hours=i),
+                    "updated_at": now + timedelta(hours=i),
+                }
+                for i in range(PAGE_SIZE)
+            ],
+        )
+        await conn.execute(
+            insert(models.User),
+            [
+                {
+                    "id": i + 1,
+                    "username": f"user{i}",
+                    "password": "x" * 60,
+                    "fullname": f"کاربر {i}",
+                    "email": f"user{i}@example.com",
+                    "phone_number": "09120000000",
+                    "role_id": 1,
+                    "disabled": False,
+                    "created_at": now + timedelta(hours=i),
+                    "updated_at": now + timedelta(hours=i),
+                }
+                for i in range(PAGE_SIZE)
+            ],
+        )
+
+
+# --------- مسیر قبلی ---------
+async def farmers_orm(db, field):
+    rows = (await db.scalars(select(models.Farmer).order_by(models.Farmer.id).limit(PAGE_SIZE))).all()
+    content = {"total": None, "size": PAGE_SIZE, "pages": None, "items": rows}
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def users_orm(db, field):
+    rows = (await db.scalars(select(models.User).order_by(models.User.id).limit(PAGE_SIZE))).all()
+    items = [
+        schemas.UserSwaggerOut(
+            created_at=u.created_at,
+            created_at_jalali=to_jalali(u.created_at),
+            updated_at=u.updated_at,
+            updated_at_jalali=to_jalali(u.updated_at),
+            id=u.id,
+            username=u.username,
+            email=u.email,
+            fullname=u.fullname,
+            phone_number=u.phone_number,
+            role_id=u.role_id,
+            disabled=bool(u.disabled),
+        )
+        for u in rows
+    ]
+    content = schemas.UsersListOut(total=None, size=PAGE_SIZE, pages=None, items=items)
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+# --------- مسیر سبک ---------
+async def farmers_lean(db, field):
+    stmt, fields = project(models.Farmer, schemas.FarmerOut, models.Farmer.id)
+    rows = (await db.execute(stmt.order_by(models.Farmer.id).limit(PAGE_SIZE))).all()
+    return list_response(total=None, size=PAGE_SIZE, pages=None, items=rows_to_items(rows, fields)).body
+
+
+async def users_lean(db, field):
+    stmt, fields = project(models.User, schemas.UserSwaggerOut)
+    rows = (await db.execute(stmt.order_by(models.User.id).limit(PAGE_SIZE))).all()
+    items = rows_to_items(rows, fields)
+    for item in items:
+        item["created_at_jalali"] = to_jalali(item["created_at"])
+        item["updated_at_jalali"] = to_jalali(item["updated_at"])
+        item["disabled"] = bool(item["disabled"])
+    return list_response(total=None, size=PAGE_SIZE, pages=None, items=items).body
+
+
+async def _measure(sessionmaker, fn, field, pages: int) -> float:
+    # هر صفحه session جدا دارد، مثل درخواست‌های واقعی
+    async with sessionmaker() as db:
+        await fn(db, field)  # warmup
+    started = time.process_time()
+    for _ in range(pages):
+        async with sessionmaker() as db:
+            await fn(db, field)
+    return (time.process_time() - started) / pages
+
+
+async def _run(args) -> dict:
+    if args.database_url:
+        engine = create_async_engine(args.database_url)
+    else:
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        await _seed(engine)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    results = {}
+    cases = (
+        ("farmer", schemas.FarmerListOut, farmers_orm, farmers_lean),
+        ("users", schemas.UsersListOut, users_orm, users_lean),
+    )
+    for name, schema, old, lean in cases:
+        field = create_model_field(name="Response", type_=schema, mode="serialization")
+        old_cpu = await _measure(sessionmaker, old, field, args.pages)
+        lean_cpu = await _measure(sessionmaker, lean, field, args.pages)
+        results[name] = {
+            "orm_validate_ms_per_page": round(old_cpu * 1000, 3),
+            "lean_ms_per_page": round(lean_cpu * 1000, 3),
+            "cpu_saved_percent": round((1 - lean_cpu / old_cpu) * 100, 1),
+        }
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--database-url", default=None, help="async SQLAlchemy URL; default: seeded in-memory SQLite")
+    args = parser.parse_args()
+
+    results = asyncio.run(_run(args))
+    print(json.dumps({"page_size": PAGE_SIZE, "pages": args.pages, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
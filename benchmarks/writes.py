@@ -0,0 +1,194 @@
+"""
+بنچمارک endpointهای ایجاد (province، city، village، crop-year، farmer، users/admin) زیر
+کلاینت‌های هم‌زمان. بخشی از درخواست‌ها عمداً نام تکراری دارند و هم‌زمان با درخواست
+اصلی فرستاده می‌شوند تا race «چک تکراری بودن -> insert» هم دیده شود.
+
+برای هر endpoint: p50/p95/p99، throughput، تعداد هر status code (500 یعنی race به خطا
+رسیده) و میانگین کوئری‌های هر درخواست (از هدر X-DB-Query-Count).
+سرور و دیتابیس مثل benchmarks.load ساخته می‌شوند:
+
+    python -m benchmarks.writes --requests 2000 --concurrency 32
+    python -m benchmarks.writes --database-url mysql+pymysql://root:pw@127.0.0.1/havirkesht_bench --workers 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+from ._client import summarize
+from .load import BENCH_PASSWORD, BENCH_USER, _free_port, _git_revision, seed, start_server
+
+# users/admin هش bcrypt دارد و خیلی کندتر است؛ تعداد درخواستش جدا تنظیم می‌شود
+OPERATIONS = ("province", "city", "village", "crop_year", "farmer", "user")
+
+
+def _payload(op: str, name: str, parents: dict, rnd: random.Random) -> tuple[str, dict]:
+    if op == "province":
+        return "/province/", {"province": name}
+    if op == "city":
+        return "/city/", {"city": name, "province_id": rnd.choice(parents["provinces"])}
+    if op == "village":
+        return "/village/", {"village": name, "city_id": rnd.choice(parents["cities"])}
+    if op == "crop_year":
+        return "/crop-year/", {"crop_year_name": name}
+    if op == "farmer":
+        return "/farmer/", {
+            "national_id": name,
+            "full_name": "کشاورز بنچمارک",
+            "father_name": "پدر",
+            "phone_number": "09120000000",
+            "sheba_number_1": "IR820540102680020817909002",
+            "sheba_number_2": "IR820540102680020817909003",
+            "card_number": "6037991234567890",
+            "address": "آدرس بنچمارک",
+        }
+    return "/users/admin/", {
+        "username": name,
+        "password": "bench-password",
+        "fullName": "کاربر بنچمارک",
+        "email": f"{name}@bench.local",
+        "phone_number": "09120000000",
+        "role_id": 2,
+    }
+
+
+def _parents(url: str) -> dict:
+    from sqlalchemy import create_engine, select
+
+    from app import models
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            # در حالت journal پیش‌فرض هر خواننده نوشتن را قفل می‌کند و زیر بار هم‌زمان به
+            # "database is locked" و انتظارهای 30 ثانیه‌ای می‌رسد؛ WAL در خود فایل دیتابیس می‌ماند
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        parents = {
+            "provinces": conn.scalars(select(models.Province.id)).all(),
+            "cities": conn.scalars(select(models.City.id)).all(),
+        }
+    engine.dispose()
+    return parents
+
+
+async def _run_op(client: httpx.AsyncClient, op: str, requests: int, args, parents: dict, run_tag: int) -> dict:
+    rnd = random.Random(f"{args.seed}:{op}")
+    # نام i-ام با احتمال duplicate_ratio همان نام درخواست قبلی است (که احتمالاً هنوز در جریان است)
+    names = []
+    for i in range(requests):
+        if names and rnd.random() < args.duplicate_ratio:
+            names.append(names[-1])
+        else:
+            # national_id حداکثر 20 کاراکتر
+            names.append(f"9{run_tag:08d}{i:06d}" if op == "farmer" else f"bench-{op}-{run_tag}-{i}")
+    bodies = [_payload(op, name, parents, rnd) for name in names]
+
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    queries: list[int] = []
+    errors = 0
+    position = 0
+
+    async def worker():
+        nonlocal position, errors
+        while position < len(bodies):
+            path, body = bodies[position]
+            position += 1
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post(path, json=body)
+            except httpx.HTTPError:
+                errors += 1
+                statuses["transport_error"] += 1
+                continue
+            statuses[str(resp.status_code)] += 1
+            # 409 جواب درست برای نام تکراری است؛ فقط 5xx و وضعیت‌های غیرمنتظره خطا شمرده می‌شوند
+            if resp.status_code not in (201, 409):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+            if "x-db-query-count" in resp.headers:
+                queries.append(int(resp.headers["x-db-query-count"]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies, errors, elapsed)
+    result["statuses"] = dict(sorted(statuses.items()))
+    result["queries_per_request"] = round(sum(queries) / len(queries), 2) if queries else None
+    return result
+
+
+async def run_writes(base_url: str, parents: dict, args) -> dict:
+    run_tag = int(time.time()) % 10**8
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        if args.auth:
+            resp = await client.post("/token", data={"username": BENCH_USER, "password": BENCH_PASSWORD})
+            resp.raise_for_status()
+            client.headers["Authorization"] = f"Bearer {resp.json()['access_token']}"
+
+        results = {}
+        for op in args.ops:
+            requests = args.user_requests if op == "user" else args.requests
+            results[op] = await _run_op(client, op, requests, args, parents, run_tag)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync SQLAlchemy URL; default: fresh SQLite file")
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--requests", type=int, default=2000, help="POSTs per endpoint")
+    parser.add_argument("--user-requests", type=int, default=200, help="POSTs to /users/admin/ (bcrypt)")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="share of requests reusing the previous name")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--no-auth", dest="auth", action="store_false", help="run the server with DISABLE_AUTH=1")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="also write the JSON result to this file")
+    # اندازه‌ی داده‌ی اولیه (همان seed بنچمارک load)
+    parser.add_argument("--farmers", type=int, default=20000)
+    parser.add_argument("--cities", type=int, default=400)
+    parser.add_argument("--villages", type=int, default=2000)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp(prefix='havirkesht-bench-')) / 'bench.db'}"
+    scale = seed(url, args)
+    parents = _parents(url)
+
+    port = _free_port()
+    server = start_server(url, port, args)
+    try:
+        results = asyncio.run(run_writes(f"http://127.0.0.1:{port}", parents, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    from sqlalchemy.engine import make_url
+
+    report = {
+        "revision": _git_revision(),
+        "database": make_url(url).render_as_string(hide_password=True),
+        "scale": scale,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "duplicate_ratio": args.duplicate_ratio,
+        "auth": args.auth,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+-- کل schema پایه؛ همه‌ی داده‌ها را پاک می‌کند
+
+DROP TABLE IF EXISTS farmers_pesticide;
+DROP TABLE IF EXISTS farmers_seed;
+DROP TABLE IF EXISTS carriage_status;
+DROP TABLE IF EXISTS carriage;
+DROP TABLE IF EXISTS commitment;
+DROP TABLE IF EXISTS purity_price;
+DROP TABLE IF EXISTS product_price;
+DROP TABLE IF EXISTS product;
+DROP TABLE IF EXISTS farmers_waste_delivery;
+DROP TABLE IF EXISTS farmers_sugar_delivery;
+DROP TABLE IF EXISTS farmers_payment;
+DROP TABLE IF EXISTS farmers_load;
+DROP TABLE IF EXISTS farmers_invoice_payed;
+DROP TABLE IF EXISTS farmers_guarantee;
+DROP TABLE IF EXISTS factory_waste;
+DROP TABLE IF EXISTS factory_sugar;
+DROP TABLE IF EXISTS factory_seed;
+DROP TABLE IF EXISTS factory_pesticide;
+DROP TABLE IF EXISTS factory_payment;
+DROP TABLE IF EXISTS users;
+DROP TABLE IF EXISTS factory_commitment_tonnage;
+DROP TABLE IF EXISTS seed;
+DROP TABLE IF EXISTS pesticide;
+DROP TABLE IF EXISTS village;
+DROP TABLE IF EXISTS city;
+DROP TABLE IF EXISTS farmer;
+DROP TABLE IF EXISTS crop_year;
+DROP TABLE IF EXISTS payment_reason;
+DROP TABLE IF EXISTS factory;
+DROP TABLE IF EXISTS measure_unit;
+DROP TABLE IF EXISTS token_blacklist;
+DROP TABLE IF EXISTS supervisor;
+DROP TABLE IF EXISTS province;
+DROP TABLE IF EXISTS roles;
+DROP TABLE IF EXISTS driver;
+DROP TABLE IF EXISTS bulk_sms_job;
+DROP TABLE IF EXISTS alembic_version;
+DROP TABLE IF EXISTS cars;
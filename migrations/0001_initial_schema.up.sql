@@ -1,3 +1,5 @@
+-- schema پایه (همان scripts/create_tables.sql قبلی)
+
 CREATE TABLE IF NOT EXISTS cars (
     id BIGINT NOT NULL AUTO_INCREMENT,
     name VARCHAR(255),
@@ -0,0 +1 @@
+DROP INDEX ft_farmer_full_name ON farmer;
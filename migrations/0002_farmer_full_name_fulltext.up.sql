@@ -0,0 +1,2 @@
+-- جستجوی نام فارمر با MATCH ... AGAINST (app/search.py)
+CREATE FULLTEXT INDEX ft_farmer_full_name ON farmer (full_name) WITH PARSER ngram;
@@ -0,0 +1,12 @@
+DROP TABLE IF EXISTS token_blacklist;
+
+CREATE TABLE token_blacklist (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    token VARCHAR(255),
+    blacklisted_at TIMESTAMP NULL,
+    created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    CONSTRAINT pk_token_blacklist PRIMARY KEY (id),
+    CONSTRAINT ux_token_blacklist_token UNIQUE (token)
+) ENGINE=InnoDB;
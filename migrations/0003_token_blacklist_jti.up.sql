@@ -0,0 +1,17 @@
+-- به جای خود JWT، jti و زمان انقضا نگه داشته می‌شود. ردیف‌های قبلی فقط تا انقضای
+-- توکن‌ها معنا داشتند و قابل تبدیل به jti نیستند، پس جدول از نو ساخته می‌شود.
+DROP TABLE IF EXISTS token_blacklist;
+
+CREATE TABLE token_blacklist (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    jti VARCHAR(36) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    blacklisted_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    CONSTRAINT pk_token_blacklist PRIMARY KEY (id),
+    CONSTRAINT ux_token_blacklist_jti UNIQUE (jti)
+) ENGINE=InnoDB;
+
+CREATE INDEX ix_token_blacklist_expires_at ON token_blacklist (expires_at);
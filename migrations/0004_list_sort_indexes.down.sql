@@ -0,0 +1,23 @@
+-- MySQL ایندکس خودکار FK را بعد از ساخت ix_*_id حذف کرده؛ قبل از حذف باید دوباره ساخته شود
+ALTER TABLE province
+    DROP INDEX ix_province_created_at;
+
+ALTER TABLE city
+    ADD INDEX fk_city_province (province_id),
+    DROP INDEX ix_city_province_id,
+    DROP INDEX ix_city_created_at;
+
+ALTER TABLE village
+    ADD INDEX fk_village_city (city_id),
+    DROP INDEX ix_village_city_id,
+    DROP INDEX ix_village_created_at;
+
+ALTER TABLE users
+    ADD INDEX fk_users_role (role_id),
+    DROP INDEX ix_users_email,
+    DROP INDEX ix_users_fullname,
+    DROP INDEX ix_users_phone_number,
+    DROP INDEX ix_users_role_id,
+    DROP INDEX ix_users_disabled,
+    DROP INDEX ix_users_created_at,
+    DROP INDEX ix_users_updated_at;
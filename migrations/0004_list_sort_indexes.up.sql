@@ -0,0 +1,29 @@
+-- ایندکس برای هر ستون sort_map / ALLOWED_SORT روترها و فیلترهای تساوی لیست‌ها.
+-- id صریحاً ستون دوم است تا ترتیب ORDER BY col, id (keyset) هم از ایندکس خوانده شود.
+-- هر جدول با یک ALTER ساخته می‌شود (یک بار پیمایش جدول، بدون قفل نوشتن).
+ALTER TABLE province
+    ADD INDEX ix_province_created_at (created_at, id),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE city
+    ADD INDEX ix_city_province_id (province_id, id),
+    ADD INDEX ix_city_created_at (created_at, id),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE village
+    ADD INDEX ix_village_city_id (city_id, id),
+    ADD INDEX ix_village_created_at (created_at, id),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE users
+    ADD INDEX ix_users_email (email, id),
+    ADD INDEX ix_users_fullname (fullname, id),
+    ADD INDEX ix_users_phone_number (phone_number, id),
+    ADD INDEX ix_users_role_id (role_id, id),
+    ADD INDEX ix_users_disabled (disabled, id),
+    ADD INDEX ix_users_created_at (created_at, id),
+    ADD INDEX ix_users_updated_at (updated_at, id),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- آمار تازه تا planner ایندکس‌های جدید را برای ORDER BY ... LIMIT انتخاب کند
+ANALYZE TABLE province, city, village, users;
@@ -0,0 +1,9 @@
+-- نسخه‌ی نوشتن هر جدول (app/versions.py)؛ ETag / Last-Modified لیست‌ها از آن ساخته می‌شود.
+-- ردیف‌ها با اولین نوشتن هر جدول ساخته می‌شوند (INSERT ... ON DUPLICATE KEY UPDATE).
+CREATE TABLE table_version (
+    table_name VARCHAR(64) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME(6) NOT NULL,
+
+    CONSTRAINT pk_table_version PRIMARY KEY (table_name)
+) ENGINE=InnoDB;
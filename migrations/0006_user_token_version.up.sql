@@ -0,0 +1,14 @@
+-- نسخه‌ی توکن هر کاربر (claim «tv» در access / refresh token). بالا بردن آن همه‌ی توکن‌های
+-- قبلی کاربر را باطل می‌کند (logout، تغییر رمز، غیرفعال کردن). فقط کاربرانی که حداقل یک بار
+-- توکن‌هایشان باطل شده ردیف دارند؛ نبودن ردیف یعنی نسخه‌ی 0.
+CREATE TABLE user_token_version (
+    user_id BIGINT NOT NULL,
+    version INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL,
+
+    CONSTRAINT pk_user_token_version PRIMARY KEY (user_id),
+    CONSTRAINT fk_user_token_version_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+) ENGINE=InnoDB;
@@ -0,0 +1 @@
+DROP TABLE IF EXISTS stat_count;
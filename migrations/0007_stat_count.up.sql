@@ -0,0 +1,24 @@
+-- شمارش‌های تجمیعی (app/stat_counts.py): cities_per_province، villages_per_city، farmers_per_day، users_per_role.
+-- handlerهای ایجاد / حذف در همان تراکنش آن‌ها را بالا / پایین می‌برند؛ مقدار اولیه همین‌جا از داده‌ی
+-- موجود ساخته می‌شود و scripts/rebuild_stats.py اختلاف‌های بعدی را اصلاح می‌کند.
+CREATE TABLE stat_count (
+    metric VARCHAR(32) NOT NULL,
+    bucket VARCHAR(32) NOT NULL,
+    total BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL,
+
+    CONSTRAINT pk_stat_count PRIMARY KEY (metric, bucket)
+) ENGINE=InnoDB;
+
+INSERT INTO stat_count (metric, bucket, total, updated_at)
+SELECT 'cities_per_province', CAST(province_id AS CHAR), COUNT(*), NOW() FROM city GROUP BY province_id;
+
+INSERT INTO stat_count (metric, bucket, total, updated_at)
+SELECT 'villages_per_city', CAST(city_id AS CHAR), COUNT(*), NOW() FROM village GROUP BY city_id;
+
+INSERT INTO stat_count (metric, bucket, total, updated_at)
+SELECT 'farmers_per_day', CAST(DATE(created_at) AS CHAR), COUNT(*), NOW()
+FROM farmer WHERE created_at IS NOT NULL GROUP BY DATE(created_at);
+
+INSERT INTO stat_count (metric, bucket, total, updated_at)
+SELECT 'users_per_role', CAST(role_id AS CHAR), COUNT(*), NOW() FROM users GROUP BY role_id;
@@ -0,0 +1,4 @@
+DROP INDEX ix_farmer_full_name_normalized ON farmer;
+DROP INDEX ft_farmer_full_name_normalized ON farmer;
+CREATE FULLTEXT INDEX ft_farmer_full_name ON farmer (full_name) WITH PARSER ngram;
+ALTER TABLE farmer DROP COLUMN full_name_normalized;
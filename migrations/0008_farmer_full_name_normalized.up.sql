@@ -0,0 +1,52 @@
+-- نسخه‌ی یکسان‌سازی‌شده‌ی نام فارمر برای جستجو (app/search.py: normalize). جستجو عبارت را
+-- یکسان می‌کند، پس باید روی ستونی اجرا شود که نام ذخیره‌شده هم یکسان شده باشد. وگرنه نامی که با
+-- ي / ك عربی ذخیره شده با «علي» پیدا نمی‌شود. برنامه این ستون را در هر INSERT و تغییر full_name پر می‌کند
+-- (app/models.py). مقدار ردیف‌های موجود اینجا با همان قاعده‌ها ساخته می‌شود: ي ى -> ی، ك -> ک،
+-- ة ۀ -> ه، أ إ ٱ -> ا، نیم‌فاصله -> فاصله، ارقام فارسی / عربی -> لاتین، حذف کشیده و اعراب،
+-- فاصله‌های پشت‌سرهم -> یک فاصله. REGEXP_REPLACE یعنی MySQL 8.0 یا جدیدتر.
+ALTER TABLE farmer ADD COLUMN full_name_normalized VARCHAR(255) NOT NULL DEFAULT '' AFTER full_name;
+
+UPDATE farmer SET full_name_normalized = TRIM(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+    REGEXP_REPLACE(
+        full_name,
+        '[\\x{064A}\\x{0649}]', 'ی'),
+        '[\\x{0643}]', 'ک'),
+        '[\\x{0629}\\x{06C0}]', 'ه'),
+        '[\\x{0623}\\x{0625}\\x{0671}]', 'ا'),
+        '[\\x{200C}]', ' '),
+        '[\\x{06F0}\\x{0660}]', '0'),
+        '[\\x{06F1}\\x{0661}]', '1'),
+        '[\\x{06F2}\\x{0662}]', '2'),
+        '[\\x{06F3}\\x{0663}]', '3'),
+        '[\\x{06F4}\\x{0664}]', '4'),
+        '[\\x{06F5}\\x{0665}]', '5'),
+        '[\\x{06F6}\\x{0666}]', '6'),
+        '[\\x{06F7}\\x{0667}]', '7'),
+        '[\\x{06F8}\\x{0668}]', '8'),
+        '[\\x{06F9}\\x{0669}]', '9'),
+        '[\\x{0640}\\x{064B}-\\x{065F}\\x{0670}]', ''),
+        '[[:space:]]+', ' ')
+);
+
+-- FULLTEXT (ngram) برای MATCH ... AGAINST و B-tree برای LIKE پیشوندی توکن‌های کوتاه‌تر از ngram
+DROP INDEX ft_farmer_full_name ON farmer;
+CREATE FULLTEXT INDEX ft_farmer_full_name_normalized ON farmer (full_name_normalized) WITH PARSER ngram;
+CREATE INDEX ix_farmer_full_name_normalized ON farmer (full_name_normalized, id);
+
+ANALYZE TABLE farmer;
@@ -0,0 +1,2 @@
+ALTER TABLE token_blacklist
+    DROP INDEX ix_token_blacklist_blacklisted_at;
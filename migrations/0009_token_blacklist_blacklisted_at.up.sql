@@ -0,0 +1,3 @@
+-- sync دوره‌ای blacklist ردیف‌های جدید را با blacklisted_at پیدا می‌کند (نه با id که
+-- ترتیب COMMIT را نشان نمی‌دهد)؛ این ایندکس آن کوئری را از full scan نجات می‌دهد.
+CREATE INDEX ix_token_blacklist_blacklisted_at ON token_blacklist (blacklisted_at);
@@ -0,0 +1,20 @@
+-- session هر login (claim «sid» در access / refresh token). logout فقط revoked_at ردیف همان
+-- session را پر می‌کند، پس token_blacklist دیگر با هر logout بزرگ نمی‌شود (فقط توکن‌های قدیمی
+-- بدون sid تا انقضایشان آنجا ثبت می‌شوند). ردیف‌ها بعد از expires_at پاک می‌شوند.
+CREATE TABLE user_session (
+    sid VARCHAR(36) NOT NULL,
+    user_id BIGINT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    revoked_at DATETIME NULL,
+    created_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT pk_user_session PRIMARY KEY (sid),
+    CONSTRAINT fk_user_session_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE INDEX ix_user_session_user_id ON user_session (user_id);
+CREATE INDEX ix_user_session_expires_at ON user_session (expires_at);
+CREATE INDEX ix_user_session_revoked_at ON user_session (revoked_at);
@@ -0,0 +1,373 @@
+"""
+ساخت داده‌ی مصنوعی در مقیاس واقعی (بدون عبور از API):
+۳۱ استان، شهرها، روستاها، میلیون‌ها فارمر با کد ملی / شبا / شماره کارت معتبر
+(رقم کنترل درست) و کاربرها با hash واقعی bcrypt.
+
+دو حالت:
+  db    -> insert چند ردیفی (executemany درایور) مستقیم در دیتابیس .env یا --database-url
+  files -> فایل‌های TSV به همراه load.sql با دستورهای LOAD DATA LOCAL INFILE
+
+داده به دسته‌های --chunk-size تقسیم و با --jobs پردازه به طور موازی ساخته می‌شود.
+هر دسته random جدا با seed (seed, جدول, شروع دسته) دارد، پس با --seed و --chunk-size
+یکسان خروجی تکرارپذیر است و به تعداد jobs بستگی ندارد.
+جدول‌های مقصد باید خالی باشند (idها صریح ساخته می‌شوند).
+
+    python scripts/generate_data.py --farmers 2000000 --villages 60000
+    python scripts/generate_data.py --mode files --out-dir /tmp/havirkesht-data --farmers 5000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+
+from app import models, stat_counts  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.hashing import bcrypt_hash  # noqa: E402
+from app.search import normalize  # noqa: E402
+
+
+PROVINCES = [
+    "آذربایجان شرقی", "آذربایجان غربی", "اردبیل", "اصفهان", "البرز", "ایلام", "بوشهر", "تهران",
+    "چهارمحال و بختیاری", "خراسان جنوبی", "خراسان رضوی", "خراسان شمالی", "خوزستان", "زنجان", "سمنان",
+    "سیستان و بلوچستان", "فارس", "قزوین", "قم", "کردستان", "کرمان", "کرمانشاه", "کهگیلویه و بویراحمد",
+    "گلستان", "گیلان", "لرستان", "مازندران", "مرکزی", "هرمزگان", "همدان", "یزد",
+]
+FIRST_NAMES = [
+    "علی", "محمد", "حسین", "رضا", "مهدی", "حسن", "امیر", "جواد", "مصطفی", "ابراهیم", "اکبر", "قاسم",
+    "زهرا", "فاطمه", "مریم", "سکینه", "معصومه", "نرگس", "زینب", "صغری", "لیلا", "سمیه", "طاهره", "رقیه",
+]
+LAST_NAMES = [
+    "احمدی", "محمدی", "حسینی", "رضایی", "کریمی", "موسوی", "جعفری", "قاسمی", "رحیمی", "طاهری", "صادقی",
+    "مرادی", "نوری", "کاظمی", "عباسی", "حیدری", "یوسفی", "اکبری", "زارعی", "شریفی", "نجفی", "سلیمانی",
+]
+PLACE_PARTS = ["ده", "آباد", "کلاته", "چشمه", "قلعه", "باغ", "سرا", "کوه", "رود", "دشت", "چاه", "بند"]
+
+# بانک‌ها: (کد بانک در شبا، BIN کارت)
+BANKS = [
+    ("017", "603799"),  # ملی
+    ("012", "610433"),  # ملت
+    ("018", "627353"),  # تجارت
+    ("019", "603769"),  # صادرات
+    ("016", "603770"),  # کشاورزی
+    ("015", "589210"),  # سپه
+    ("056", "621986"),  # سامان
+    ("057", "502229"),  # پاسارگاد
+]
+
+# ترکیب‌ها یک بار ساخته می‌شوند تا در حلقه‌ی هر ردیف یک انتخاب به جای چند انتخاب و f-string باشد
+FULL_NAMES = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+# (full_name، full_name_normalized) برای ستون جستجوی farmer که insert خام از default مدل رد نمی‌شود
+FULL_NAMES_WITH_NORMALIZED = [(name, normalize(name)) for name in FULL_NAMES]
+ADDRESS_PREFIXES = [
+    f"{province}، {place} {last}، پلاک " for province in PROVINCES for place in PLACE_PARTS for last in LAST_NAMES
+]
+
+
+# --------- VALID IDENTIFIERS ---------
+# رقم کنترل‌ها با جدول‌های از پیش حساب‌شده‌ی گروه‌های سه رقمی ساخته می‌شوند (بدون حلقه روی رقم‌ها).
+# عدد تصادفی با getrandbits % 10^n ساخته می‌شود که از randrange چند برابر ارزان‌تر است؛
+# نایکنواختی جزئی آن برای داده‌ی آزمایشی مهم نیست.
+def _weighted_table(weights) -> list[int]:
+    return [sum(int(d) * w for d, w in zip(f"{n:03d}", weights)) for n in range(1000)]
+
+
+_NID_HIGH = _weighted_table((10, 9, 8))
+_NID_MID = _weighted_table((7, 6, 5))
+_NID_LOW = _weighted_table((4, 3, 2))
+# i -> (offset + i * stride) mod 10^9 یک‌به‌یک است (stride نسبت به 10^9 اول است)، پس
+# کدهای ملی بدون نگه داشتن set یکتا و پراکنده‌اند
+_NID_STRIDE = 387_420_489  # 3^18
+
+
+def national_id(body: int) -> str:
+    """body نه رقمی + رقم کنترل (الگوریتم کد ملی)."""
+    high, rest = divmod(body, 10**6)
+    mid, low = divmod(rest, 1000)
+    s = (_NID_HIGH[high] + _NID_MID[mid] + _NID_LOW[low]) % 11
+    return f"{body:09d}{s if s < 2 else 11 - s}"
+
+
+# IBAN: باقی‌مانده‌ی 97 عدد (0 + کد بانک + حساب + "IR00" به صورت 182700)؛ سهم کد بانک ثابت است
+_SHEBA_BANK_MOD = {code: int(code) * 10**24 % 97 for code, _ in BANKS}
+
+
+def sheba(rnd: random.Random, bank_code: str) -> str:
+    """IBAN ایران: IR + دو رقم کنترل mod-97 + ۲۲ رقم (0 + کد بانک + شماره حساب)."""
+    account = rnd.getrandbits(64) % 10**18
+    check = 98 - (_SHEBA_BANK_MOD[bank_code] + account * 10**6 + 182700) % 97  # I=18, R=27
+    return f"IR{check:02d}0{bank_code}{account:018d}"
+
+
+_LUHN_DOUBLE = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+
+def _luhn_sum(digits: str, double_last: bool) -> int:
+    # double_last: راست‌ترین رقم این تکه دو برابر شود
+    return sum(
+        _LUHN_DOUBLE[int(d)] if (i % 2 == 0) == double_last else int(d) for i, d in enumerate(reversed(digits))
+    )
+
+
+# کارت = BIN شش رقمی + حساب نه رقمی + رقم کنترل؛ از راست رقم‌های جایگاه زوج (با احتساب
+# رقم کنترل) دو برابر می‌شوند: گروه‌های حساب به ترتیب دوبل/ساده/دوبل و BIN ساده شروع می‌شود
+_LUHN_DOUBLED = [_luhn_sum(f"{n:03d}", True) for n in range(1000)]
+_LUHN_PLAIN = [_luhn_sum(f"{n:03d}", False) for n in range(1000)]
+_BIN_LUHN = {bin_: _luhn_sum(bin_, False) for _, bin_ in BANKS}
+
+
+def card_number(rnd: random.Random, bin_: str) -> str:
+    account = rnd.getrandbits(32) % 10**9
+    high, rest = divmod(account, 10**6)
+    mid, low = divmod(rest, 1000)
+    total = _BIN_LUHN[bin_] + _LUHN_DOUBLED[high] + _LUHN_PLAIN[mid] + _LUHN_DOUBLED[low]
+    return f"{bin_}{account:09d}{-total % 10}"
+
+
+def phone_number(rnd: random.Random) -> str:
+    return f"09{10 + rnd.getrandbits(5) % 30}{rnd.getrandbits(24) % 10**7:07d}"
+
+
+# --------- CHUNK GENERATORS ---------
+# هر تابع ردیف‌های id در [start, stop) را به صورت tuple به ترتیب ستون‌های TABLES می‌سازد.
+# idها صریح‌اند تا FKها بدون خواندن از دیتابیس ساخته شوند. زمان‌ها رشته‌ی
+# 'YYYY-MM-DD HH:MM:SS' و bool عدد است تا هم executemany درایور و هم TSV مستقیم بپذیرند.
+def _timestamp(args, i: int, total: int) -> str:
+    return str(args.base_time + timedelta(seconds=i * args.span_days * 86400 // max(total, 1)))
+
+
+def province_chunk(args, rnd, start, stop):
+    return [(i, PROVINCES[i - 1]) for i in range(start, stop)]
+
+
+def city_chunk(args, rnd, start, stop):
+    rand, n_places = rnd.random, len(PLACE_PARTS)
+    return [
+        (
+            i,
+            f"{PLACE_PARTS[int(rand() * n_places)]}{PLACE_PARTS[int(rand() * n_places)]} {i}",
+            1 + int(rand() * len(PROVINCES)),
+        )
+        for i in range(start, stop)
+    ]
+
+
+def village_chunk(args, rnd, start, stop):
+    rand, n_places, n_last = rnd.random, len(PLACE_PARTS), len(LAST_NAMES)
+    return [
+        (
+            i,
+            f"{PLACE_PARTS[int(rand() * n_places)]} {LAST_NAMES[int(rand() * n_last)]} {i}",
+            1 + int(rand() * args.cities),
+            _timestamp(args, i, args.villages),
+        )
+        for i in range(start, stop)
+    ]
+
+
+def farmer_chunk(args, rnd, start, stop):
+    offset = random.Random(f"{args.seed}:farmer:national_id").randrange(10**9)
+    rand, bits = rnd.random, rnd.getrandbits
+    n_banks, n_first, n_full, n_address = len(BANKS), len(FIRST_NAMES), len(FULL_NAMES), len(ADDRESS_PREFIXES)
+    rows = []
+    append = rows.append
+    for i in range(start, stop):
+        bank_code, bin_ = BANKS[int(rand() * n_banks)]
+        created = _timestamp(args, i, args.farmers)
+        append(
+            (
+                i,
+                national_id((offset + i * _NID_STRIDE) % 10**9),
+                *FULL_NAMES_WITH_NORMALIZED[int(rand() * n_full)],
+                FIRST_NAMES[int(rand() * n_first)],
+                phone_number(rnd),
+                sheba(rnd, bank_code),
+                sheba(rnd, BANKS[int(rand() * n_banks)][0]),
+                card_number(rnd, bin_),
+                f"{ADDRESS_PREFIXES[int(rand() * n_address)]}{1 + bits(9) % 299}",
+                created,
+                created,
+            )
+        )
+    return rows
+
+
+def user_chunk(args, rnd, start, stop):
+    hashes, rand, n_full = args.password_hashes, rnd.random, len(FULL_NAMES)
+    return [
+        (
+            i,
+            f"user{i:07d}",
+            hashes[i % len(hashes)],
+            FULL_NAMES[int(rand() * n_full)],
+            phone_number(rnd),
+            f"user{i}@example.com",
+            0,
+            1 if i == 1 else 2,
+        )
+        for i in range(start, stop)
+    ]
+
+
+# (model, ستون‌ها، تعداد ردیف، تابع ساخت دسته)
+TABLES = [
+    (models.Province, ("id", "province"), lambda args: len(PROVINCES), province_chunk),
+    (models.City, ("id", "city", "province_id"), lambda args: args.cities, city_chunk),
+    (models.Village, ("id", "village", "city_id", "created_at"), lambda args: args.villages, village_chunk),
+    (
+        models.Farmer,
+        (
+            "id", "national_id", "full_name", "full_name_normalized", "father_name", "phone_number", "sheba_number_1",
+            "sheba_number_2", "card_number", "address", "created_at", "updated_at",
+        ),
+        lambda args: args.farmers,
+        farmer_chunk,
+    ),
+    (
+        models.User,
+        ("id", "username", "password", "fullname", "phone_number", "email", "disabled", "role_id"),
+        lambda args: args.users,
+        user_chunk,
+    ),
+]
+
+
+def _generate(task):
+    index, start, stop, args = task
+    model, _, _, make = TABLES[index]
+    return make(args, random.Random(f"{args.seed}:{model.__tablename__}:{start}"), start, stop)
+
+
+def _chunks(args, index: int):
+    """دسته‌های یک جدول به ترتیب id؛ با jobs > 1 در پردازه‌های جدا ساخته می‌شوند."""
+    total = TABLES[index][2](args)
+    tasks = (
+        (index, start, min(start + args.chunk_size, total + 1), args) for start in range(1, total + 1, args.chunk_size)
+    )
+    if args.jobs <= 1:
+        yield from map(_generate, tasks)
+        return
+    with ProcessPoolExecutor(args.jobs) as pool:
+        # فقط چند دسته جلوتر ساخته می‌شود تا اگر نوشتن کندتر است حافظه پر نشود
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_generate, task))
+            if len(pending) >= args.jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# --------- WRITERS ---------
+def write_db(url: str, args) -> None:
+    engine = create_engine(url)
+    models.Base.metadata.create_all(engine)
+    mysql = engine.dialect.name == "mysql"
+    preparer = engine.dialect.identifier_preparer
+    marker = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+
+    with engine.begin() as conn:
+        for model, *_ in TABLES:
+            if conn.scalar(select(func.count()).select_from(model)):
+                raise SystemExit(f"❌ table {model.__tablename__} is not empty; use an empty database")
+        if not conn.scalar(select(func.count()).select_from(models.Role)):
+            conn.execute(models.Role.__table__.insert(), [{"id": 1, "name": "admin"}, {"id": 2, "name": "user"}])
+
+    for index, (model, columns, _, _) in enumerate(TABLES):
+        table = model.__table__
+        # executemany خام درایور: پردازش پارامتر هر ردیف در SQLAlchemy حذف می‌شود و
+        # درایورهای MySQL آن را به INSERT چند ردیفی تبدیل می‌کنند
+        sql = (
+            f"INSERT INTO {preparer.format_table(table)} ({', '.join(map(preparer.quote, columns))}) "
+            f"VALUES ({', '.join([marker] * len(columns))})"
+        )
+        started, count = time.perf_counter(), 0
+        with engine.begin() as conn:
+            if mysql:
+                # داده سالم و یکتا ساخته شده؛ بررسی یکتایی/FK در حین بارگذاری لازم نیست
+                conn.exec_driver_sql("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+            for rows in _chunks(args, index):
+                conn.exec_driver_sql(sql, rows)
+                count += len(rows)
+            if mysql:
+                conn.exec_driver_sql("SET SESSION unique_checks = 1, foreign_key_checks = 1")
+        _report(table.name, count, time.perf_counter() - started)
+
+    # insert مستقیم از handlerها رد نمی‌شود؛ شمارش‌های stat_count از روی داده ساخته می‌شوند
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        drift = stat_counts.rebuild(conn)
+    _report("stat_count", len(drift), time.perf_counter() - started)
+    engine.dispose()
+
+
+def write_files(out_dir: Path, args) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    statements = ["SET SESSION unique_checks = 0, foreign_key_checks = 0;"]
+
+    for index, (model, columns, _, _) in enumerate(TABLES):
+        table = model.__table__
+        path = out_dir / f"{table.name}.tsv"
+        started, count = time.perf_counter(), 0
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            for rows in _chunks(args, index):
+                # مقادیر ساخته‌شده tab / newline / backslash ندارند
+                f.writelines("\t".join(map(str, row)) + "\n" for row in rows)
+                count += len(rows)
+        _report(path.name, count, time.perf_counter() - started)
+        statements.append(
+            f"LOAD DATA LOCAL INFILE '{path.resolve()}' INTO TABLE {table.name} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(columns)});"
+        )
+
+    statements.append("SET SESSION unique_checks = 1, foreign_key_checks = 1;")
+    (out_dir / "load.sql").write_text("\n".join(statements) + "\n", encoding="utf-8")
+    print(f"✅ files written to {out_dir}; load with: mysql --local-infile=1 {settings.DB_NAME} < {out_dir / 'load.sql'}")
+    print("   (roles 1 and 2 must exist before loading users)")
+    print("   then rebuild the aggregate counts: python scripts/rebuild_stats.py")
+
+
+def _report(name: str, count: int, seconds: float) -> None:
+    rate = count / seconds if seconds else 0
+    print(f"  {name:<16} {count:>10,} rows  {seconds:7.2f}s  {rate:>10,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("db", "files"), default="db")
+    parser.add_argument("--database-url", default=None, help="default: settings from .env")
+    parser.add_argument("--out-dir", default="generated-data", help="files mode output directory")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--villages", type=int, default=60000)
+    parser.add_argument("--farmers", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--user-password", default="password")
+    parser.add_argument("--distinct-hashes", type=int, default=8, help="number of bcrypt hashes reused across users")
+    parser.add_argument("--span-days", type=int, default=3 * 365, help="created_at spread over this many past days")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="generator processes")
+    args = parser.parse_args()
+
+    args.base_time = datetime.now().replace(microsecond=0) - timedelta(days=args.span_days)
+    # bcrypt عمداً کند است؛ چند hash ساخته و بین کاربرها تکرار می‌شود (رمز همه: --user-password)
+    args.password_hashes = [bcrypt_hash(args.user_password) for _ in range(max(min(args.distinct_hashes, args.users), 1))]
+
+    if args.mode == "db":
+        write_db(args.database_url or settings.database_url, args)
+        print("✅ data generated")
+    else:
+        write_files(Path(args.out_dir), args)
+
+
+if __name__ == "__main__":
+    main()
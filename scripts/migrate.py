@@ -0,0 +1,238 @@
+"""
+اجرای migrationهای نسخه‌دار روی دیتابیس .env (یا --database-url).
+
+هر migration دو فایل در migrations/ دارد: NNNN_name.up.sql و NNNN_name.down.sql.
+نسخه‌های اعمال‌شده در جدول schema_version ثبت می‌شوند.
+
+    python scripts/migrate.py status
+    python scripts/migrate.py up [--to 4]
+    python scripts/migrate.py down --to 2
+    python scripts/migrate.py baseline --to 1   # دیتابیسی که قبلاً با create_tables.py ساخته شده
+    python scripts/migrate.py check             # EXPLAIN روی کوئری‌های لیست
+
+DDL در MySQL تراکنشی نیست: اگر یک دستور وسط migration خطا بدهد، دستورهای قبلی همان
+migration اعمال شده‌اند و نسخه ثبت نمی‌شود؛ باید دستی اصلاح و دوباره اجرا شود.
+"""
+import argparse
+import re
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from sqlalchemy import create_engine, desc, text  # noqa: E402
+
+from app.config import settings  # noqa: E402
+
+MIGRATIONS_DIR = BASE_DIR / "migrations"
+_FILE_NAME = re.compile(r"^(\d{4})_(\w+)\.(up|down)\.sql$")
+
+
+# --------- MIGRATION FILES ---------
+def load_migrations() -> list[tuple[int, str, Path, Path]]:
+    found: dict[int, dict] = {}
+    for path in MIGRATIONS_DIR.iterdir():
+        m = _FILE_NAME.match(path.name)
+        if not m:
+            continue
+        version, name, direction = int(m.group(1)), m.group(2), m.group(3)
+        entry = found.setdefault(version, {"name": name})
+        if entry["name"] != name:
+            raise SystemExit(f"❌ migration {version:04d} has two names: {entry['name']} / {name}")
+        entry[direction] = path
+
+    migrations = []
+    for version in sorted(found):
+        entry = found[version]
+        if "up" not in entry or "down" not in entry:
+            raise SystemExit(f"❌ migration {version:04d}_{entry['name']} needs both .up.sql and .down.sql")
+        migrations.append((version, entry["name"], entry["up"], entry["down"]))
+    return migrations
+
+
+def statements(path: Path) -> list[str]:
+    # خط‌های توضیح (--) حذف و بقیه روی ; جدا می‌شوند (migrationها procedure / trigger ندارند)
+    lines = [line for line in path.read_text(encoding="utf-8").splitlines() if not line.lstrip().startswith("--")]
+    return [q.strip() for q in "\n".join(lines).split(";") if q.strip()]
+
+
+# --------- SCHEMA VERSION ---------
+def _ensure_version_table(conn) -> None:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " version INT NOT NULL PRIMARY KEY,"
+        " name VARCHAR(255) NOT NULL,"
+        " applied_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.commit()
+
+
+def applied_versions(conn) -> set[int]:
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.exec_driver_sql("SELECT version FROM schema_version")}
+
+
+def _mark(conn, version: int, name: str | None) -> None:
+    if name is None:
+        conn.execute(text("DELETE FROM schema_version WHERE version = :version"), {"version": version})
+    else:
+        conn.execute(
+            text("INSERT INTO schema_version (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name},
+        )
+    conn.commit()
+
+
+def _run(conn, version: int, name: str, path: Path) -> None:
+    print(f"  {path.name}")
+    for index, sql in enumerate(statements(path), start=1):
+        try:
+            conn.exec_driver_sql(sql)
+        except Exception as e:
+            conn.rollback()
+            raise SystemExit(
+                f"❌ {path.name} failed at statement {index}: {e}\n"
+                f"   version {version:04d} was not recorded; earlier DDL of this file may already be applied"
+            )
+    conn.commit()
+
+
+# --------- COMMANDS ---------
+def cmd_status(conn, migrations, args) -> None:
+    applied = applied_versions(conn)
+    for version, name, _, _ in migrations:
+        print(f"  [{'x' if version in applied else ' '}] {version:04d}_{name}")
+    unknown = applied - {v for v, *_ in migrations}
+    if unknown:
+        print(f"⚠️ recorded but missing from migrations/: {sorted(unknown)}")
+
+
+def cmd_up(conn, migrations, args) -> None:
+    applied = applied_versions(conn)
+    pending = [m for m in migrations if m[0] not in applied and (args.to is None or m[0] <= args.to)]
+    for version, name, up, _ in pending:
+        _run(conn, version, name, up)
+        _mark(conn, version, name)
+    print(f"✅ applied {len(pending)} migration(s)")
+
+
+def cmd_down(conn, migrations, args) -> None:
+    if args.to is None:
+        raise SystemExit("❌ down needs --to VERSION (0 = remove everything)")
+    applied = applied_versions(conn)
+    targets = [m for m in reversed(migrations) if m[0] in applied and m[0] > args.to]
+    for version, name, _, down in targets:
+        _run(conn, version, name, down)
+        _mark(conn, version, None)
+    print(f"✅ reverted {len(targets)} migration(s)")
+
+
+def cmd_baseline(conn, migrations, args) -> None:
+    if args.to is None:
+        raise SystemExit("❌ baseline needs --to VERSION")
+    applied = applied_versions(conn)
+    marked = [m for m in migrations if m[0] <= args.to and m[0] not in applied]
+    for version, name, _, _ in marked:
+        _mark(conn, version, name)
+    print(f"✅ marked {len(marked)} migration(s) as applied without running them")
+
+
+# --------- CHECK (EXPLAIN) ---------
+def list_queries():
+    """کوئری‌های صفحه‌ی اول هر لیست، برای هر ستون sort_map روترها (نزولی، مثل پیش‌فرض روترها)."""
+    from app import models, schemas
+    from app.routers import city, province, users, village
+    from app.serialization import project
+
+    cases = (
+        (models.Province, schemas.ProvinceOut, province.SORT_MAP, None),
+        (models.City, schemas.CityOut, city.SORT_MAP, models.City.province_id),
+        (models.Village, schemas.VillageOut, village.SORT_MAP, models.Village.city_id),
+        (models.User, schemas.UserSwaggerOut, users.ALLOWED_SORT, None),
+    )
+    for model, schema, sort_map, filter_col in cases:
+        stmt, _ = project(model, schema)
+        table = model.__tablename__
+        for key, col in sort_map.items():
+            q = stmt
+            if col.class_ is not model:
+                # sort روی ستون جدول دیگر (village -> city) مثل روتر با join
+                q = q.join(col.class_)
+            yield f"{table} sort_by={key}", q.order_by(desc(col)).limit(50), key == "id"
+        if filter_col is not None:
+            yield f"{table} {filter_col.key}=1", stmt.where(filter_col == 1).order_by(desc(model.id)).limit(50), False
+
+    # لیست‌های بدون sort_map: فقط ترتیب id
+    for model, schema in ((models.Farmer, schemas.FarmerOut), (models.CropYear, schemas.CropYearOut)):
+        stmt, _ = project(model, schema)
+        yield f"{model.__tablename__} sort_by=id", stmt.order_by(model.id).limit(50), True
+
+
+def _explain_problems(conn, sql: str, by_primary_key: bool) -> list[str]:
+    problems = []
+    if conn.dialect.name == "sqlite":
+        for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql):
+            detail = row[-1]
+            if "TEMP B-TREE" in detail:
+                problems.append(f"filesort ({detail})")
+            # SCAN بدون ایندکس فقط وقتی ترتیب rowid است (ORDER BY id ... LIMIT) ارزان است
+            elif detail.startswith("SCAN ") and "INDEX" not in detail and not by_primary_key:
+                problems.append(f"full scan ({detail})")
+        return problems
+
+    for row in conn.exec_driver_sql("EXPLAIN " + sql).mappings():
+        extra = row.get("Extra") or ""
+        if row.get("type") == "ALL":
+            problems.append(f"full scan of {row['table']} (~{row.get('rows')} rows)")
+        if "Using filesort" in extra:
+            problems.append(f"filesort on {row['table']}")
+    return problems
+
+
+def cmd_check(conn, migrations, args) -> None:
+    # بدون آمار جدول، planner برای join (village sort_by=city) ترتیب اشتباه انتخاب می‌کند؛
+    # MySQL آمار را خودش نگه می‌دارد (و 0004 بعد از ساخت ایندکس‌ها ANALYZE TABLE می‌زند)
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    flagged = 0
+    for label, stmt, by_primary_key in list_queries():
+        sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+        problems = _explain_problems(conn, sql, by_primary_key)
+        flagged += bool(problems)
+        print(f"  {'❌' if problems else '✅'} {label}{': ' + '; '.join(problems) if problems else ''}")
+    if flagged:
+        raise SystemExit(f"❌ {flagged} list quer{'y' if flagged == 1 else 'ies'} without a usable index")
+    print("✅ every list query is served by an index")
+
+
+COMMANDS = {
+    "status": cmd_status,
+    "up": cmd_up,
+    "down": cmd_down,
+    "baseline": cmd_baseline,
+    "check": cmd_check,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("--to", type=int, default=None, help="target version")
+    parser.add_argument("--database-url", default=None, help="default: settings from .env")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url or settings.database_url)
+    if args.command != "check" and engine.dialect.name != "mysql":
+        # فایل‌های migration مخصوص MySQL‌اند؛ SQLite بنچمارک با metadata.create_all ساخته می‌شود
+        raise SystemExit(f"❌ migrations target MySQL, not {engine.dialect.name}")
+
+    migrations = load_migrations()
+    with engine.connect() as conn:
+        COMMANDS[args.command](conn, migrations, args)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+بازسازی شمارش‌های تجمیعی stat_count (app/stat_counts.py) از روی جدول‌های اصلی.
+
+handlerهای API شمارش‌ها را در همان تراکنش نوشتن به‌روز می‌کنند؛ این اسکریپت برای اختلافی است
+که از نوشتن بیرون از API (generate_data، SQL دستی، بازگردانی backup) یا باگ ایجاد شده.
+فقط ردیف‌های اختلاف‌دار نوشته می‌شوند. در MySQL ردیف‌های stat_count تا پایان کار قفل
+می‌مانند، پس اجرای آن کنار ترافیک عادی امن است (نوشتن‌ها چند لحظه منتظر می‌مانند).
+
+    python scripts/rebuild_stats.py            # گزارش اختلاف و اصلاح
+    python scripts/rebuild_stats.py --check    # فقط گزارش؛ اگر اختلاف باشد exit code 1
+"""
+import argparse
+import sys
+from collections import Counter
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from app import stat_counts  # noqa: E402
+from app.config import settings  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="report drift without fixing it")
+    parser.add_argument("--database-url", default=None, help="default: settings from .env")
+    parser.add_argument("--show", type=int, default=20, help="drifted rows to print")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url or settings.database_url)
+    with engine.begin() as conn:
+        drift = stat_counts.rebuild(conn, apply=not args.check)
+    engine.dispose()
+
+    for d in drift[:args.show]:
+        print(f"  {d['metric']} {d['bucket']}: stored {d['stored']}, actual {d['actual']}")
+    if len(drift) > args.show:
+        print(f"  ... {len(drift) - args.show} more")
+
+    if not drift:
+        print("✅ stat_count matches the data")
+        return
+    per_metric = ", ".join(f"{metric}: {n}" for metric, n in sorted(Counter(d["metric"] for d in drift).items()))
+    if args.check:
+        print(f"❌ {len(drift)} drifted row(s) ({per_metric})")
+        raise SystemExit(1)
+    print(f"✅ fixed {len(drift)} drifted row(s) ({per_metric})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import models, security
+
+
+def _expires() -> datetime:
+    return (datetime.now(timezone.utc) + timedelta(days=1)).replace(tzinfo=None)
+
+
+async def _late_commit_of_lower_id(url: str) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            models.Base.metadata.create_all,
+            tables=[models.TokenBlacklist.__table__, models.TableVersion.__table__],
+        )
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async with Session() as db:
+        await security.refresh_blacklist(db)
+
+    # logout B (id 11) زودتر commit شده و یک worker آن را sync کرده
+    async with Session() as db:
+        db.add(models.TokenBlacklist(id=11, jti="jti-b", expires_at=_expires()))
+        await db.commit()
+    async with Session() as db:
+        await security.refresh_blacklist(db)
+    assert "jti-b" in security._revoked
+
+    # logout A (id 10) قبل از آن sync درج شده ولی بعد از آن commit می‌شود
+    async with Session() as db:
+        inserted_at = security._revoked_synced_at - timedelta(seconds=1)
+        db.add(models.TokenBlacklist(id=10, jti="jti-a", expires_at=_expires(), blacklisted_at=inserted_at))
+        await db.commit()
+    async with Session() as db:
+        await security.refresh_blacklist(db)
+    assert "jti-a" in security._revoked
+    assert "jti-b" in security._revoked
+
+    await engine.dispose()
+
+
+def test_lower_id_committed_after_higher_id_was_synced(tmp_path, monkeypatch):
+    monkeypatch.setattr(security, "_revoked", {})
+    monkeypatch.setattr(security, "_revoked_synced_at", None)
+    asyncio.run(_late_commit_of_lower_id(f"sqlite+aiosqlite:///{tmp_path / 'blacklist.db'}"))